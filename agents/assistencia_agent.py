@@ -1,14 +1,45 @@
 import sys
 import os
-from typing import Optional, Dict, Any
+import re
+import time
+from datetime import date
+from typing import Optional, Dict, Any, List
 import asyncio
 
-# Adiciona o diretório raiz ao sys.path se necessário
-# sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+# Adiciona o diretório raiz ao sys.path para encontrar o registro de agentes
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-# Exemplo: Se precisar do LLMAgent futuramente
-# from agents.llm_agent import LLMAgent
-# llm_agent = LLMAgent()
+from agents.registry import registrar_agente, prazo_llm
+from agents.llm_agent import get_llm_agent # Só para explicações livres sobre um benefício
+from utils.corpus_watcher import registrar_recarga, ler_versao_corpus
+from utils.data_local import hoje
+from utils.db_handler import get_db_pool
+from utils.keyword_matcher import KeywordMatcher
+from utils.text_normalizer import normalizar
+from utils.token_budget import resumo_uso
+
+llm_agent = get_llm_agent()
+
+# Palavras-chave que direcionam perguntas a este agente (ver orchestrator/router.py)
+KEYWORDS = [
+    "assistência", "auxílio", "bolsa", "renda", "alimentação", "creche",
+    "transporte", "permanência", "pnaes", "vulnerabilidade", "socioeconômica"
+]
+# Explicações livres passam pelo LLM (sem streaming) dentro do prazo do agente, com prazo próprio menor
+# (Groq lenta: devolve a ficha do catálogo em vez de estourar o prazo do agente)
+ASSISTENCIA_TIMEOUT = float(os.getenv("LUMIA_ASSISTENCIA_TIMEOUT", "30"))
+ASSISTENCIA_LLM_PRAZO = prazo_llm(ASSISTENCIA_TIMEOUT)
+
+# Atributo perguntado, sobre o texto normalizado (minúsculas, sem acentos)
+_ATRIBUTOS_RE = {
+    "valor": re.compile(r"\b(quanto|valor|valores)\b"), # "receber" sozinho é elegibilidade ("posso receber...?")
+    "elegibilidade": re.compile(r"\b(quem tem direito|quem pode|tenho direito|requisitos?|criterios?|elegivel|"
+                                r"elegibilidade|renda maxima|posso receber|preciso ter)\b"),
+    "documentos": re.compile(r"\b(documentos?|documentacao|comprovantes?|papeis)\b"),
+    "prazo": re.compile(r"\b(prazos?|inscricao|inscricoes|inscrever|quando|edital|editais|resultado|datas?)\b"),
+    "carga_horaria": re.compile(r"\b(carga horaria|quantas horas)\b"),
+}
+_LISTAR_RE = re.compile(r"\bquais\b.*\b(auxilios|bolsas|beneficios)\b")
 
 class AssistenciaAgent:
     """
@@ -18,23 +49,200 @@ class AssistenciaAgent:
     Escopo: Auxílios (moradia, alimentação, creche, transporte, etc.), bolsas 
             (permanência, Pibic, Pibex), apoio psicológico/pedagógico, editais 
             de assistência.
-    Fonte Esperada: Banco de dados com informações da PRAPE e outras pró-reitorias 
-                    relevantes (PRG, PRPG, Proex).
+    Fonte: catálogo estruturado `auxilios`, `bolsas` e `editais_assistencia`
+           (scrapers/assistencia_ingest.py), indexado em memória no startup e recarregado quando a
+           versão do corpus muda (utils/corpus_watcher.py). Perguntas sobre um
+           atributo (valor, elegibilidade, documentos, prazos) são respondidas direto dos campos;
+           o LLM só explica o benefício quando a pergunta é livre ("como funciona...").
     """
 
+    def __init__(self):
+        self.beneficios: Dict[str, Dict[str, Any]] = {} # slug -> campos
+        self.editais: Dict[Optional[str], List[Dict[str, Any]]] = {} # slug -> editais (por início da inscrição)
+        self.matcher: Optional[KeywordMatcher] = None
+        self.versao: Optional[str] = None # Versão do corpus do catálogo em memória
+        self._carga_lock = asyncio.Lock()
+
+    async def carregar(self, versao: Optional[str] = None, forcar: bool = False):
+        """ Lê o catálogo e monta o índice nome/sinônimo -> benefício (idempotente, salvo com `forcar`).
+        Se a leitura falhar, o catálogo atual continua valendo.
+        """
+        async with self._carga_lock:
+            if self.matcher is not None and not forcar:
+                return
+            colunas = "slug, nome, sinonimos, valor, periodicidade, elegibilidade, documentos, descricao, url"
+            pool = get_db_pool()
+            try:
+                if versao is None:
+                    versao = await ler_versao_corpus()
+                auxilios = await pool.fetchall(f"SELECT {colunas}, NULL FROM auxilios")
+                bolsas = await pool.fetchall(f"SELECT {colunas}, carga_horaria FROM bolsas")
+                editais = await pool.fetchall(""" SELECT numero, titulo, beneficio, inscricao_inicio, inscricao_fim,
+                                                         resultado_em, url
+                                                  FROM editais_assistencia ORDER BY inscricao_inicio """)
+            except Exception as e: # Tabelas ainda não criadas (scrapers/assistencia_ingest.py nunca rodou)
+                print(f"AssistenciaAgent: Catálogo indisponível ({e}).")
+                if self.matcher is None:
+                    self.matcher = KeywordMatcher({})
+                return
+
+            beneficios: Dict[str, Dict[str, Any]] = {}
+            por_beneficio: Dict[Optional[str], List[Dict[str, Any]]] = {}
+            termos: Dict[str, List[str]] = {}
+            for tipo, rows in (("auxilio", auxilios), ("bolsa", bolsas)):
+                for (slug, nome, sinonimos, valor, periodicidade, elegibilidade, documentos,
+                     descricao, url, carga_horaria) in rows:
+                    beneficios[slug] = {
+                        "tipo": tipo, "nome": nome, "valor": valor, "periodicidade": periodicidade,
+                        "elegibilidade": elegibilidade, "descricao": descricao, "url": url,
+                        "documentos": [d for d in (documentos or "").splitlines() if d.strip()],
+                        "carga_horaria": carga_horaria,
+                    }
+                    termos[slug] = [nome] + [s for s in (sinonimos or "").splitlines() if s.strip()]
+            for numero, titulo, beneficio, inicio, fim, resultado_em, url in editais:
+                por_beneficio.setdefault(beneficio, []).append({
+                    "numero": numero, "titulo": titulo, "inicio": inicio, "fim": fim,
+                    "resultado_em": resultado_em, "url": url,
+                })
+            self.beneficios, self.editais, self.matcher = beneficios, por_beneficio, KeywordMatcher(termos)
+            self.versao = versao
+            print(f"AssistenciaAgent: {len(self.beneficios)} benefícios e {len(editais)} editais carregados (corpus {versao}).")
+
+    async def atualizar(self, versao: Optional[str]):
+        """ Recarga periódica: o assistencia_ingest gravou editais/valores novos, ou a carga anterior veio vazia. """
+        if versao != self.versao or not self.beneficios:
+            await self.carregar(versao, forcar=True)
+
     async def responder_pergunta(self, pergunta: str) -> Optional[Dict[str, Any]]:
-        """ Tenta responder a pergunta sobre Assistência Estudantil. (Não implementado) """
-        print(f"AssistenciaAgent: Recebida pergunta (não implementado): '{pergunta[:50]}...'")
-        # logs = [f"AssistenciaAgent: Recebida pergunta: '{pergunta[:50]}...'"]
+        """ Identifica o benefício e o atributo perguntados e responde pelo catálogo. """
+        inicio = time.perf_counter()
+        logs = [f"AssistenciaAgent: Recebida pergunta: '{pergunta[:50]}...'"]
+        print(logs[-1])
+        if self.matcher is None:
+            await self.carregar()
+        if not self.beneficios:
+            return None
+        texto = normalizar(pergunta)
+
+        ranking = self.matcher.pontuar(pergunta)
+        if not ranking:
+            if not _LISTAR_RE.search(texto):
+                logs.append("AssistenciaAgent: Nenhum benefício do catálogo na pergunta.")
+                print(logs[-1])
+                return None
+            answer = self._listar(texto)
+            logs.append(f"AssistenciaAgent: Lista do catálogo em {(time.perf_counter() - inicio) * 1000:.3f} ms.")
+            print(logs[-1])
+            return {"answer": answer, "raw_answer": answer, "logs": logs}
+
+        slug = ranking[0][0]
+        beneficio = self.beneficios[slug]
+        atributos = [a for a, regex in _ATRIBUTOS_RE.items() if regex.search(texto)]
+        logs.append(f"AssistenciaAgent: Benefício '{slug}', atributos: {', '.join(atributos) or 'nenhum (explicação livre)'}.")
+        print(logs[-1])
+
+        if atributos:
+            answer = "\n\n".join(self._responder_atributo(slug, beneficio, a) for a in atributos)
+            logs.append(f"AssistenciaAgent: Respondido do catálogo em {(time.perf_counter() - inicio) * 1000:.3f} ms (sem LLM).")
+            print(logs[-1])
+            return {"answer": answer, "raw_answer": answer, "logs": logs,
+                    "cacheavel": not ("prazo" in atributos and self._depende_da_data(slug))}
+
+        # Pergunta livre sobre o benefício: o LLM explica a partir da ficha (degrada para a própria ficha)
+        ficha = self._ficha(slug, beneficio)
+        uso_tokens = {}
+        answer = await llm_agent.responder(pergunta, context=[ficha], uso=uso_tokens, fallback=ficha,
+                                           prazo=ASSISTENCIA_LLM_PRAZO)
+        logs.append("AssistenciaAgent: Explicação gerada pelo LLM a partir da ficha do benefício.")
+        logs.append(resumo_uso(uso_tokens))
+        print(logs[-2])
+        # A ficha inclui a situação das inscrições (e o LLM a repete)
+        resultado = {"answer": answer, "raw_answer": ficha, "logs": logs, "token_usage": uso_tokens,
+                     "cacheavel": not self._depende_da_data(slug)}
+        if uso_tokens.get("degradado"):
+            resultado["degradado"] = True
+        return resultado
+
+    def _depende_da_data(self, slug: str) -> bool:
+        """ A situação das inscrições (abertas/encerradas) muda com a data: respostas que a incluem não vão
+        para o cache de respostas (seriam servidas depois do fim do prazo até o TTL expirar).
+        """
+        return bool(self.editais.get(slug))
+
+    def _responder_atributo(self, slug: str, beneficio: Dict[str, Any], atributo: str) -> str:
+        nome = beneficio["nome"]
+        if atributo == "valor":
+            if beneficio["valor"] is None:
+                return f"{nome}: valor não informado no catálogo."
+            periodo = f" ({beneficio['periodicidade']})" if beneficio["periodicidade"] else ""
+            return f"{nome}: {_formatar_reais(beneficio['valor'])}{periodo}."
+        if atributo == "elegibilidade":
+            return f"Quem pode receber ({nome}): {beneficio['elegibilidade'] or 'critérios não informados no catálogo.'}"
+        if atributo == "documentos":
+            if not beneficio["documentos"]:
+                return f"{nome}: documentos não informados no catálogo."
+            return f"Documentos necessários ({nome}):\n" + "\n".join(f"- {d}" for d in beneficio["documentos"])
+        if atributo == "carga_horaria":
+            if beneficio["carga_horaria"] is None:
+                return f"{nome}: carga horária não informada no catálogo."
+            return f"Carga horária ({nome}): {beneficio['carga_horaria']} horas semanais."
+        return self._prazos(slug, nome)
+
+    def _prazos(self, slug: str, nome: str) -> str:
+        """ Edital aberto agora; senão o próximo; senão o mais recente. """
+        editais = self.editais.get(slug) or []
+        if not editais:
+            return f"{nome}: nenhum edital cadastrado."
+        dia = hoje().isoformat() # Data de João Pessoa, não a do container (UTC)
+        abertos = [e for e in editais if e["inicio"] and e["inicio"] <= dia and (not e["fim"] or dia <= e["fim"])]
+        futuros = [e for e in editais if e["inicio"] and e["inicio"] > dia]
+        if abertos:
+            edital, situacao = abertos[0], "inscrições abertas"
+        elif futuros:
+            edital, situacao = futuros[0], "inscrições ainda não abertas"
+        else:
+            edital = editais[-1]
+            situacao = "inscrições encerradas" if edital["fim"] and edital["fim"] < dia else "datas não informadas"
+        linha = f"Edital nº {edital['numero']} ({edital['titulo']}): {situacao}"
+        if edital["inicio"] and edital["fim"]:
+            linha += f", de {_formatar_data(edital['inicio'])} a {_formatar_data(edital['fim'])}"
+        linhas = [linha + "."]
+        if edital["resultado_em"]:
+            linhas.append(f"Resultado previsto para {_formatar_data(edital['resultado_em'])}.")
+        if edital["url"]:
+            linhas.append(f"Fonte: {edital['url']}")
+        return "\n".join(linhas)
+
+    def _ficha(self, slug: str, beneficio: Dict[str, Any]) -> str:
+        """ Todos os campos do benefício em texto (contexto do LLM e resposta degradada). """
+        linhas = [beneficio["nome"] + (f": {beneficio['descricao']}" if beneficio["descricao"] else "")]
+        for atributo in ("valor", "elegibilidade", "documentos", "carga_horaria", "prazo"):
+            if atributo == "carga_horaria" and beneficio["tipo"] != "bolsa":
+                continue
+            linhas.append(self._responder_atributo(slug, beneficio, atributo))
+        if beneficio["url"]:
+            linhas.append(f"Fonte: {beneficio['url']}")
+        return "\n".join(linhas)
 
-        # TODO: Implementar lógica de busca contextual em tabelas de auxílios, bolsas, editais
-        # Ex: buscar em `auxilios`, `bolsas`, `editais_assistencia`
+    def _listar(self, texto: str) -> str:
+        tipos = [t for t, palavra in (("auxilio", "auxilios"), ("bolsa", "bolsas")) if palavra in texto] or ["auxilio", "bolsa"]
+        linhas = []
+        for tipo in tipos:
+            nomes = sorted(b["nome"] for b in self.beneficios.values() if b["tipo"] == tipo)
+            if nomes:
+                linhas.append(("Auxílios" if tipo == "auxilio" else "Bolsas") + ":\n" + "\n".join(f"- {n}" for n in nomes))
+        return "\n\n".join(linhas) or "Não há benefícios desse tipo cadastrados no catálogo."
 
-        # TODO: Se encontrar info, refinar com LLM? (llm_agent.responder)
+def _formatar_reais(valor: float) -> str:
+    return "R$ " + f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
-        # TODO: Retornar dicionário com 'answer', 'raw_answer', 'logs' ou None
+def _formatar_data(iso: str) -> str:
+    return date.fromisoformat(iso).strftime("%d/%m/%Y")
 
-        return None  # Retorna None indicando que não pode responder ainda
+assistencia_agent = AssistenciaAgent()
+registrar_agente("ASSISTENCIA", assistencia_agent.responder_pergunta, KEYWORDS, prioridade=30,
+                 timeout=ASSISTENCIA_TIMEOUT)
+registrar_recarga("ASSISTENCIA", assistencia_agent.atualizar)
 
 # Exemplo de uso (para teste futuro)
 # async def main_test_assistencia():
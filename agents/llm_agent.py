@@ -3,8 +3,10 @@ import json
 import sys
 import os
 import sqlite3
-from typing import Optional, List
+from typing import Optional, List, AsyncIterator, Dict, Tuple
 import asyncio
+import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 # Adiciona o diretório raiz ao sys.path para encontrar o módulo utils
@@ -13,13 +15,32 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 # Carrega variáveis de ambiente do arquivo .env
 load_dotenv()
 
-from utils.db_handler import create_connection
+from utils.db_handler import get_db_pool
+from utils.fts_search import buscar_fts_async
+from utils.vector_index import get_vector_index, fundir_rrf
+from utils.http_client import get_http_client, HTTP_CONNECT_TIMEOUT, HTTP_POOL_TIMEOUT
+from utils.rate_limiter import (
+    get_groq_limiter, LimiteExcedido, ler_retry_after, calcular_backoff,
+    GROQ_MAX_RETRIES, GROQ_MAX_WAIT, RETRYABLE_STATUS,
+)
+from utils.token_budget import (
+    estimar_tokens, truncar_para_tokens, ajustar_contexto, orcamento_prompt, calcular_max_tokens,
+    QUESTION_MAX_TOKENS, COMPLETION_MAX_TOKENS,
+)
+from utils.metrics import LLM_LATENCY, LLM_QUEUE_WAIT, LLM_TOKENS, LLM_RETRIES, ERRORS
+from utils.tracing import span, registrar_span, anotar
 
 # --- Configuração da API LLM (agora Groq) ---
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL = "llama3-8b-8192"
-GROQ_TIMEOUT = 120.0 # Timeout para Groq (pode ser menor que Ollama local)
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "120")) # Timeout de leitura para Groq (pode ser menor que Ollama local)
+# Conexão/pool falham rápido; só a geração da resposta pode demorar até GROQ_TIMEOUT
+GROQ_HTTP_TIMEOUT = httpx.Timeout(GROQ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT, pool=HTTP_POOL_TIMEOUT)
+# Tokens de resposta reservados no limitador antes de a Groq informar o uso real
+GROQ_EXPECTED_COMPLETION_TOKENS = int(os.getenv("LUMIA_GROQ_EXPECTED_COMPLETION_TOKENS", "256"))
+# Prefixo da resposta degradada (LLM indisponível: serve o parágrafo do DB sem refinamento)
+DEGRADED_PREFIX = "O assistente está com alta demanda no momento. Segue a informação encontrada na base da UFPB:\n\n"
 
 # Verificar se a chave foi carregada
 if not GROQ_API_KEY:
@@ -37,25 +58,19 @@ UFPB_TERMS = ["ufpb", "universidade federal da paraíba"]
 class LLMAgent:
     """ Agente para interagir com um Large Language Model via API Groq (Async). """
 
-    def _fetch_context_from_db(self, pergunta: str) -> List[str]:
-        """ Busca contexto no DB e filtra por termos da UFPB. """
-        # TODO: Melhorar a busca de contexto com busca vetorial/embeddings.
+    async def _fetch_context_from_db(self, pergunta: str) -> List[str]:
+        """ Busca contexto no DB (BM25 + similaridade vetorial) via pool async e filtra por termos da UFPB. """
         context_list = []
-        conn = create_connection()
-        if conn is None:
-            print("LLMAgent: Falha ao conectar ao DB para buscar contexto.")
-            return context_list
-
         all_results = []
         try:
-            cur = conn.cursor()
-            termo_busca = f"%{pergunta}%"
-            # Busca simples usando LIKE
-            cur.execute(f"SELECT resposta FROM {DB_TABLE_FOR_CONTEXT} WHERE pergunta LIKE ? OR resposta LIKE ? LIMIT ?",
-                        (termo_busca, termo_busca, CONTEXT_LIMIT))
-            resultados_query = cur.fetchall()
+            async with get_db_pool().acquire() as conn:
+                # Busca híbrida: BM25 (FTS5) pega termos exatos, o índice vetorial pega paráfrases
+                resultados_fts = await buscar_fts_async(conn, pergunta, k=CONTEXT_LIMIT)
+                resultados_vetor = await get_vector_index().buscar_paragrafos_async(conn, pergunta, k=CONTEXT_LIMIT)
+            resultados_query = fundir_rrf([resultados_fts, resultados_vetor], k=CONTEXT_LIMIT)
+            anotar(fts=len(resultados_fts), vetor=len(resultados_vetor), paragrafos=len(resultados_query))
             if resultados_query:
-                all_results = [row[0] for row in resultados_query]
+                all_results = [row["resposta"] for row in resultados_query]
                 print(f"LLMAgent: Contexto inicial encontrado no DB: {len(all_results)} parágrafos.")
 
                 # Filtra os resultados para conter termos da UFPB
@@ -73,44 +88,51 @@ class LLMAgent:
         except sqlite3.Error as e:
             print(f"LLMAgent: Erro ao consultar DB para contexto: {e}")
             context_list = all_results # Retorna o que foi encontrado antes do erro, se houver
-        finally:
-            if conn:
-                conn.close()
         return context_list
 
-    def _build_prompt(self, pergunta: str, context: Optional[List[str]] = None) -> str:
-        """ Monta o prompt para o LLM, focando em UFPB. """
+    def _build_prompt(self, pergunta: str, context: Optional[List[str]] = None) -> Tuple[str, Dict[str, int]]:
+        """ Monta o prompt para o LLM, focando em UFPB, dentro do orçamento de tokens (utils/token_budget.py).
+        Instrução e pergunta têm prioridade; o contexto (em ordem de relevância) ocupa o que sobra, truncando
+        ou descartando os parágrafos de menor ranking.
+        :return: (prompt, uso) onde `uso` traz a estimativa de tokens e o `max_tokens` ajustado.
+        """
         instruction = "Responda à pergunta." # Instrução base
         context_prefix = ""
+        pergunta = truncar_para_tokens(pergunta, QUESTION_MAX_TOKENS)
+
+        # Adiciona a diretiva sobre UFPB e outras universidades
+        ufpb_directive = "A resposta deve considerar apenas informações da Universidade Federal da Paraíba (UFPB), ignorando quaisquer menções a outras universidades."
 
+        truncados = descartados = 0
+        if context:
+            instruction = "Responda com base SOMENTE no contexto acima."
+            fixos = estimar_tokens(f"Contexto:\n\nPergunta: {pergunta}\n\n{instruction} {ufpb_directive}")
+            context, truncados, descartados = ajustar_contexto(context, orcamento_prompt() - fixos)
+            if truncados or descartados:
+                print(f"LLMAgent: Contexto ajustado ao orçamento ({truncados} truncado(s), {descartados} descartado(s)).")
         if context:
             context_str = "\n".join([f"- {item}" for item in context])
             context_prefix = f"Contexto:\n{context_str}\n\n"
-            instruction = "Responda com base SOMENTE no contexto acima."
-
-        # Adiciona a diretiva sobre UFPB e outras universidades
-        ufpb_directive = "A resposta deve considerar apenas informações da Universidade Federal da Paraíba (UFPB), ignorando quaisquer menções a outras universidades."
+        else:
+            instruction = "Responda à pergunta."
 
         # Monta o prompt final
         prompt = f"{context_prefix}Pergunta: {pergunta}\n\n{instruction} {ufpb_directive}"
+        prompt_tokens = estimar_tokens(prompt)
+        uso = {
+            "prompt_tokens_estimados": prompt_tokens,
+            "max_tokens": calcular_max_tokens(prompt_tokens),
+            "paragrafos_truncados": truncados,
+            "paragrafos_descartados": descartados,
+        }
 
         # Debug do prompt (opcional)
         # print(f"--- Prompt para LLM ---\n{prompt}\n-----------------------")
-        return prompt
+        return prompt, uso
 
-    async def responder(self, pergunta: str, context: Optional[List[str]] = None) -> str:
-        """ Envia ASYNCRONAMENTE a pergunta para a API Groq e retorna a resposta. """
-        print(f"LLMAgent (async Groq): Recebida pergunta: '{pergunta[:50]}...'")
-
-        if context is None:
-            print("LLMAgent (async Groq): Contexto não fornecido, buscando/filtrando no DB (sync)...")
-            context = self._fetch_context_from_db(pergunta)
-            # Se fetch_context_from_db retornar lista vazia, _build_prompt tratará disso
-
-        prompt = self._build_prompt(pergunta, context)
-
-        # --- Monta Payload e Headers para Groq (formato OpenAI) ---
-        payload = {
+    def _build_payload(self, prompt: str, stream: bool = False, max_tokens: int = COMPLETION_MAX_TOKENS) -> dict:
+        """ Monta o payload para Groq (formato OpenAI Chat Completions). """
+        return {
             "model": GROQ_MODEL,
             "messages": [
                 {
@@ -119,25 +141,206 @@ class LLMAgent:
                 }
             ],
             "temperature": 0.5, # Ajuste conforme necessário
-            "max_tokens": 1024, # Ajuste conforme necessário
+            "max_tokens": max_tokens, # Ajustado ao que sobra da janela do modelo (ver _build_prompt)
             "top_p": 1,
-            "stream": False,
+            "stream": stream,
             "stop": None
         }
-        headers = {
+
+    def _build_headers(self) -> dict:
+        return {
             "Authorization": f"Bearer {GROQ_API_KEY}",
             "Content-Type": "application/json"
         }
-        # -------------------------------------------------------------
 
+    def _registrar_uso(self, uso: Optional[Dict[str, int]], usage: Optional[dict]):
+        """ Copia a contagem real de tokens reportada pela Groq (campo `usage`) para `uso`. """
+        if uso is None or not usage:
+            return
+        uso["prompt_tokens"] = usage.get("prompt_tokens", 0)
+        uso["completion_tokens"] = usage.get("completion_tokens", 0)
+
+    def _mensagem_erro_http(self, status_code: int) -> str:
+        """ Mensagem amigável para erros HTTP da API Groq. """
+        if status_code == 401:
+             return "Desculpe, a chave de API fornecida para o serviço de linguagem é inválida."
+        elif status_code == 429:
+             return "Desculpe, o limite de requisições para o serviço de linguagem foi atingido. Tente novamente mais tarde."
+        else:
+             return f"Desculpe, o serviço de linguagem retornou um erro HTTP {status_code}."
+
+    def _falha(self, mensagem: str, fallback: Optional[str], uso: Dict[str, int]) -> str:
+        """ LLM indisponível: com `fallback` (resposta crua do DB) degrada para ela em vez da mensagem de erro. """
+        ERRORS.inc("llm_degradado" if fallback else "llm")
+        anotar(falha=mensagem[:80], degradado=bool(fallback))
+        if not fallback:
+            return mensagem
+        print("LLMAgent (async Groq): LLM indisponível, degradando para a resposta encontrada no DB.")
+        uso["degradado"] = 1
+        return f"{DEGRADED_PREFIX}{fallback}"
+
+    @asynccontextmanager
+    async def _requisicao_groq(self, payload: dict, uso: Dict[str, int]) -> AsyncIterator[httpx.Response]:
+        """ Abre a requisição à Groq passando pelo limitador do processo (RPM/TPM/concorrência).
+        429, 5xx e falhas de conexão são repetidos com backoff exponencial + jitter, respeitando Retry-After.
+        A resposta é aberta em modo stream; a vaga de concorrência é mantida até o corpo ser consumido.
+        """
+        limiter = get_groq_limiter()
+        client = get_http_client()
+        reservado = uso.get("prompt_tokens_estimados", 0) + min(payload["max_tokens"], GROQ_EXPECTED_COMPLETION_TOKENS)
+        tentativa = 0
+        while True:
+            inicio_fila = time.perf_counter()
+            async with limiter.vaga(reservado) as espera:
+                uso["espera_fila_ms"] = uso.get("espera_fila_ms", 0) + int(espera * 1000)
+                LLM_QUEUE_WAIT.observe(espera)
+                registrar_span("llm.fila", inicio_fila, time.perf_counter(), tentativa=tentativa)
+                response = None
+                inicio = time.perf_counter()
+                with span("llm.groq", tentativa=tentativa, stream=payload["stream"], max_tokens=payload["max_tokens"]):
+                    try:
+                        request = client.build_request("POST", GROQ_API_URL, json=payload, headers=self._build_headers(),
+                                                       timeout=GROQ_HTTP_TIMEOUT)
+                        response = await client.send(request, stream=True)
+                    except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError) as e:
+                        LLM_LATENCY.observe(time.perf_counter() - inicio, "conexao")
+                        anotar(status="conexao")
+                        if tentativa >= GROQ_MAX_RETRIES:
+                            raise
+                        print(f"LLMAgent (async Groq): Falha de conexão ({type(e).__name__}), tentando de novo...")
+                    if response is not None:
+                        anotar(status=response.status_code)
+                        limiter.sincronizar(response.headers)
+                        if response.status_code not in RETRYABLE_STATUS or tentativa >= GROQ_MAX_RETRIES:
+                            try:
+                                yield response
+                            finally:
+                                await response.aclose()
+                                # Até o corpo ser consumido: no streaming inclui toda a geração
+                                LLM_LATENCY.observe(time.perf_counter() - inicio, str(response.status_code))
+                                total = uso.get("prompt_tokens", 0) + uso.get("completion_tokens", 0)
+                                limiter.registrar_uso(reservado, total if "prompt_tokens" in uso else None)
+                                if "prompt_tokens" in uso:
+                                    LLM_TOKENS.inc("prompt", valor=uso["prompt_tokens"])
+                                    LLM_TOKENS.inc("completion", valor=uso.get("completion_tokens", 0))
+                                    anotar(prompt_tokens=uso["prompt_tokens"], completion_tokens=uso.get("completion_tokens", 0))
+                            return
+                        await response.aclose()
+                        LLM_LATENCY.observe(time.perf_counter() - inicio, str(response.status_code))
+                    limiter.registrar_uso(reservado, 0) # Requisição recusada não consome tokens
+
+            retry_after = ler_retry_after(response.headers) if response is not None else None
+            atraso = calcular_backoff(tentativa, retry_after)
+            if response is not None and response.status_code == 429:
+                limiter.pausar(atraso) # Os demais também esperam: evita uma tempestade de 429
+            if atraso > GROQ_MAX_WAIT:
+                raise LimiteExcedido(f"Retry-After de {atraso:.0f}s")
+            status = response.status_code if response is not None else "conexão"
+            print(f"LLMAgent (async Groq): Erro {status}, nova tentativa em {atraso:.1f}s ({tentativa + 1}/{GROQ_MAX_RETRIES}).")
+            limiter.stats["retentativas"] += 1
+            LLM_RETRIES.inc()
+            uso["retentativas"] = uso.get("retentativas", 0) + 1
+            tentativa += 1
+            await asyncio.sleep(atraso)
+
+    async def responder_stream(self, pergunta: str, context: Optional[List[str]] = None,
+                               uso: Optional[Dict[str, int]] = None, fallback: Optional[str] = None) -> AsyncIterator[str]:
+        """ Versão em streaming de `responder`: gera os pedaços (tokens) da resposta à medida que a Groq os envia.
+        Em caso de erro, gera a mesma mensagem amigável de `responder` (ou o `fallback`) se nada tiver sido enviado ainda.
+        `uso`, se fornecido, é preenchido com a contagem de tokens (ao fim do stream).
+        """
+        print(f"LLMAgent (async Groq stream): Recebida pergunta: '{pergunta[:50]}...'")
+        uso = {} if uso is None else uso
+
+        if context is None:
+            with span("llm.contexto"):
+                context = await self._fetch_context_from_db(pergunta)
+
+        prompt, uso_prompt = self._build_prompt(pergunta, context)
+        uso.update(uso_prompt)
+        payload = self._build_payload(prompt, stream=True, max_tokens=uso_prompt["max_tokens"])
+        enviou_algo = False
         try:
-            # Usa httpx.AsyncClient para chamada de rede assíncrona
-            async with httpx.AsyncClient(timeout=GROQ_TIMEOUT) as client:
-                print(f"LLMAgent (async Groq): Enviando requisição para Groq API ({GROQ_API_URL})...")
-                response = await client.post(GROQ_API_URL, json=payload, headers=headers)
+            async with self._requisicao_groq(payload, uso) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    print(f"LLMAgent (async Groq stream): Erro HTTP {response.status_code}: {response.text}")
+                    yield self._falha(self._mensagem_erro_http(response.status_code), fallback, uso)
+                    return
+                # Server-Sent Events no formato OpenAI: linhas "data: {json}" terminando em "data: [DONE]"
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    self._registrar_uso(uso, chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage"))
+                    choices = chunk.get("choices") or []
+                    delta = choices[0].get("delta", {}).get("content") if choices else None
+                    if delta:
+                        enviou_algo = True
+                        yield delta
+            print("LLMAgent (async Groq stream): Stream concluído.")
+        except LimiteExcedido as e:
+            print(f"LLMAgent (async Groq stream): Limite de requisições ({e}). {get_groq_limiter().resumo_stats()}")
+            if not enviou_algo:
+                yield self._falha(self._mensagem_erro_http(429), fallback, uso)
+        except httpx.TimeoutException:
+            print(f"LLMAgent (async Groq stream): Erro de Timeout ({GROQ_TIMEOUT}s) ao chamar a API Groq.")
+            if not enviou_algo:
+                yield self._falha("Desculpe, a solicitação ao modelo de linguagem demorou muito para responder.", fallback, uso)
+        except httpx.RequestError as e:
+            print(f"LLMAgent (async Groq stream): Erro de rede ao chamar a API Groq: {e}")
+            if not enviou_algo:
+                yield self._falha("Desculpe, houve um problema de comunicação ao tentar gerar a resposta (rede).", fallback, uso)
+        except json.JSONDecodeError:
+            print("LLMAgent (async Groq stream): Erro ao decodificar JSON do stream da API Groq.")
+            if not enviou_algo:
+                yield self._falha("Desculpe, recebi uma resposta inválida do serviço de linguagem.", fallback, uso)
+
+    async def responder(self, pergunta: str, context: Optional[List[str]] = None,
+                        uso: Optional[Dict[str, int]] = None, fallback: Optional[str] = None,
+                        prazo: Optional[float] = None) -> str:
+        """ Envia ASYNCRONAMENTE a pergunta para a API Groq e retorna a resposta.
+        `uso`, se fornecido, é preenchido com a contagem de tokens (estimada e reportada pela Groq).
+        `fallback`: resposta crua do DB servida (degradação) quando o LLM estiver indisponível.
+        `prazo`: segundos para a resposta completa (fila do limitador, retentativas e geração); ao estourar,
+        a chamada é cancelada e degrada como as demais falhas. Agentes temáticos passam um prazo menor que o
+        deles (ver `prazo_llm` em agents/registry.py), para que lentidão da Groq não vire timeout do agente.
+        """
+        uso = {} if uso is None else uso
+        if prazo is None:
+            return await self._responder(pergunta, context, uso, fallback)
+        try:
+            return await asyncio.wait_for(self._responder(pergunta, context, uso, fallback), timeout=prazo)
+        except asyncio.TimeoutError:
+            print(f"LLMAgent (async Groq): Prazo de {prazo:g}s esgotado (fila/retentativas/geração).")
+            return self._falha("Desculpe, a solicitação ao modelo de linguagem demorou muito para responder.", fallback, uso)
+
+    async def _responder(self, pergunta: str, context: Optional[List[str]], uso: Dict[str, int],
+                         fallback: Optional[str]) -> str:
+        print(f"LLMAgent (async Groq): Recebida pergunta: '{pergunta[:50]}...'")
+
+        if context is None:
+            print("LLMAgent (async Groq): Contexto não fornecido, buscando/filtrando no DB (pool async)...")
+            with span("llm.contexto"):
+                context = await self._fetch_context_from_db(pergunta)
+            # Se fetch_context_from_db retornar lista vazia, _build_prompt tratará disso
+
+        prompt, uso_prompt = self._build_prompt(pergunta, context)
+        uso.update(uso_prompt)
+        payload = self._build_payload(prompt, stream=False, max_tokens=uso_prompt["max_tokens"])
+
+        try:
+            # Usa o httpx.AsyncClient compartilhado (keep-alive/HTTP2), limitado e com retentativas
+            print(f"LLMAgent (async Groq): Enviando requisição para Groq API ({GROQ_API_URL})...")
+            async with self._requisicao_groq(payload, uso) as response:
+                await response.aread()
                 response.raise_for_status() # Lança exceção para erros HTTP (4xx ou 5xx)
 
-            response_data = response.json()
+                response_data = response.json()
+                self._registrar_uso(uso, response_data.get("usage"))
 
             # --- Extrai resposta do formato OpenAI Chat Completions ---
             if response_data.get("choices") and len(response_data["choices"]) > 0:
@@ -149,34 +352,41 @@ class LLMAgent:
                 else:
                     print("LLMAgent (async Groq): Resposta da API Groq não continha 'content' esperado.")
                     print(f"Resposta recebida: {response_data}") # Log para depuração
-                    return "Desculpe, o modelo retornou uma resposta em formato inesperado."
+                    return self._falha("Desculpe, o modelo retornou uma resposta em formato inesperado.", fallback, uso)
             else:
                 print("LLMAgent (async Groq): Resposta da API Groq não continha 'choices' esperado.")
                 print(f"Resposta recebida: {response_data}") # Log para depuração
-                return "Desculpe, o modelo não retornou nenhuma escolha de resposta."
+                return self._falha("Desculpe, o modelo não retornou nenhuma escolha de resposta.", fallback, uso)
             # -----------------------------------------------------------
 
+        except LimiteExcedido as e:
+            print(f"LLMAgent (async Groq): Limite de requisições ({e}). {get_groq_limiter().resumo_stats()}")
+            return self._falha(self._mensagem_erro_http(429), fallback, uso)
         except httpx.TimeoutException:
             print(f"LLMAgent (async Groq): Erro de Timeout ({GROQ_TIMEOUT}s) ao chamar a API Groq.")
-            return "Desculpe, a solicitação ao modelo de linguagem demorou muito para responder."
+            return self._falha("Desculpe, a solicitação ao modelo de linguagem demorou muito para responder.", fallback, uso)
         except httpx.RequestError as e:
             print(f"LLMAgent (async Groq): Erro de rede ao chamar a API Groq: {e}")
-            return "Desculpe, houve um problema de comunicação ao tentar gerar a resposta (rede)."
+            return self._falha("Desculpe, houve um problema de comunicação ao tentar gerar a resposta (rede).", fallback, uso)
         except httpx.HTTPStatusError as e:
             # Erro específico HTTP (4xx, 5xx)
             print(f"LLMAgent (async Groq): Erro HTTP {e.response.status_code} ao chamar a API Groq: {e.response.text}")
-            if e.response.status_code == 401:
-                 return "Desculpe, a chave de API fornecida para o serviço de linguagem é inválida."
-            elif e.response.status_code == 429:
-                 return "Desculpe, o limite de requisições para o serviço de linguagem foi atingido. Tente novamente mais tarde."
-            else:
-                 return f"Desculpe, o serviço de linguagem retornou um erro HTTP {e.response.status_code}."
+            return self._falha(self._mensagem_erro_http(e.response.status_code), fallback, uso)
         except json.JSONDecodeError:
             print("LLMAgent (async Groq): Erro ao decodificar JSON da resposta da API Groq.")
-            return "Desculpe, recebi uma resposta inválida do serviço de linguagem."
+            return self._falha("Desculpe, recebi uma resposta inválida do serviço de linguagem.", fallback, uso)
         except Exception as e:
             print(f"LLMAgent (async Groq): Erro inesperado na interação com LLM: {type(e).__name__} - {e}")
-            return "Desculpe, ocorreu um erro inesperado ao tentar gerar a resposta."
+            return self._falha("Desculpe, ocorreu um erro inesperado ao tentar gerar a resposta.", fallback, uso)
+
+_llm_agent: Optional[LLMAgent] = None
+
+def get_llm_agent() -> LLMAgent:
+    """ Retorna a instância compartilhada do LLMAgent (orquestrador e agentes usam a mesma). """
+    global _llm_agent
+    if _llm_agent is None:
+        _llm_agent = LLMAgent()
+    return _llm_agent
 
 # Exemplo de uso atualizado para async
 async def main_test_llm():
@@ -2,55 +2,65 @@ import sys
 import os
 import aiosqlite # Importa aiosqlite
 import asyncio # Necessário para o exemplo e async
-import sqlite3
 from typing import List, Optional, Dict, Any
 
 # Adiciona o diretório raiz ao sys.path para encontrar os módulos utils e agents
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-# utils.db_handler usa sqlite3, precisamos do path direto ou adaptar db_handler
-DB_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'db')
-DB_PATH = os.path.join(DB_DIR, 'lumia.db')
-
-# from utils.db_handler import create_connection, create_table # Não usaremos create_connection síncrono
-from agents.llm_agent import LLMAgent # Usaremos SEMPRE que achar algo no DB
+from utils.db_handler import create_connection, get_db_pool # Pool async compartilhado (leitura)
+from utils.corpus_store import preparar_corpus, registrar_pagina, inserir_paragrafo
+from agents.llm_agent import get_llm_agent # Refina os resultados de baixa confiança do DB
+from agents.registry import registrar_agente, prazo_llm
+from utils.fts_search import buscar_fts_async, calcular_confianca
+from utils.token_budget import resumo_uso
+from utils.tracing import anotar
 
 TABLE_NAME = "prape"
-
-# Instancia o LLM Agent (pode ser singleton)
-llm_agent = LLMAgent()
-
-async def _buscar_resposta_direta(pergunta: str) -> Optional[str]:
-    """ Tenta encontrar ASYNCRONAMENTE UMA resposta relevante no banco de dados. """
+# Acima desta confiança (0 a 1) o parágrafo do DB é devolvido direto, sem refinamento pelo LLM
+EXTRACTIVE_THRESHOLD = float(os.getenv("LUMIA_EXTRACTIVE_THRESHOLD", "0.7"))
+
+# Instância compartilhada do LLM Agent (a mesma do orquestrador)
+llm_agent = get_llm_agent()
+
+KEYWORDS = [
+    "prape", "moradia", "psicológico", "pedagógico", # Termos mais específicos da PRAPE
+    "restaurante universitário" # RU pode estar sob PRAPE?
+]
+# O refinamento pelo LLM (sem streaming) faz parte do tempo do agente, com prazo próprio menor: se a Groq
+# demorar, o agente devolve o parágrafo do DB (degradado) antes do próprio prazo
+PRAPE_TIMEOUT = float(os.getenv("LUMIA_PRAPE_TIMEOUT", "30"))
+PRAPE_LLM_PRAZO = prazo_llm(PRAPE_TIMEOUT)
+
+async def _buscar_resposta_direta(pergunta: str) -> Optional[Dict[str, Any]]:
+    """ Tenta encontrar ASYNCRONAMENTE a resposta mais relevante (BM25 via FTS5) no banco de dados.
+    :return: o melhor resultado (com `confianca` e seus componentes) ou None.
+    """
     resposta = None
     try:
-        # Conecta usando aiosqlite
-        async with aiosqlite.connect(DB_PATH) as conn:
-            conn.row_factory = aiosqlite.Row # Para acessar colunas por nome (opcional)
-            termo_busca = f"%{pergunta}%"
-            # Executa a busca async
-            async with conn.execute(f"SELECT resposta FROM {TABLE_NAME} WHERE resposta LIKE ? LIMIT 1", (termo_busca,)) as cursor:
-                resultado = await cursor.fetchone()
-                if resultado:
-                    resposta = resultado["resposta"]
-                else:
-                    # Tenta busca por palavras-chave
-                    palavras = [p for p in pergunta.split() if len(p) > 3]
-                    if palavras:
-                        like_clauses = " OR ".join(["resposta LIKE ?"] * len(palavras))
-                        params = [f"%{p}%" for p in palavras]
-                        async with conn.execute(f"SELECT resposta FROM {TABLE_NAME} WHERE {like_clauses} LIMIT 1", params) as cursor_kw:
-                            resultado_kw = await cursor_kw.fetchone()
-                            if resultado_kw:
-                                resposta = resultado_kw["resposta"]
+        # Usa uma conexão do pool compartilhado (aberto no startup da API)
+        async with get_db_pool().acquire() as conn:
+            # Busca ranqueada no índice FTS5: o primeiro resultado é o de melhor score BM25
+            # (o segundo só serve para medir a margem do primeiro na confiança)
+            resultados = await buscar_fts_async(conn, pergunta, k=2)
+            if resultados:
+                resposta = dict(resultados[0], **calcular_confianca(pergunta, resultados))
     except aiosqlite.Error as e:
         print(f"PRAEAgent (async): Erro ao buscar resposta direta: {e}")
     except Exception as e_generic:
          print(f"PRAEAgent (async): Erro genérico inesperado na busca DB: {e_generic}")
     return resposta
 
-async def responder_pergunta(pergunta: str) -> Optional[Dict[str, Any]]:
-    """ Busca ASYNCRONAMENTE uma resposta no DB. Se encontrar, refina com LLM e retorna dict. Se não encontrar, retorna None. """
+def _resumo_confianca(resultado: Dict[str, Any]) -> str:
+    return (f"confiança={resultado['confianca']:.2f}: cobertura={resultado['cobertura']:.2f} "
+            f"titulo={resultado['titulo']:.2f} margem={resultado['margem']:.2f} bm25={resultado['score']:.2f}")
+
+async def responder_pergunta(pergunta: str, stream: bool = False) -> Optional[Dict[str, Any]]:
+    """ Busca ASYNCRONAMENTE uma resposta no DB. Se encontrar, retorna dict: direto (extrativo) quando a confiança
+    do resultado passa de EXTRACTIVE_THRESHOLD, senão refinado pelo LLM. Se não encontrar, retorna None.
+    Com `stream=True`, o refinamento não é aguardado: o dict traz `answer_stream` (gerador de tokens do LLM).
+    """
+    answer_stream = None
+    uso_tokens = {} # Preenchido pelo LLMAgent (estimativa local + contagem reportada pela Groq)
     logs = [f"PRAEAgent (async): Recebida pergunta: '{pergunta[:50]}...'"]
     print(logs[-1])
 
@@ -61,17 +71,36 @@ async def responder_pergunta(pergunta: str) -> Optional[Dict[str, Any]]:
         # 1. Tenta buscar UMA resposta direta no DB (agora async)
         logs.append("PRAEAgent (async): Buscando resposta direta no DB...")
         print(logs[-1])
-        raw_answer_db = await _buscar_resposta_direta(pergunta)
-
-        if raw_answer_db:
+        resultado_db = await _buscar_resposta_direta(pergunta)
+        raw_answer_db = resultado_db["resposta"] if resultado_db else None
+
+        if resultado_db:
+            anotar(confianca=round(resultado_db["confianca"], 3))
+        if raw_answer_db and resultado_db["confianca"] >= EXTRACTIVE_THRESHOLD:
+            # Caminho extrativo: o parágrafo já responde a pergunta, sem chamada à Groq
+            logs.append(f"PRAEAgent (async): Caminho EXTRATIVO ({_resumo_confianca(resultado_db)} >= {EXTRACTIVE_THRESHOLD}).")
+            print(logs[-1])
+            final_answer = raw_answer_db
+            if resultado_db.get("url"):
+                final_answer += f"\n\nFonte: {resultado_db['url']}"
+        elif raw_answer_db:
             logs.append(f"PRAEAgent (async): Resposta encontrada no DB (primeiros 50 chars): {raw_answer_db[:50]}...")
             print(logs[-1])
-            logs.append("PRAEAgent (async): Refinando resposta com LLM...")
+            logs.append(f"PRAEAgent (async): Caminho LLM ({_resumo_confianca(resultado_db)} < {EXTRACTIVE_THRESHOLD}).")
             print(logs[-1])
-            # 2. Se encontrou, SEMPRE envia para o LLM refinar (LLM agora é async)
-            final_answer = await llm_agent.responder(pergunta, context=[raw_answer_db])
-            logs.append(f"PRAEAgent (async): Resposta refinada recebida do LLM (ou erro do LLM).")
+            logs.append("PRAEAgent (async): Refinando resposta com LLM...")
             print(logs[-1])
+            # 2. Confiança abaixo do limiar: envia para o LLM refinar (LLM agora é async)
+            if stream:
+                answer_stream = llm_agent.responder_stream(pergunta, context=[raw_answer_db], uso=uso_tokens,
+                                                           fallback=raw_answer_db)
+            else:
+                final_answer = await llm_agent.responder(pergunta, context=[raw_answer_db], uso=uso_tokens,
+                                                      fallback=raw_answer_db, # Degrada para o DB se o LLM cair
+                                                      prazo=PRAPE_LLM_PRAZO)
+                logs.append(f"PRAEAgent (async): Resposta refinada recebida do LLM (ou erro do LLM).")
+                print(logs[-1])
+                logs.append(resumo_uso(uso_tokens))
         else:
             # 3. Nenhuma resposta encontrada no DB
             logs.append("PRAEAgent (async): Nenhuma resposta encontrada no DB.")
@@ -94,20 +123,25 @@ async def responder_pergunta(pergunta: str) -> Optional[Dict[str, Any]]:
             "raw_answer": raw_answer_db,
             "logs": logs
         }
+        if uso_tokens:
+            result_dict["token_usage"] = uso_tokens
+        if uso_tokens.get("degradado"):
+            result_dict["degradado"] = True
+        if answer_stream is not None:
+            result_dict["answer_stream"] = answer_stream
+            result_dict["token_usage"] = uso_tokens # Completado quando o stream terminar
         print(f"PRAEAgent (async): Retornando dicionário: { {k: v if k != 'logs' else f'{len(v)} logs' for k, v in result_dict.items()} }")
         return result_dict
 
+registrar_agente("PRAPE", responder_pergunta, KEYWORDS, prioridade=40, timeout=PRAPE_TIMEOUT, aceita_stream=True)
+
 # Exemplo de uso atualizado para async
 async def main_test_prape():
     # --- Configurar DB (Síncrono, apenas para teste) ---
     try:
         # Usando sqlite3 síncrono só para popular o DB para o teste
-        conn_sync = sqlite3.connect(DB_PATH)
-        conn_sync.execute(""" CREATE TABLE IF NOT EXISTS prape (
-                                            id integer PRIMARY KEY,
-                                            pergunta text, 
-                                            resposta text NOT NULL UNIQUE
-                                        ); """)
+        conn_sync = create_connection()
+        preparar_corpus(conn_sync)
         test_data = [
             ("Auxílios", "Fixa os Valores dos Auxílios Estudantis da Pró-Reitoria de Assistência e Promoção ao Estudante"), 
             ("Auxílio Alimentação", "O Auxílio Alimentação destina-se a cobrir parte das despesas com refeições dos estudantes em vulnerabilidade socioeconômica comprovada. O valor atual é X."), 
@@ -115,10 +149,9 @@ async def main_test_prape():
             ("Contato PRAE", "Contato: email@exemplo.com, telefone (XX) XXXX-XXXX.") 
         ]
         for q, r in test_data:
-            try:
-                conn_sync.execute("INSERT INTO prape(pergunta, resposta) VALUES (?, ?)", (q, r))
-            except sqlite3.IntegrityError:
-                pass
+            page_id = registrar_pagina(conn_sync, f"teste://prape/{q}", q, [r])
+            if page_id is not None:
+                inserir_paragrafo(conn_sync, page_id, 0, r)
         conn_sync.commit()
         conn_sync.close()
     except Exception as db_setup_e:
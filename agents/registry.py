@@ -0,0 +1,195 @@
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Adiciona o diretório raiz ao sys.path para encontrar o módulo utils
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.keyword_matcher import KeywordMatcher
+from utils.metrics import AGENT_CALLS, AGENT_LATENCY
+from utils.tracing import span
+
+# --- Configuração padrão dos agentes registrados --- #
+AGENT_TIMEOUT = float(os.getenv("LUMIA_AGENT_TIMEOUT", "15")) # Prazo padrão por agente (segundos)
+BREAKER_FAILURES = int(os.getenv("LUMIA_BREAKER_FAILURES", "5")) # Falhas seguidas (erro/timeout) para abrir
+BREAKER_RESET = float(os.getenv("LUMIA_BREAKER_RESET", "30")) # Segundos aberto antes de testar de novo
+# Parte do prazo de um agente que chama o LLM reservada ao resto do trabalho (DB, montagem da resposta)
+AGENT_LLM_MARGIN = float(os.getenv("LUMIA_AGENT_LLM_MARGIN", "3"))
+
+def prazo_llm(timeout_agente: float) -> float:
+    """ Prazo para o LLM dentro do prazo do agente. O LLM esgota o dele primeiro e degrada para a resposta
+    do DB (`fallback`), então uma Groq lenta não vira timeout do agente nem conta como falha no disjuntor.
+    """
+    return max(timeout_agente / 2, timeout_agente - AGENT_LLM_MARGIN)
+
+class CircuitBreaker:
+    """ Disjuntor por agente: após BREAKER_FAILURES falhas seguidas fica "aberto" (o agente é pulado sem
+    ser chamado) por BREAKER_RESET segundos; depois deixa passar uma chamada de teste ("semiaberto"),
+    que fecha o disjuntor se der certo ou o reabre se falhar.
+    """
+
+    def __init__(self, falhas_para_abrir: int = BREAKER_FAILURES, tempo_aberto: float = BREAKER_RESET):
+        self.falhas_para_abrir = falhas_para_abrir
+        self.tempo_aberto = tempo_aberto
+        self.estado = "fechado"
+        self.falhas_seguidas = 0
+        self._aberto_em = 0.0
+
+    def permitir(self) -> bool:
+        if self.estado == "fechado":
+            return True
+        if self.estado == "aberto" and time.monotonic() - self._aberto_em >= self.tempo_aberto:
+            self.estado = "semiaberto" # Uma única chamada de teste
+            return True
+        return False
+
+    def registrar_sucesso(self):
+        self.estado = "fechado"
+        self.falhas_seguidas = 0
+
+    def cancelar_teste(self):
+        """ A chamada de teste foi cancelada sem resultado: a próxima chamada testa de novo. """
+        if self.estado == "semiaberto":
+            self.estado = "aberto"
+
+    def registrar_falha(self):
+        self.falhas_seguidas += 1
+        if self.estado == "semiaberto" or self.falhas_seguidas >= self.falhas_para_abrir:
+            self.estado = "aberto"
+            self._aberto_em = time.monotonic()
+
+class AgenteRegistrado:
+    """ Um agente temático: nome, palavras-chave, prioridade (menor = mais prioritário), prazo e a função que responde. """
+
+    def __init__(self, nome: str, responder: Callable[..., Awaitable[Optional[Dict[str, Any]]]],
+                 keywords: List[str], prioridade: int, timeout: Optional[float] = None, aceita_stream: bool = False):
+        self.nome = nome
+        self.responder = responder
+        self.keywords = keywords
+        self.prioridade = prioridade
+        self.timeout = AGENT_TIMEOUT if timeout is None else timeout
+        self.aceita_stream = aceita_stream # responder(pergunta, stream=...) em vez de responder(pergunta)
+        self.breaker = CircuitBreaker()
+        self.stats = {"chamadas": 0, "respostas": 0, "vazias": 0, "erros": 0, "timeouts": 0,
+                      "puladas_breaker": 0, "latencia_total_ms": 0.0, "latencia_max_ms": 0.0}
+
+    def saude(self) -> Dict[str, Any]:
+        """ Latência, taxa de acerto e de erro do agente, e o estado do disjuntor. """
+        s = self.stats
+        chamadas = s["chamadas"]
+        return {
+            "prioridade": self.prioridade,
+            "timeout_s": self.timeout,
+            "breaker": self.breaker.estado,
+            **s,
+            "latencia_media_ms": s["latencia_total_ms"] / chamadas if chamadas else 0.0,
+            "taxa_acerto": s["respostas"] / chamadas if chamadas else 0.0,
+            "taxa_erro": (s["erros"] + s["timeouts"]) / chamadas if chamadas else 0.0,
+        }
+
+class AgentRegistry:
+    """ Registro dos agentes temáticos. O orquestrador ranqueia os agentes pelas palavras-chave declaradas
+    e chama cada um via `chamar` (prazo + disjuntor + estatísticas). Novos agentes só precisam se registrar.
+    """
+
+    def __init__(self):
+        self._agentes: Dict[str, AgenteRegistrado] = {}
+        self._matcher: Optional[KeywordMatcher] = None
+
+    def registrar(self, nome: str, responder: Callable[..., Awaitable[Optional[Dict[str, Any]]]],
+                  keywords: List[str], prioridade: int, timeout: Optional[float] = None,
+                  aceita_stream: bool = False) -> AgenteRegistrado:
+        agente = AgenteRegistrado(nome, responder, keywords, prioridade, timeout, aceita_stream)
+        self._agentes[nome] = agente
+        self._matcher = None # Recompilado no próximo ranqueamento
+        return agente
+
+    @property
+    def agentes(self) -> List[AgenteRegistrado]:
+        return sorted(self._agentes.values(), key=lambda a: a.prioridade)
+
+    def get(self, nome: str) -> Optional[AgenteRegistrado]:
+        return self._agentes.get(nome)
+
+    def ranquear(self, pergunta: str) -> List[tuple]:
+        """ [(agente, pontuação)] dos agentes cujas palavras-chave aparecem na pergunta: maior pontuação
+        primeiro, prioridade como desempate. Uma única passada de regex sobre a pergunta.
+        """
+        if self._matcher is None:
+            self._matcher = KeywordMatcher({a.nome: a.keywords for a in self.agentes})
+        return [(self._agentes[nome], pontos) for nome, pontos in self._matcher.pontuar(pergunta)]
+
+    async def chamar(self, agente: AgenteRegistrado, pergunta: str, stream: bool = False) -> Optional[Dict[str, Any]]:
+        """ Chama o agente com prazo e disjuntor. Timeout, erro ou disjuntor aberto contam como "sem resposta". """
+        if not agente.breaker.permitir():
+            agente.stats["puladas_breaker"] += 1
+            AGENT_CALLS.inc(agente.nome, "disjuntor")
+            print(f"Orchestrator: Agente {agente.nome} pulado (disjuntor aberto).")
+            return None
+
+        print(f"Orchestrator: Roteando para Agente {agente.nome}.")
+        agente.stats["chamadas"] += 1
+        inicio = time.perf_counter()
+        resultado = None
+        falhou = True
+        desfecho = "erro"
+        with span(f"agente.{agente.nome}", timeout_s=agente.timeout) as trace_span:
+            try:
+                chamada = agente.responder(pergunta, stream=stream) if agente.aceita_stream else agente.responder(pergunta)
+                resultado = await asyncio.wait_for(chamada, timeout=agente.timeout)
+                falhou = False
+                desfecho = "resposta" if resultado else "vazia"
+                agente.breaker.registrar_sucesso()
+            except asyncio.TimeoutError:
+                agente.stats["timeouts"] += 1
+                desfecho = "timeout"
+                agente.breaker.registrar_falha()
+                print(f"Orchestrator: Agente {agente.nome} excedeu o prazo de {agente.timeout:g}s. Prosseguindo...")
+            except asyncio.CancelledError:
+                agente.breaker.cancelar_teste() # Cancelado pelo fan-out (outro agente venceu): não é falha do agente
+                desfecho = "cancelada"
+                raise
+            except Exception as e:
+                agente.stats["erros"] += 1
+                agente.breaker.registrar_falha()
+                print(f"Orchestrator: Agente {agente.nome} falhou ({type(e).__name__}: {e}). Prosseguindo...")
+            finally:
+                latencia_ms = (time.perf_counter() - inicio) * 1000
+                agente.stats["latencia_total_ms"] += latencia_ms
+                agente.stats["latencia_max_ms"] = max(agente.stats["latencia_max_ms"], latencia_ms)
+                AGENT_LATENCY.observe(latencia_ms / 1000, agente.nome)
+                if falhou:
+                    AGENT_CALLS.inc(agente.nome, desfecho)
+                if trace_span is not None:
+                    trace_span.atributos["resultado"] = desfecho
+
+        if resultado:
+            agente.stats["respostas"] += 1
+            AGENT_CALLS.inc(agente.nome, "resposta")
+            resultado.setdefault("agente", agente.nome)
+            return resultado
+        if not falhou:
+            agente.stats["vazias"] += 1
+            AGENT_CALLS.inc(agente.nome, "vazia")
+            print(f"Orchestrator: Agente {agente.nome} não encontrou resposta. Prosseguindo...")
+        return None
+
+    def saude(self) -> Dict[str, Dict[str, Any]]:
+        return {agente.nome: agente.saude() for agente in self.agentes}
+
+_registry: Optional[AgentRegistry] = None
+
+def get_agent_registry() -> AgentRegistry:
+    """ Retorna o registro compartilhado do processo. """
+    global _registry
+    if _registry is None:
+        _registry = AgentRegistry()
+    return _registry
+
+def registrar_agente(nome: str, responder: Callable[..., Awaitable[Optional[Dict[str, Any]]]],
+                     keywords: List[str], prioridade: int, timeout: Optional[float] = None,
+                     aceita_stream: bool = False) -> AgenteRegistrado:
+    """ Atalho usado pelos módulos de agentes para se declararem no registro compartilhado. """
+    return get_agent_registry().registrar(nome, responder, keywords, prioridade, timeout, aceita_stream)
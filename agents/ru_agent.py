@@ -1,14 +1,141 @@
 import sys
 import os
-from typing import Optional, Dict, Any
+import re
+import time
+from datetime import date, timedelta
+from typing import Optional, Dict, Any, List, Tuple
 import asyncio
 
-# Adiciona o diretório raiz ao sys.path se necessário
-# sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+# Adiciona o diretório raiz ao sys.path para encontrar o registro de agentes
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-# Exemplo: Se precisar do LLMAgent futuramente
-# from agents.llm_agent import LLMAgent
-# llm_agent = LLMAgent()
+from agents.registry import registrar_agente
+from utils.corpus_watcher import registrar_recarga, ler_versao_corpus
+from utils.data_local import hoje
+from utils.db_handler import get_db_pool
+from utils.text_normalizer import normalizar
+
+# Palavras-chave que direcionam perguntas a este agente (ver orchestrator/router.py)
+KEYWORDS = [
+    "ru", "restaurante universitário", "cardápio", "refeição", "créditos ru",
+    "bandejão", "preço ru", "horário ru", "almoço", "jantar", "café da manhã"
+]
+
+# --- Cache do RU (tabelas ru_cardapio/ru_info, ver scrapers/ru_ingest.py) --- #
+RU_CACHE_TTL = float(os.getenv("LUMIA_RU_CACHE_TTL", "600")) # Segundos até recarregar do DB
+RU_CACHE_RETRY = float(os.getenv("LUMIA_RU_CACHE_RETRY", "30")) # Após uma recarga com erro
+RU_CACHE_DIAS = 7 # Cardápios carregados: de ontem até RU_CACHE_DIAS dias à frente
+
+REFEICOES = {"cafe": "Café da manhã", "almoco": "Almoço", "jantar": "Jantar"}
+DIAS_SEMANA = ["segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo"]
+
+# Padrões sobre o texto normalizado (minúsculas, sem acentos)
+_REFEICAO_RE = {
+    "cafe": re.compile(r"\b(cafe|desjejum)\b"),
+    "almoco": re.compile(r"\balmoco\b"),
+    "jantar": re.compile(r"\bjanta(r)?\b"),
+}
+_TOPICOS_RE = {
+    "preco": re.compile(r"\b(preco|precos|valor|custa|custo|pagar|paga)\b"),
+    "horario": re.compile(r"\b(horario|horarios|que horas|abre|fecha|funciona|funcionamento)\b"),
+    "localizacao": re.compile(r"\b(onde fica|endereco|localizacao|onde e)\b"),
+    "creditos": re.compile(r"\b(credito|creditos|recarga|recarregar|cartao)\b"),
+    "regras": re.compile(r"\b(visitante|visitantes|acesso|regra|regras|pode comer)\b"),
+}
+_CARDAPIO_RE = re.compile(r"\b(cardapio|menu|comida|prato|pratos|o que tem|o que vai ter|servido)\b")
+_DATA_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+_DIA_SEMANA_RE = re.compile(r"\b(" + "|".join(DIAS_SEMANA) + r")\b")
+
+def extrair_data(texto: str, referencia: date) -> Tuple[date, bool]:
+    """ Data pedida no texto normalizado: hoje/amanhã/ontem, dia da semana (próxima ocorrência) ou dd/mm[/aaaa].
+    :return: (data, mencionada) - sem menção, hoje.
+    """
+    if re.search(r"\bamanha\b", texto):
+        return referencia + timedelta(days=1), True
+    if re.search(r"\bontem\b", texto):
+        return referencia - timedelta(days=1), True
+    match = _DATA_RE.search(texto)
+    if match:
+        dia, mes, ano = int(match.group(1)), int(match.group(2)), match.group(3)
+        ano = referencia.year if ano is None else (int(ano) + 2000 if len(ano) == 2 else int(ano))
+        try:
+            return date(ano, mes, dia), True
+        except ValueError:
+            pass
+    match = _DIA_SEMANA_RE.search(texto)
+    if match:
+        return referencia + timedelta(days=(DIAS_SEMANA.index(match.group(1)) - referencia.weekday()) % 7), True
+    return referencia, bool(re.search(r"\bhoje\b", texto))
+
+class CardapioCache:
+    """ Cardápios (por data e refeição) e informações do RU em memória. Carregado do DB na primeira
+    pergunta (ou no startup); depois a recarga periódica (utils/corpus_watcher.py) o atualiza quando o
+    corpus muda, após RU_CACHE_TTL segundos e na virada do dia, enquanto as perguntas continuam sendo
+    respondidas com os dados atuais. Uma recarga com erro mantém os dados anteriores e é repetida após
+    RU_CACHE_RETRY segundos.
+    """
+
+    def __init__(self, ttl: float = RU_CACHE_TTL, retry: float = RU_CACHE_RETRY):
+        self.ttl = ttl
+        self.retry = retry
+        self.cardapio: Dict[Tuple[str, str], List[str]] = {}
+        self.info: Dict[str, Tuple[str, str]] = {}
+        self._carregado_em: Optional[float] = None
+        self._carregado_para: Optional[date] = None
+        self._versao: Optional[str] = None # Versão do corpus na última carga
+        self._falhou_em: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.disponivel = False # As tabelas existem no DB
+
+    async def recarregar(self, versao: Optional[str] = None) -> bool:
+        """ Lê o cardápio (de ontem a RU_CACHE_DIAS dias à frente) e as informações do RU.
+        :return: False se a leitura falhou (os dados anteriores são mantidos).
+        """
+        async with self._lock:
+            inicio = hoje() - timedelta(days=1)
+            fim = inicio + timedelta(days=RU_CACHE_DIAS + 1)
+            pool = get_db_pool()
+            try:
+                rows = await pool.fetchall("SELECT data, refeicao, itens FROM ru_cardapio WHERE data BETWEEN ? AND ?",
+                                           (inicio.isoformat(), fim.isoformat()))
+                infos = await pool.fetchall("SELECT topico, titulo, valor FROM ru_info")
+            except Exception as e: # Tabelas ainda não criadas (ru_ingest nunca rodou), banco ocupado...
+                self._falhou_em = time.monotonic()
+                print(f"RUAgent: Dados do RU indisponíveis ({e}); mantendo os atuais e tentando de novo em {self.retry:g}s.")
+                return False
+            self.cardapio = {(data, refeicao): [i for i in itens.splitlines() if i.strip()] for data, refeicao, itens in rows}
+            self.info = {topico: (titulo, valor) for topico, titulo, valor in infos}
+            self.disponivel = True
+            self._carregado_em = time.monotonic()
+            self._carregado_para = inicio + timedelta(days=1)
+            self._versao = versao
+            self._falhou_em = None
+            print(f"RUAgent: Cache recarregado ({len(self.cardapio)} refeições, {len(self.info)} tópicos).")
+            return True
+
+    def vencido(self, versao: Optional[str]) -> bool:
+        """ O cache precisa ser recarregado: corpus mudou (ru_ingest), TTL, virada do dia ou erro na última carga. """
+        agora = time.monotonic()
+        if self._falhou_em is not None:
+            return agora - self._falhou_em >= self.retry
+        if self._carregado_em is None:
+            return True
+        return (versao != self._versao or agora - self._carregado_em >= self.ttl
+                or self._carregado_para != hoje())
+
+    async def atualizar(self, versao: Optional[str]):
+        """ Recarga periódica, chamada pelo CorpusWatcher a cada verificação da versão do corpus. """
+        if self.vencido(versao):
+            await self.recarregar(versao)
+
+    async def garantir(self):
+        """ Primeira carga, aguardada pela pergunta; as seguintes são da recarga periódica. """
+        if self._carregado_em is None and self.vencido(None):
+            try:
+                versao = await ler_versao_corpus()
+            except Exception:
+                versao = None
+            await self.recarregar(versao)
 
 class RUAgent:
     """
@@ -17,23 +144,64 @@ class RUAgent:
 
     Escopo: Cardápio do dia/semana, horários de funcionamento, localização,
             preços, regras de acesso, compra de créditos.
-    Fonte Esperada: Banco de dados com informações do site/sistema do RU, 
-                    ou API específica do RU.
+    Fonte: tabelas `ru_cardapio` e `ru_info` (scrapers/ru_ingest.py), servidas de um
+           cache em memória; respostas montadas sem LLM.
     """
 
+    def __init__(self):
+        self.cache = CardapioCache()
+
     async def responder_pergunta(self, pergunta: str) -> Optional[Dict[str, Any]]:
-        """ Tenta responder a pergunta sobre o RU. (Não implementado) """
-        print(f"RUAgent: Recebida pergunta (não implementado): '{pergunta[:50]}...'")
-        # logs = [f"RUAgent: Recebida pergunta: '{pergunta[:50]}...'"]
+        """ Responde perguntas estruturadas (cardápio, preço, horário...) direto do cache.
+        Retorna None se a pergunta não for sobre nenhum desses tópicos.
+        """
+        inicio = time.perf_counter()
+        logs = [f"RUAgent: Recebida pergunta: '{pergunta[:50]}...'"]
+        print(logs[-1])
+        await self.cache.garantir()
+        if not self.cache.disponivel:
+            return None
+        texto = normalizar(pergunta)
 
-        # TODO: Implementar lógica de busca contextual específica do RU
-        # Ex: buscar cardápio na tabela `ru_cardapio`, verificar horários em `ru_info`
+        topicos = [topico for topico, regex in _TOPICOS_RE.items() if regex.search(texto)]
+        if topicos:
+            partes = [f"{self.cache.info[t][0]}: {self.cache.info[t][1]}" for t in topicos if t in self.cache.info]
+            if not partes:
+                logs.append(f"RUAgent: Sem informação cadastrada para {', '.join(topicos)}.")
+                print(logs[-1])
+                return None
+            answer = "\n".join(partes)
+            logs.append(f"RUAgent: Informação do RU ({', '.join(topicos)}).")
+        else:
+            refeicoes = [r for r, regex in _REFEICAO_RE.items() if regex.search(texto)]
+            dia, data_mencionada = extrair_data(texto, hoje())
+            if not (refeicoes or data_mencionada or _CARDAPIO_RE.search(texto)):
+                logs.append("RUAgent: Pergunta não é sobre cardápio, preço, horário, local ou créditos.")
+                print(logs[-1])
+                return None
+            answer = self._montar_cardapio(dia, refeicoes or list(REFEICOES))
+            logs.append(f"RUAgent: Cardápio de {dia.isoformat()} ({', '.join(refeicoes) or 'todas as refeições'}).")
 
-        # TODO: Se encontrar info, refinar com LLM? (llm_agent.responder)
+        logs.append(f"RUAgent: Respondido do cache em {(time.perf_counter() - inicio) * 1000:.3f} ms (sem LLM).")
+        print(logs[-1])
+        # Depende da data e dos dados do dia: não vai para o cache de respostas
+        return {"answer": answer, "raw_answer": answer, "logs": logs, "cacheavel": False}
 
-        # TODO: Retornar dicionário com 'answer', 'raw_answer', 'logs' ou None
+    def _montar_cardapio(self, dia: date, refeicoes: List[str]) -> str:
+        data_fmt = dia.strftime("%d/%m/%Y")
+        partes = []
+        for refeicao in refeicoes:
+            itens = self.cache.cardapio.get((dia.isoformat(), refeicao))
+            if itens:
+                partes.append(f"{REFEICOES[refeicao]}:\n" + "\n".join(f"- {item}" for item in itens))
+        if not partes:
+            nomes = ", ".join(REFEICOES[r].lower() for r in refeicoes)
+            return f"O cardápio do RU para {data_fmt} ({nomes}) ainda não foi publicado."
+        return f"Cardápio do RU em {data_fmt} ({DIAS_SEMANA[dia.weekday()]}):\n\n" + "\n\n".join(partes)
 
-        return None  # Retorna None indicando que não pode responder ainda
+ru_agent = RUAgent()
+registrar_agente("RU", ru_agent.responder_pergunta, KEYWORDS, prioridade=20)
+registrar_recarga("RU", ru_agent.cache.atualizar)
 
 # Exemplo de uso (para teste futuro)
 # async def main_test_ru():
@@ -1,14 +1,31 @@
 import sys
 import os
-from typing import Optional, Dict, Any
-import asyncio # Pode ser útil para futuras implementações async
+import time
+from typing import Optional, Dict, Any, List
+import asyncio
 
-# Adiciona o diretório raiz ao sys.path se necessário para futuros imports
-# sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+# Adiciona o diretório raiz ao sys.path para encontrar o registro de agentes
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-# Exemplo: Se precisar do LLMAgent futuramente
-# from agents.llm_agent import LLMAgent
-# llm_agent = LLMAgent()
+from agents.registry import registrar_agente
+from utils.corpus_watcher import registrar_recarga, ler_versao_corpus
+from utils.db_handler import get_db_pool
+from utils.keyword_matcher import KeywordMatcher
+
+# Palavras-chave que direcionam perguntas a este agente (ver orchestrator/router.py)
+KEYWORDS = [
+    "sigaa", "matrícula", "disciplina", "histórico", "nota", "trancamento",
+    "atestado", "declaração", "documento acadêmico", "cra", "período letivo",
+    # "ira" sozinho não: o matcher ignora acentos e casaria o verbo "irá"
+    "índice de rendimento", "ira do aluno", "meu ira", "portal discente"
+]
+
+# --- Escolha do procedimento --- #
+# Cada gatilho encontrado vale o número de palavras dele (ver KeywordMatcher.pontuar). Um único gatilho de
+# uma palavra ("nota", "documento") não basta para devolver um passo a passo inteiro, nem um empate com o
+# segundo procedimento: nesses casos a pergunta segue para o LLM fallback
+SIGAA_MIN_PONTOS = float(os.getenv("LUMIA_SIGAA_MIN_PONTOS", "2"))
+SIGAA_MIN_MARGEM = float(os.getenv("LUMIA_SIGAA_MIN_MARGEM", "1")) # Vantagem mínima sobre o 2º colocado
 
 class SIGAAAgent:
     """ 
@@ -17,22 +34,92 @@ class SIGAAAgent:
 
     Escopo: Matrícula, disciplinas, notas, histórico, trancamento, atestados, 
             documentos acadêmicos via SIGAA.
-    Fonte Esperada: Banco de dados com informações extraídas do SIGAA (ou API futura).
+    Fonte: tabela `sigaa_content` (scrapers/sigaa_ingest.py). No startup os procedimentos são
+           carregados em memória com as respostas passo a passo já montadas e um único matcher
+           sobre os gatilhos, recarregados quando a versão do corpus muda (utils/corpus_watcher.py);
+           perguntas sem procedimento correspondente seguem para o LLM fallback.
     """
 
-    async def responder_pergunta(self, pergunta: str) -> Optional[Dict[str, Any]]:
-        """ Tenta responder a pergunta sobre o SIGAA. (Não implementado) """
-        print(f"SIGAAAgent: Recebida pergunta (não implementado): '{pergunta[:50]}...'")
-        # logs = [f"SIGAAAgent: Recebida pergunta: '{pergunta[:50]}...'"]
+    def __init__(self):
+        self.respostas: Dict[str, str] = {} # procedimento -> resposta pronta
+        self.titulos: Dict[str, str] = {}
+        self.matcher: Optional[KeywordMatcher] = None
+        self.versao: Optional[str] = None # Versão do corpus dos procedimentos em memória
+        self._carga_lock = asyncio.Lock()
 
-        # TODO: Implementar lógica de busca contextual específica do SIGAA
-        # Ex: buscar em tabela `sigaa_content`, chamar API do SIGAA se existir
+    async def carregar(self, versao: Optional[str] = None, forcar: bool = False):
+        """ Lê os procedimentos e pré-computa as respostas e o índice gatilho -> procedimento (idempotente,
+        salvo com `forcar`). Se a leitura falhar, os procedimentos atuais continuam valendo.
+        """
+        async with self._carga_lock:
+            if self.matcher is not None and not forcar:
+                return
+            try:
+                if versao is None:
+                    versao = await ler_versao_corpus()
+                rows = await get_db_pool().fetchall(
+                    "SELECT procedimento, titulo, gatilhos, passos, observacoes, url FROM sigaa_content ORDER BY id")
+            except Exception as e: # Tabela ainda não criada (scrapers/sigaa_ingest.py nunca rodou)
+                print(f"SIGAAAgent: Procedimentos indisponíveis ({e}).")
+                if self.matcher is None:
+                    self.matcher = KeywordMatcher({})
+                return
+            gatilhos: Dict[str, List[str]] = {}
+            titulos: Dict[str, str] = {}
+            respostas: Dict[str, str] = {}
+            for procedimento, titulo, texto_gatilhos, passos, observacoes, url in rows:
+                gatilhos[procedimento] = [titulo] + [g for g in texto_gatilhos.splitlines() if g.strip()]
+                titulos[procedimento] = titulo
+                respostas[procedimento] = _montar_resposta(titulo, passos, observacoes, url)
+            self.titulos, self.respostas, self.matcher = titulos, respostas, KeywordMatcher(gatilhos)
+            self.versao = versao
+            print(f"SIGAAAgent: {len(self.respostas)} procedimentos carregados (corpus {versao}).")
+
+    async def atualizar(self, versao: Optional[str]):
+        """ Recarga periódica: o sigaa_ingest gravou procedimentos novos, ou a carga anterior veio vazia. """
+        if versao != self.versao or not self.respostas:
+            await self.carregar(versao, forcar=True)
+
+    async def responder_pergunta(self, pergunta: str) -> Optional[Dict[str, Any]]:
+        """ Responde com o procedimento cujos gatilhos melhor casam com a pergunta, sem LLM. """
+        inicio = time.perf_counter()
+        logs = [f"SIGAAAgent: Recebida pergunta: '{pergunta[:50]}...'"]
+        print(logs[-1])
+        if self.matcher is None:
+            await self.carregar()
+        if not self.respostas:
+            return None
 
-        # TODO: Se encontrar info, refinar com LLM? (llm_agent.responder)
+        ranking = self.matcher.pontuar(pergunta)
+        if not ranking:
+            logs.append("SIGAAAgent: Nenhum procedimento corresponde à pergunta.")
+            print(logs[-1])
+            return None
+        procedimento, pontos = ranking[0]
+        margem = pontos - ranking[1][1] if len(ranking) > 1 else pontos
+        if pontos < SIGAA_MIN_PONTOS or margem < SIGAA_MIN_MARGEM:
+            logs.append(f"SIGAAAgent: Correspondência fraca ou ambígua ({', '.join(f'{p}={n:g}' for p, n in ranking[:3])}).")
+            print(logs[-1])
+            return None
+        logs.append(f"SIGAAAgent: Procedimento '{procedimento}' (pontos={pontos:g}"
+                    + (f"; também: {', '.join(p for p, _ in ranking[1:3])}" if len(ranking) > 1 else "") + ").")
+        logs.append(f"SIGAAAgent: Resposta pré-computada em {(time.perf_counter() - inicio) * 1000:.3f} ms (sem LLM).")
+        print(logs[-1])
+        answer = self.respostas[procedimento]
+        return {"answer": answer, "raw_answer": answer, "logs": logs}
 
-        # TODO: Retornar dicionário com 'answer', 'raw_answer', 'logs' ou None
+def _montar_resposta(titulo: str, passos: str, observacoes: Optional[str], url: Optional[str]) -> str:
+    linhas = [f"{titulo}:", ""]
+    linhas += [f"{i}. {passo.strip()}" for i, passo in enumerate((p for p in passos.splitlines() if p.strip()), 1)]
+    if observacoes:
+        linhas += ["", observacoes.strip()]
+    if url:
+        linhas += ["", f"Fonte: {url}"]
+    return "\n".join(linhas)
 
-        return None  # Retorna None indicando que não pode responder ainda
+sigaa_agent = SIGAAAgent()
+registrar_agente("SIGAA", sigaa_agent.responder_pergunta, KEYWORDS, prioridade=10)
+registrar_recarga("SIGAA", sigaa_agent.atualizar)
 
 # Exemplo de uso (para teste futuro)
 # async def main_test_sigaa():
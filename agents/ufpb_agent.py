@@ -1,14 +1,31 @@
 import sys
 import os
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, List
 import asyncio
 
-# Adiciona o diretório raiz ao sys.path se necessário
-# sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+# Adiciona o diretório raiz ao sys.path para encontrar o registro de agentes
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-# Exemplo: Se precisar do LLMAgent futuramente
-# from agents.llm_agent import LLMAgent
-# llm_agent = LLMAgent()
+from agents.registry import registrar_agente
+from utils.corpus_watcher import registrar_recarga, ler_versao_corpus
+from utils.db_handler import get_db_pool
+from utils.fts_search import buscar_fts_em_paginas_async, calcular_confianca
+from utils.title_index import TitleIndex, separar_titulo, termos
+from utils.tracing import span, anotar
+
+# Palavras-chave que direcionam perguntas a este agente (ver orchestrator/router.py)
+KEYWORDS = [ # Palavras gerais, menos específicas
+    "ufpb", "universidade federal da paraíba", "reitoria", "pró-reitoria",
+    "campus", "centro de ensino", "biblioteca", "departamento", "curso",
+    "contato", "endereço", "notícia", "evento", "calendário acadêmico"
+]
+
+# --- Busca em duas etapas: páginas candidatas (títulos/seções) -> parágrafos dessas páginas --- #
+UFPB_CANDIDATE_PAGES = int(os.getenv("LUMIA_UFPB_CANDIDATE_PAGES", "5"))
+UFPB_PASSAGES = 3 # Trechos devolvidos na resposta
+UFPB_MIN_COBERTURA = float(os.getenv("LUMIA_UFPB_MIN_COBERTURA", "0.8")) # Fração dos termos da pergunta no melhor trecho
+PASSAGE_MAX_CHARS = 500
 
 class UFPBAgent:
     """
@@ -17,23 +34,110 @@ class UFPBAgent:
 
     Escopo: Informações institucionais gerais, estrutura da UFPB, centros, 
             pró-reitorias (visão geral), notícias, eventos, contatos gerais.
-    Fonte Esperada: Banco de dados com conteúdo geral do site www.ufpb.br 
-                    (excluindo as áreas já cobertas pelos outros agentes).
+    Fonte: páginas do www.ufpb.br rastreadas pelo scraper (pages/paragraphs, view `prape`).
+           Um índice de títulos/seções em memória escolhe as páginas candidatas e o BM25 (FTS5)
+           ranqueia só os parágrafos delas; a resposta são os melhores trechos com a página de origem.
+           O índice é reconstruído quando a versão do corpus muda (novo scraping, utils/corpus_watcher.py).
     """
 
+    def __init__(self):
+        self.indice = TitleIndex()
+        self.versao: Optional[str] = None # Versão do corpus do índice em memória
+        self._carregado = False
+        self._carga_lock = asyncio.Lock()
+
+    async def carregar(self, versao: Optional[str] = None, forcar: bool = False):
+        """ Monta o índice de títulos a partir da tabela `pages` (idempotente, salvo com `forcar`). O índice
+        novo substitui o anterior de uma vez; se a leitura falhar, o atual continua valendo.
+        """
+        async with self._carga_lock:
+            if self._carregado and not forcar:
+                return
+            try:
+                if versao is None:
+                    versao = await ler_versao_corpus()
+                # Páginas sem parágrafos (todos deduplicados em outras) não têm o que responder
+                paginas = await get_db_pool().fetchall(""" SELECT id, title, url FROM pages
+                                                           WHERE EXISTS (SELECT 1 FROM paragraphs WHERE page_id = pages.id) """)
+            except Exception as e: # Corpus ainda não migrado para pages/paragraphs
+                print(f"UFPBAgent: Páginas indisponíveis ({e}).")
+                self._carregado = True
+                return
+            indice = TitleIndex()
+            indice.construir(paginas)
+            self.indice = indice
+            self.versao = versao
+            self._carregado = True
+            print(f"UFPBAgent: Índice de títulos com {len(paginas)} páginas (corpus {versao}).")
+
+    async def atualizar(self, versao: Optional[str]):
+        """ Recarga periódica: o scraper inseriu/removeu páginas, ou a carga anterior veio vazia. """
+        if versao != self.versao or not self.indice.paginas:
+            await self.carregar(versao, forcar=True)
+
     async def responder_pergunta(self, pergunta: str) -> Optional[Dict[str, Any]]:
-        """ Tenta responder a pergunta geral sobre a UFPB. (Não implementado) """
-        print(f"UFPBAgent: Recebida pergunta (não implementado): '{pergunta[:50]}...'")
-        # logs = [f"UFPBAgent: Recebida pergunta: '{pergunta[:50]}...'"]
+        """ Responde com os trechos mais relevantes das páginas cujo título/seção casa com a pergunta. """
+        inicio = time.perf_counter()
+        logs = [f"UFPBAgent: Recebida pergunta: '{pergunta[:50]}...'"]
+        print(logs[-1])
+        if not self._carregado:
+            await self.carregar()
+
+        indice = self.indice # A recarga troca o índice; esta pergunta usa o mesmo do início ao fim
+        with span("ufpb.titulos"):
+            candidatas = indice.candidatas(pergunta, UFPB_CANDIDATE_PAGES)
+            anotar(candidatas=len(candidatas))
+        if not candidatas:
+            logs.append("UFPBAgent: Nenhuma página com título/seção relacionado.")
+            print(logs[-1])
+            return None
+        logs.append(f"UFPBAgent: {len(candidatas)} páginas candidatas: "
+                    + ", ".join(f"{page_id} ({pontos:.2f})" for page_id, pontos in candidatas))
+        print(logs[-1])
+
+        async with get_db_pool().acquire() as conn:
+            trechos = await buscar_fts_em_paginas_async(conn, pergunta, [page_id for page_id, _ in candidatas],
+                                                        k=UFPB_PASSAGES)
+        # Sem LLM, um trecho que não contém um termo raro da pergunta responde outra coisa (campus II para
+        # uma pergunta sobre o campus IV): esses trechos saem antes de medir a cobertura
+        raros = indice.termos_raros(pergunta)
+        trechos = [t for t in trechos if self._cobre(indice, t, raros)]
+        confianca = calcular_confianca(pergunta, trechos)
+        if not trechos or confianca["cobertura"] < UFPB_MIN_COBERTURA:
+            logs.append(f"UFPBAgent: Trechos insuficientes (cobertura={confianca['cobertura']:.2f}, "
+                        f"termos raros: {', '.join(raros) or 'nenhum'}).")
+            print(logs[-1])
+            return None
 
-        # TODO: Implementar lógica de busca contextual na tabela geral do site
-        # Ex: buscar em `ufpb_content` (ou na tabela `prape` se tudo foi salvo lá)
+        passagens = [self._passagem(indice, t) for t in trechos]
+        answer = "Encontrei isto nas páginas da UFPB:\n\n" + "\n\n".join(
+            f"{p['texto']}\n(Fonte: {p['pagina']}" + (f" - {p['url']}" if p["url"] else "") + ")" for p in passagens)
+        logs.append(f"UFPBAgent: {len(passagens)} trechos (cobertura={confianca['cobertura']:.2f}) em "
+                    f"{(time.perf_counter() - inicio) * 1000:.1f} ms (sem LLM).")
+        print(logs[-1])
+        return {"answer": answer, "raw_answer": trechos[0]["resposta"], "logs": logs, "passages": passagens}
 
-        # TODO: Se encontrar info, refinar com LLM? (llm_agent.responder)
+    def _cobre(self, indice: TitleIndex, trecho: Dict[str, Any], raros: List[str]) -> bool:
+        """ O trecho (texto + título da página) contém todos os termos raros da pergunta? """
+        if not raros:
+            return True
+        titulo = indice.paginas.get(trecho["page_id"], (trecho["pergunta"], None))[0]
+        presentes = set(termos(f"{titulo or ''} {trecho['resposta'] or ''}"))
+        return all(t in presentes for t in raros)
 
-        # TODO: Retornar dicionário com 'answer', 'raw_answer', 'logs' ou None
+    def _passagem(self, indice: TitleIndex, trecho: Dict[str, Any]) -> Dict[str, Any]:
+        titulo, url = indice.paginas.get(trecho["page_id"], (trecho["pergunta"], trecho["url"]))
+        texto = trecho["resposta"] or ""
+        if len(texto) > PASSAGE_MAX_CHARS:
+            texto = texto[:PASSAGE_MAX_CHARS].rsplit(" ", 1)[0] + " [...]"
+        pagina, secao = separar_titulo(titulo)
+        secao = secao.strip(" -")
+        return {"id": trecho["id"], "page_id": trecho["page_id"], "pagina": f"{pagina} ({secao})" if secao else pagina,
+                "url": url or trecho["url"], "texto": texto, "score": trecho["score"]}
 
-        return None  # Retorna None indicando que não pode responder ainda
+ufpb_agent = UFPBAgent()
+registrar_agente("UFPB", ufpb_agent.responder_pergunta, KEYWORDS, prioridade=50)
+registrar_recarga("UFPB", ufpb_agent.atualizar)
 
 # Exemplo de uso (para teste futuro)
 # async def main_test_ufpb():
@@ -1,11 +1,13 @@
 import streamlit as st
 import requests
+import json
 import time
 import uuid # Usar UUID para IDs mais robustos
 
 # --- Configuration --- A API URL é configurada aqui
 # Aponta para o serviço backend usando o nome do serviço Docker Compose
 API_URL = "http://lumia_backend:8000/api/ask"
+STREAM_API_URL = "http://lumia_backend:8000/api/ask/stream" # SSE: tokens chegam à medida que são gerados
 PAGE_TITLE = "LumIA Chat UFPB"
 # LOGO_PLACEHOLDER = "🎓 LumIA" # Removido
 
@@ -37,8 +39,20 @@ def get_api_response(chat_id: str, user_prompt: str):
     st.session_state.prompt_to_process = {"chat_id": chat_id, "prompt": user_prompt, "loading_id": loading_id}
     st.rerun()
 
-def process_api_call():
-    "Processa a chamada à API que foi agendada no rerun anterior."
+def iter_sse_events(response):
+    "Lê um stream Server-Sent Events e gera tuplas (evento, dados)."
+    event_name = "message"
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            event_name = "message" # Linha em branco encerra o evento
+            continue
+        if line.startswith("event:"):
+            event_name = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            yield event_name, json.loads(line[len("data:"):].strip())
+
+def process_api_call(placeholder):
+    "Processa a chamada (streaming) à API agendada no rerun anterior, exibindo os tokens no placeholder."
     if "prompt_to_process" in st.session_state and st.session_state.prompt_to_process:
         call_data = st.session_state.prompt_to_process
         chat_id = call_data["chat_id"]
@@ -48,11 +62,19 @@ def process_api_call():
         # Limpa o agendamento para não processar novamente
         st.session_state.prompt_to_process = None
 
+        partial_answer = ""
+        final_answer = None
         try:
-            response = requests.post(API_URL, json={"question": user_prompt}, timeout=60) # Timeout maior
-            response.raise_for_status()
-            data = response.json()
-            answer = data.get("answer", "Desculpe, não recebi uma resposta válida.")
+            # Timeout de conexão curto; o de leitura vale entre tokens, não para a resposta inteira
+            with requests.post(STREAM_API_URL, json={"question": user_prompt}, stream=True, timeout=(5, 60)) as response:
+                response.raise_for_status()
+                for event_name, data in iter_sse_events(response):
+                    if event_name == "token":
+                        partial_answer += data.get("text", "")
+                        placeholder.markdown(partial_answer + "▌")
+                    elif event_name in ("done", "error"):
+                        final_answer = data.get("answer") or partial_answer
+            answer = final_answer or partial_answer or "Desculpe, não recebi uma resposta válida."
             final_message = {"role": "assistant", "content": answer, "message_id": generate_message_id("assistant")}
 
         except requests.exceptions.Timeout:
@@ -77,9 +99,6 @@ def process_api_call():
 
         st.rerun()
 
-# --- Process API Call if scheduled ---
-process_api_call()
-
 # --- UI Rendering ---
 st.set_page_config(page_title=PAGE_TITLE, layout="wide")
 
@@ -139,12 +158,17 @@ else:
         st.header(active_chat["title"])
 
         # Display messages
+        pending_call = st.session_state.get("prompt_to_process")
         for message in active_chat["messages"]:
             role = message["role"]
             # Garante que role seja 'user' ou 'assistant' para st.chat_message
             display_role = "user" if role == "user" else "assistant"
             with st.chat_message(display_role):
-                st.markdown(message["content"])
+                placeholder = st.empty()
+                placeholder.markdown(message["content"])
+                # A mensagem de loading agendada recebe os tokens em streaming no próprio balão
+                if pending_call and message.get("message_id") == pending_call["loading_id"]:
+                    process_api_call(placeholder)
 
         # Chat input - Usar key única para cada chat garante que o estado do input resete ao mudar de chat
         prompt_key = f"input_{active_chat_id}"
@@ -1,4 +1,6 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from contextlib import asynccontextmanager
 import uvicorn
 import sys
 import os
@@ -8,16 +10,91 @@ sys.path.append(os.path.dirname(__file__))
 
 # Importa o router do módulo de rotas
 from routes import assistente
+from utils.db_handler import create_connection, configurar_wal, init_db_pool, close_db_pool
+from utils.corpus_store import preparar_corpus
+from utils.http_client import init_http_client, close_http_client
+from utils.answer_cache import close_answer_cache
+from utils.interaction_log import init_interaction_log, close_interaction_log
+from utils.vector_index import get_vector_index
+from utils.intent_classifier import get_intent_classifier
+from utils.interaction_log import get_interaction_log
+from utils.rate_limiter import get_groq_limiter
+from utils.metrics import metrics, CONTENT_TYPE
+from utils.tracing import close_trace_exporter
+from utils.corpus_watcher import init_corpus_watcher, close_corpus_watcher
+from agents.registry import get_agent_registry
+from agents.ru_agent import ru_agent
+from agents.sigaa_agent import sigaa_agent
+from agents.assistencia_agent import assistencia_agent
+from agents.ufpb_agent import ufpb_agent
+
+# Definido pelo serve.py (modo de produção): o processo principal já preparou o banco antes de subir os workers
+CORPUS_PREPARADO = os.getenv("LUMIA_CORPUS_PREPARADO") == "1"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """ Prepara recursos compartilhados antes de aceitar requisições. """
+    # Preparação com conexão de escrita: WAL, schema normalizado (migra `prape` uma única vez) e índice FTS5
+    # (no serve.py é feita pelo processo principal, antes dos workers)
+    conn = create_connection() if not CORPUS_PREPARADO else None
+    if conn is not None:
+        configurar_wal(conn)
+        preparar_corpus(conn)
+        conn.close()
+    # Pool async read-only compartilhado por todos os agentes
+    await init_db_pool()
+    # Cardápio e informações do RU em memória
+    await ru_agent.cache.garantir()
+    # Procedimentos do SIGAA em memória, com as respostas passo a passo já montadas
+    await sigaa_agent.carregar()
+    # Catálogo da assistência estudantil (auxílios, bolsas, editais) indexado em memória
+    await assistencia_agent.carregar()
+    # Índice de títulos/seções das páginas rastreadas (1ª etapa da busca do agente UFPB)
+    await ufpb_agent.carregar()
+    # Abre (via mmap) o índice vetorial, se já tiver sido construído; novas versões entram pela recarga periódica
+    get_vector_index()
+    # Carrega o classificador de intenção (se treinado); sem ele o roteamento usa só palavras-chave
+    get_intent_classifier()
+    # Cliente HTTP único (keep-alive + HTTP/2) para as chamadas à Groq
+    await init_http_client()
+    # Registro das interações na tabela `logs`: fila em memória gravada em lotes por uma task
+    await init_interaction_log()
+    # Recarga periódica dos dados em memória (RU a cada TTL/virada do dia e após cada novo scraping)
+    await init_corpus_watcher()
+    yield
+    await close_corpus_watcher()
+    await close_interaction_log() # Grava os registros pendentes antes de fechar o resto
+    await close_answer_cache()
+    close_trace_exporter() # Grava os traces pendentes (LUMIA_TRACE_EXPORT)
+    await close_http_client()
+    await close_db_pool()
 
 app = FastAPI(
     title="LumIA - Assistente Virtual Acadêmico",
     description="API para interagir com o assistente virtual LumIA.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Inclui as rotas definidas em routes/assistente.py
 app.include_router(assistente.router, prefix="/api", tags=["Assistente"])
 
+# Gauges lidos a cada scrape (estado atual, sem custo nas requisições)
+metrics.gauge_func("lumia_llm_queue_depth", "Requisições aguardando vaga no limitador da Groq.", lambda: get_groq_limiter().fila)
+metrics.gauge_func("lumia_llm_in_flight", "Requisições em andamento na Groq.", lambda: get_groq_limiter().em_voo)
+metrics.gauge_func("lumia_interaction_log_pending", "Interações na fila aguardando gravação na tabela logs.",
+                   lambda: get_interaction_log().pendentes)
+metrics.gauge_func("lumia_worker_info", "Processo (worker) que respondeu ao scrape; as métricas são por worker.",
+                   lambda: {str(os.getpid()): 1}, label="pid")
+metrics.gauge_func("lumia_agent_breaker_open", "1 se o disjuntor do agente está aberto/semiaberto.",
+                   lambda: {a.nome: int(a.breaker.estado != "fechado") for a in get_agent_registry().agentes}, label="agente")
+
+@app.get("/metrics", tags=["Root"], response_class=PlainTextResponse)
+async def read_metrics():
+    """ Métricas do processo no formato texto do Prometheus (latências, roteamento, agentes, DB, LLM, erros).
+    Roda no event loop (não no threadpool) para ler os contadores sem concorrer com as requisições. """
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
 @app.get("/", tags=["Root"])
 def read_root():
     return {"message": "Bem-vindo à API do LumIA! Acesse /docs para a documentação interativa."}
@@ -27,6 +104,7 @@ if __name__ == "__main__":
     # Verifica se está rodando dentro do Docker para definir o host corretamente
     # HOST = "0.0.0.0" if os.getenv("RUNNING_IN_DOCKER") else "127.0.0.1"
     # Simplificando para sempre usar 0.0.0.0 que funciona tanto local quanto Docker
+    # Modo de desenvolvimento (um processo, reload); em produção use `python serve.py` (vários workers)
     HOST = "0.0.0.0"
     PORT = 8000
     print(f"Iniciando servidor Uvicorn em {HOST}:{PORT}")
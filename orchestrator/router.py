@@ -1,124 +1,330 @@
 import sys
 import os
-from typing import Dict, Any, Optional
+import asyncio
+import time
+from typing import Dict, Any, Optional, AsyncIterator, Tuple, List
 
 # Adiciona o diretório raiz ao sys.path para encontrar o módulo agents
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 # --- Importa Agentes --- #
-from agents.prape_agent import responder_pergunta as responder_prape
-from agents.sigaa_agent import SIGAAAgent
-from agents.ru_agent import RUAgent
-from agents.assistencia_agent import AssistenciaAgent
-from agents.ufpb_agent import UFPBAgent
-from agents.llm_agent import LLMAgent # Fallback geral
+# Cada módulo de agente temático se declara no registro ao ser importado (nome, palavras-chave, prioridade, prazo);
+# os imports abaixo existem só por esse efeito colateral
+import agents.sigaa_agent # noqa: F401
+import agents.ru_agent # noqa: F401
+import agents.assistencia_agent # noqa: F401
+import agents.prape_agent # noqa: F401
+import agents.ufpb_agent # noqa: F401
+from agents.registry import AgenteRegistrado, get_agent_registry
+from agents.llm_agent import get_llm_agent, CONTEXT_LIMIT # Fallback geral
+from utils.answer_cache import get_answer_cache, montar_chave
+from utils.db_handler import get_db_pool
+from utils.fts_search import buscar_fts_async, buscar_fts_lote_async
+from utils.single_flight import SingleFlight
+from utils.text_normalizer import normalizar
+from utils.token_budget import resumo_uso
+from utils.keyword_matcher import KeywordMatcher
+from utils.intent_classifier import get_intent_classifier, INTENT_FALLBACK
+from utils.metrics import ROUTING_DECISIONS, ROUTING_LATENCY
+from utils.tracing import span, anotar
 
 # --- Palavras-chave para Roteamento --- #
-# Ajustar e refinar estas listas é crucial para o bom funcionamento
-KEYWORDS_PRAPE = [
-    "prape", "moradia", "psicológico", "pedagógico", # Termos mais específicos da PRAPE
-    "restaurante universitário" # RU pode estar sob PRAPE?
-]
-KEYWORDS_ASSISTENCIA = [
-    "assistência", "auxílio", "bolsa", "renda", "alimentação", "creche",
-    "transporte", "permanência", "pnaes", "vulnerabilidade", "socioeconômica"
-]
-KEYWORDS_SIGAA = [
-    "sigaa", "matrícula", "disciplina", "histórico", "nota", "trancamento",
-    "atestado", "declaração", "documento acadêmico", "cra", "período letivo",
-    "ira", "portal discente"
-]
-KEYWORDS_RU = [
-    "ru", "restaurante universitário", "cardápio", "refeição", "créditos ru",
-    "bandejão", "preço ru", "horário ru"
-]
-KEYWORDS_UFPB = [ # Palavras gerais, menos específicas
-    "ufpb", "universidade federal da paraíba", "reitoria", "pró-reitoria",
-    "campus", "centro de ensino", "biblioteca", "departamento", "curso",
-    "contato", "endereço", "notícia", "evento", "calendário acadêmico"
-]
-
-# --- Instâncias dos Agentes --- #
-# É importante instanciar apenas uma vez se não tiverem estado interno complexo
-sigaa_agent = SIGAAAgent()
-ru_agent = RUAgent()
-assistencia_agent = AssistenciaAgent()
-ufpb_agent = UFPBAgent()
-llm_agent = LLMAgent()
-
-async def rotear(pergunta: str) -> Optional[Dict[str, Any]]:
-    """ Roteia a pergunta para o agente temático apropriado ou usa LLM como fallback. """
-    pergunta_lower = pergunta.lower()
-    print(f"Orchestrator: Roteando pergunta: '{pergunta[:50]}...'")
+# As palavras-chave dos agentes temáticos ficam em cada módulo de agente (constante KEYWORDS)
+KEYWORDS_IDENTIDADE = ["qual seu nome", "teu nome", "seu nome", "quem é você"]
+identidade_matcher = KeywordMatcher({"IDENTIDADE": KEYWORDS_IDENTIDADE})
+
+# --- Classificador de intenção (utils/intent_classifier.py) --- #
+# Probabilidade mínima da classe mais provável para confiar no modelo; abaixo disso (ou sem modelo
+# treinado) o roteamento usa as palavras-chave
+INTENT_MIN_CONFIDENCE = float(os.getenv("LUMIA_INTENT_MIN_CONFIDENCE", "0.75"))
+
+# --- Execução dos agentes --- #
+# "paralelo": todos os agentes candidatos ao mesmo tempo (latência do mais lento, não a soma);
+# "sequencial": um por vez, na ordem do ranking
+ROUTING_MODE = os.getenv("LUMIA_ROUTING_MODE", "paralelo")
+# Segundos sem vencedor até disparar o LLM fallback em paralelo (hedge); negativo desativa
+LLM_HEDGE_DELAY = float(os.getenv("LUMIA_LLM_HEDGE_DELAY", "-1"))
+
+# Prazo, disjuntor e estatísticas de cada agente ficam no registro (ver agents/registry.py)
+registry = get_agent_registry()
+llm_agent = get_llm_agent()
+
+def ranquear_agentes(pergunta: str) -> Tuple[List[Tuple[AgenteRegistrado, float]], str]:
+    """ Agentes candidatos, do mais para o menos provável, e a origem do ranking. Se o classificador de
+    intenção estiver confiante, só o agente previsto (ou nenhum, para a classe LLM); senão, os agentes
+    cujas palavras-chave aparecem na pergunta.
+    """
+    previsao = get_intent_classifier().classificar(pergunta)
+    if previsao and previsao[0][1] >= INTENT_MIN_CONFIDENCE:
+        classe, prob = previsao[0]
+        agente = registry.get(classe)
+        if classe == INTENT_FALLBACK or agente is not None:
+            return ([(agente, prob)] if agente else []), f"modelo de intenção, {classe} p={prob:.2f}"
+    origem = f"palavras-chave, modelo {previsao[0][0]} p={previsao[0][1]:.2f}" if previsao else "palavras-chave"
+    return registry.ranquear(pergunta), origem
+
+# Perguntas idênticas (texto normalizado) em andamento ao mesmo tempo compartilham uma única execução:
+# em picos (semana de matrícula, edital novo) evita N consultas ao banco e N chamadas à Groq iguais
+single_flight = SingleFlight()
+
+async def _chave_cache(pergunta: str) -> str:
+    """ Chave do cache: pergunta normalizada + ids do contexto recuperado (busca FTS, poucos ms). """
+    async with get_db_pool().acquire() as conn:
+        contexto = await buscar_fts_async(conn, pergunta, k=CONTEXT_LIMIT)
+    return montar_chave(pergunta, [item["id"] for item in contexto])
+
+async def chaves_cache_lote(perguntas: List[str]) -> Dict[str, str]:
+    """ Chaves do cache de várias perguntas (usado pelo /ask/batch): as buscas FTS de todas vão ao banco
+    numa única instrução (ver `buscar_fts_lote_async`). Erros do banco são propagados.
+    """
+    distintas = list(dict.fromkeys(perguntas))
+    async with get_db_pool().acquire() as conn:
+        contextos = await buscar_fts_lote_async(conn, distintas, k=CONTEXT_LIMIT)
+    return {pergunta: montar_chave(pergunta, [item["id"] for item in contexto])
+            for pergunta, contexto in zip(distintas, contextos)}
+
+def _resultado_do_cache(cached: Dict[str, Any], camada: str) -> Dict[str, Any]:
+    cache = get_answer_cache()
+    return {
+        "answer": cached.get("answer"),
+        "raw_answer": cached.get("raw_answer"),
+        "agente": cached.get("agente"),
+        "cache": f"hit_{camada}",
+        "logs": [f"Cache: HIT ({camada}) | {cache.resumo_stats()}"] + list(cached.get("logs") or [])
+    }
+
+def _copiar_resultado(resultado: Optional[Dict[str, Any]], log: str) -> Optional[Dict[str, Any]]:
+    """ Cópia do resultado compartilhado para um chamador coalescido (cada um recebe seus próprios logs). """
+    if resultado is None:
+        return None
+    copia = dict(resultado)
+    copia["cache"] = "coalescida"
+    copia["logs"] = [log] + list(resultado.get("logs") or [])
+    return copia
+
+async def rotear(pergunta: str, chave_cache: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """ Roteia a pergunta para o agente temático apropriado ou usa LLM como fallback.
+    Chamadas concorrentes com a mesma pergunta normalizada são coalescidas em uma só execução, e
+    perguntas repetidas (mesmo texto normalizado e mesmo contexto recuperado) são servidas do cache.
+    `chave_cache` pode vir pré-calculada (ver `chaves_cache_lote`).
+    """
+    with span("orquestrador.rotear") as s:
+        resultado, coalescida = await single_flight.executar(normalizar(pergunta),
+                                                             lambda: _rotear_com_cache(pergunta, chave_cache))
+        if s is not None:
+            s.atributos.update(coalescida=coalescida, agente=(resultado or {}).get("agente"))
+    if coalescida:
+        print("Orchestrator: Pergunta idêntica já em andamento; resultado compartilhado.")
+        return _copiar_resultado(resultado, f"SingleFlight: COALESCIDA | {single_flight.resumo_stats()}")
+    return resultado
+
+async def _rotear_com_cache(pergunta: str, chave: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    cache = get_answer_cache()
+    if chave is None:
+        with span("cache.chave"):
+            chave = await _chave_cache(pergunta)
+    with span("cache.get"):
+        cached = await cache.get(chave)
+        anotar(resultado=f"hit_{cached[1]}" if cached is not None else "miss")
+    if cached is not None:
+        print("Orchestrator: Resposta servida do cache.")
+        return _resultado_do_cache(*cached)
+
+    resultado = await _rotear(pergunta, stream=False)
+    if resultado:
+        resultado["cache"] = "miss"
+        await cache.set(chave, resultado)
+        resultado.setdefault("logs", []).insert(0, f"Cache: MISS | {cache.resumo_stats()}")
+    return resultado
+
+async def rotear_stream(pergunta: str) -> AsyncIterator[Tuple[str, Any]]:
+    """ Versão em streaming de `rotear`. Gera eventos ("token", texto) conforme a resposta é produzida
+    e, ao final, um único ("meta", dict) com o resultado completo (answer, raw_answer, logs).
+    Agentes que respondem direto (sem LLM), respostas em cache e perguntas coalescidas com uma
+    idêntica já em andamento geram a resposta inteira em um único token.
+    """
+    chave_voo = normalizar(pergunta)
+    em_andamento = single_flight.aguardar(chave_voo)
+    if em_andamento is not None:
+        print("Orchestrator: Pergunta idêntica já em andamento; aguardando o resultado (stream).")
+        try:
+            resultado = _copiar_resultado(await asyncio.shield(em_andamento),
+                                          f"SingleFlight: COALESCIDA | {single_flight.resumo_stats()}")
+        except asyncio.CancelledError:
+            if not em_andamento.cancelled():
+                raise
+            resultado = await rotear(pergunta) # O líder desistiu (cliente desconectou): executa sem streaming
+        if resultado is not None:
+            yield ("token", resultado.get("answer", ""))
+        yield ("meta", resultado)
+        return
+
+    # Este stream é o líder: quem chegar com a mesma pergunta aguarda o resultado final
+    voo = single_flight.iniciar(chave_voo)
+    try:
+        meta = None
+        with span("orquestrador.rotear_stream"):
+            async for evento in _rotear_stream_com_cache(pergunta):
+                if evento[0] == "meta":
+                    meta = evento # Enviado após fechar o span: a rota encerra o trace ao recebê-lo
+                    single_flight.concluir(voo, evento[1])
+                    anotar(agente=(evento[1] or {}).get("agente"))
+                    continue
+                yield evento
+        if meta is not None:
+            yield meta
+    except BaseException as e: # Inclui cancelamento/desconexão do cliente
+        single_flight.falhar(voo, e)
+        raise
+    finally:
+        single_flight.falhar(voo, asyncio.CancelledError()) # Gerador abandonado antes do "meta"
+
+async def _rotear_stream_com_cache(pergunta: str) -> AsyncIterator[Tuple[str, Any]]:
+    cache = get_answer_cache()
+    with span("cache.chave"):
+        chave = await _chave_cache(pergunta)
+    with span("cache.get"):
+        cached = await cache.get(chave)
+        anotar(resultado=f"hit_{cached[1]}" if cached is not None else "miss")
+    if cached is not None:
+        resultado = _resultado_do_cache(*cached)
+        yield ("token", resultado["answer"])
+        yield ("meta", resultado)
+        return
+
+    resultado = await _rotear(pergunta, stream=True)
+    if resultado is None:
+        yield ("meta", None)
+        return
+
+    answer_stream = resultado.pop("answer_stream", None)
+    if answer_stream is None:
+        yield ("token", resultado.get("answer", ""))
+    else:
+        partes = []
+        async for token in answer_stream:
+            partes.append(token)
+            yield ("token", token)
+        resultado["answer"] = "".join(partes).strip()
+        if resultado.get("token_usage"):
+            resultado.setdefault("logs", []).append(resumo_uso(resultado["token_usage"]))
+            if resultado["token_usage"].get("degradado"):
+                resultado["degradado"] = True
+    resultado["cache"] = "miss"
+    await cache.set(chave, resultado)
+    resultado.setdefault("logs", []).insert(0, f"Cache: MISS | {cache.resumo_stats()}")
+    yield ("meta", resultado)
 
+async def _rotear(pergunta: str, stream: bool = False) -> Optional[Dict[str, Any]]:
+    """ Implementação do roteamento. Com `stream=True`, respostas geradas pelo LLM vêm em `answer_stream`. """
+    print(f"Orchestrator: Roteando pergunta: '{pergunta[:50]}...'")
     # --- 🔍 Interceptação especial: Identidade da IA --- #
-    if any(x in pergunta_lower for x in ["qual seu nome", "teu nome", "seu nome", "quem é você", "quem é voce"]):
+    if identidade_matcher.encontrar(pergunta):
         print("Orchestrator: Resposta direta para identidade da IA.")
+        ROUTING_DECISIONS.inc("identidade", "IDENTIDADE")
+        anotar(rota="identidade")
         return {
             "answer": "Meu nome é LumIA! Sou a assistente inteligente da Universidade Federal da Paraíba (UFPB), criada para te ajudar com dúvidas acadêmicas, auxílios, notas e muito mais 🤖📚",
             "raw_answer": None,
+            "agente": "IDENTIDADE",
             "logs": ["Resposta direta para pergunta sobre identidade da LumIA."]
         }
 
-
     # --- Roteamento por Palavras-chave --- #
-    # A ordem aqui pode ser importante dependendo do overlap das keywords
+    inicio = time.perf_counter()
+    with span("roteamento.ranking") as s:
+        ranking, origem = ranquear_agentes(pergunta)
+        if s is not None:
+            s.atributos.update(origem=origem, candidatos=",".join(a.nome for a, _ in ranking) or "nenhum")
+    origem_metrica = "modelo" if origem.startswith("modelo") else "palavras_chave"
+    ROUTING_LATENCY.observe(time.perf_counter() - inicio, origem_metrica)
+    ROUTING_DECISIONS.inc(origem_metrica, ranking[0][0].nome if ranking else INTENT_FALLBACK)
+    log_ranking = (f"Orchestrator: Ranking de agentes ({origem}): "
+                   + (", ".join(f"{a.nome}={p:.3g}" for a, p in ranking) or "nenhum"))
+    print(log_ranking)
+    agentes = [agente for agente, _ in ranking]
+    if ROUTING_MODE == "paralelo" and (len(agentes) > 1 or (LLM_HEDGE_DELAY >= 0 and not stream)):
+        return await _rotear_paralelo(pergunta, agentes, stream, log_ranking)
 
-    # 1. SIGAA (Sistema Acadêmico)
-    if any(keyword in pergunta_lower for keyword in KEYWORDS_SIGAA):
-        print("Orchestrator: Roteando para Agente SIGAA.")
-        resultado_agente = await sigaa_agent.responder_pergunta(pergunta)
+    # Sequencial: agentes na ordem do ranking (mais termos/termos compostos primeiro); o primeiro que responder vence
+    for agente in agentes:
+        resultado_agente = await registry.chamar(agente, pergunta, stream)
         if resultado_agente:
+            resultado_agente.setdefault("logs", []).insert(0, log_ranking)
             return resultado_agente
-        else:
-            print("Orchestrator: Agente SIGAA não encontrou resposta. Prosseguindo...")
+    return await _fallback_llm(pergunta, stream, log_ranking)
 
-    # 2. RU (Restaurante Universitário)
-    # Verificar RU antes de PRAPE/Assistencia se "restaurante universitário" estiver em ambos
-    if any(keyword in pergunta_lower for keyword in KEYWORDS_RU):
-        print("Orchestrator: Roteando para Agente RU.")
-        resultado_agente = await ru_agent.responder_pergunta(pergunta)
-        if resultado_agente:
-            return resultado_agente
-        else:
-            print("Orchestrator: Agente RU não encontrou resposta. Prosseguindo...")
+async def _rotear_paralelo(pergunta: str, agentes: List[AgenteRegistrado], stream: bool, log_ranking: str) -> Optional[Dict[str, Any]]:
+    """ Dispara todos os agentes candidatos ao mesmo tempo e devolve a resposta do mais prioritário (ordem do
+    ranking) assim que ela for conhecida: basta que ele e os de maior prioridade tenham terminado. Os demais
+    são cancelados. Sem streaming, o fallback LLM pode começar em paralelo (hedge) após LLM_HEDGE_DELAY
+    segundos sem vencedor; sua resposta só é usada se nenhum agente responder.
+    """
+    inicio = time.perf_counter()
+    tarefas = [asyncio.create_task(registry.chamar(agente, pergunta, stream)) for agente in agentes]
+    hedge: Optional[asyncio.Task] = None
+    usar_hedge = LLM_HEDGE_DELAY >= 0 and not stream
+    try:
+        while True:
+            # Percorre na ordem de prioridade: vence o primeiro com resposta, desde que os anteriores já tenham falhado
+            for agente, tarefa in zip(agentes, tarefas):
+                if not tarefa.done():
+                    break
+                resultado_agente = tarefa.result()
+                if resultado_agente:
+                    duracao_ms = (time.perf_counter() - inicio) * 1000
+                    resultado_agente.setdefault("logs", []).insert(0, log_ranking)
+                    resultado_agente["logs"].insert(1, f"Orchestrator: Fan-out paralelo de {len(agentes)} agentes; "
+                                                       f"vencedor Agente {agente.nome} em {duracao_ms:.0f} ms.")
+                    return resultado_agente
+            else:
+                break # Todos os agentes terminaram sem resposta
 
-    # 3. Assistência Estudantil (Auxílios, Bolsas, etc.)
-    # Verificar Assistencia antes de PRAPE se houver overlap
-    if any(keyword in pergunta_lower for keyword in KEYWORDS_ASSISTENCIA):
-        print("Orchestrator: Roteando para Agente Assistencia.")
-        resultado_agente = await assistencia_agent.responder_pergunta(pergunta)
-        if resultado_agente:
-            return resultado_agente
-        else:
-            print("Orchestrator: Agente Assistencia não encontrou resposta. Prosseguindo...")
+            pendentes = [t for t in tarefas if not t.done()]
+            if usar_hedge and hedge is None:
+                restante = LLM_HEDGE_DELAY - (time.perf_counter() - inicio)
+                if restante <= 0:
+                    print(f"Orchestrator: Nenhum agente respondeu em {LLM_HEDGE_DELAY:g}s; iniciando LLM fallback em paralelo (hedge).")
+                    hedge = asyncio.create_task(_fallback_llm(pergunta, stream, log_ranking))
+                    anotar(hedge_s=LLM_HEDGE_DELAY)
+                    continue
+                await asyncio.wait(pendentes, timeout=restante, return_when=asyncio.FIRST_COMPLETED)
+            else:
+                await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
 
-    # 4. PRAPE (Estrutura/Serviços específicos da PRAPE não cobertos por Assistencia)
-    if any(keyword in pergunta_lower for keyword in KEYWORDS_PRAPE):
-        print("Orchestrator: Roteando para Agente PRAPE.")
-        resultado_agente = await responder_prape(pergunta) # Usa a função importada
-        if resultado_agente:
-            return resultado_agente
-        else:
-            print("Orchestrator: Agente PRAPE não encontrou resposta. Prosseguindo...")
+        if hedge is not None:
+            resultado = await hedge
+            resultado["logs"].insert(1, "Orchestrator: Resposta do LLM fallback iniciado em paralelo (hedge).")
+            return resultado
+        return await _fallback_llm(pergunta, stream, log_ranking)
+    finally:
+        for tarefa in tarefas:
+            tarefa.cancel() # Agentes de menor prioridade (ou todos, se o chamador foi cancelado)
+        if hedge is not None:
+            hedge.cancel()
 
-    # 5. UFPB Geral (Informações institucionais, etc.)
-    if any(keyword in pergunta_lower for keyword in KEYWORDS_UFPB):
-        print("Orchestrator: Roteando para Agente UFPB Geral.")
-        resultado_agente = await ufpb_agent.responder_pergunta(pergunta)
-        if resultado_agente:
-            return resultado_agente
-        else:
-            print("Orchestrator: Agente UFPB Geral não encontrou resposta. Usando LLM fallback.")
-
-    # 6. Fallback Geral com LLM
+async def _fallback_llm(pergunta: str, stream: bool, log_ranking: str) -> Dict[str, Any]:
+    """ Fallback geral: nenhum agente temático respondeu. """
     print("Orchestrator: Nenhum agente temático respondeu. Usando LLM Agent como fallback geral.")
-    resposta_fallback_str = await llm_agent.responder(pergunta)
+    anotar(fallback=INTENT_FALLBACK)
+    uso_tokens = {}
+    if stream:
+        return {
+            "answer": "",
+            "answer_stream": llm_agent.responder_stream(pergunta, uso=uso_tokens),
+            "raw_answer": None,
+            "agente": INTENT_FALLBACK,
+            "token_usage": uso_tokens, # Completado quando o stream terminar
+            "logs": [log_ranking, "Orchestrator: Roteado para LLM fallback geral (streaming)."]
+        }
+    resposta_fallback_str = await llm_agent.responder(pergunta, uso=uso_tokens)
     # Envolve a resposta string do LLM em um dict para consistência
     return {
         "answer": resposta_fallback_str,
         "raw_answer": None,
-        "logs": ["Orchestrator: Roteado para LLM fallback geral."]
+        "agente": INTENT_FALLBACK,
+        "token_usage": uso_tokens,
+        "logs": [log_ranking, "Orchestrator: Roteado para LLM fallback geral.", resumo_uso(uso_tokens)]
     }
 
 # Exemplo de uso atualizado com novos agentes
@@ -145,5 +351,4 @@ async def main_test():
             print("  Resultado: None")
 
 if __name__ == '__main__':
-    import asyncio
     asyncio.run(main_test()) 
\ No newline at end of file
@@ -1,19 +1,31 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import sys
 import os
+import json
+import asyncio
 import time # Importa o módulo time
-from typing import List, Optional # Importar List e Optional
+from typing import Any, List, Optional, Dict # Importar List, Optional e Dict
 
 # Adiciona o diretório raiz ao sys.path para encontrar o módulo orchestrator
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from orchestrator.router import rotear
+from orchestrator.router import rotear, rotear_stream, chaves_cache_lote
 # Importa a constante do modelo do LLM Agent para saber qual foi usado
 from agents.llm_agent import GROQ_MODEL
+from agents.registry import get_agent_registry
+from utils.interaction_log import get_interaction_log
+from utils.metrics import HTTP_LATENCY, HTTP_REQUESTS, HTTP_TTFT, ANSWER_CACHE, ANSWERS_BY_AGENT, ERRORS
+from utils.tracing import iniciar_trace, encerrar_trace, deve_rastrear, pedido_de_trace
 
 router = APIRouter()
 
+# --- Configuração do /ask/batch --- #
+BATCH_MAX_QUESTIONS = int(os.getenv("LUMIA_BATCH_MAX_QUESTIONS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("LUMIA_BATCH_CONCURRENCY", "8")) # Padrão de perguntas simultâneas por lote
+BATCH_MAX_CONCURRENCY = int(os.getenv("LUMIA_BATCH_MAX_CONCURRENCY", "32")) # Teto para o valor pedido pelo cliente
+
 # Modelo Pydantic para o corpo da requisição
 class QuestionRequest(BaseModel):
     question: str
@@ -25,13 +37,70 @@ class DetailedAnswerResponse(BaseModel):
     logs: List[str] = [] # Logs dos passos executados
     processing_time_ms: float # Adiciona campo para tempo de processamento
     model_used: Optional[str] = None # Adiciona campo para o modelo
+    token_usage: Optional[Dict[str, int]] = None # Tokens do prompt/resposta (quando o LLM foi chamado)
+    trace: Optional[Dict[str, Any]] = None # Spans cronometrados por etapa (só com ?trace=true ou X-LumIA-Trace: 1)
+
+# Modelos do /ask/batch
+class BatchQuestionRequest(BaseModel):
+    questions: List[str]
+    concurrency: Optional[int] = None # Perguntas processadas em paralelo (padrão BATCH_CONCURRENCY)
+    stream: bool = False # True: resultados em NDJSON, um por linha, na ordem em que ficam prontos
+
+class BatchItemResponse(BaseModel):
+    index: int # Posição da pergunta na lista enviada
+    question: str
+    answer: str
+    raw_answer: Optional[str] = None
+    logs: List[str] = []
+    processing_time_ms: float
+    model_used: Optional[str] = None
+    token_usage: Optional[Dict[str, int]] = None
+    error: Optional[str] = None
+
+class BatchAnswerResponse(BaseModel):
+    results: List[BatchItemResponse]
+    total_time_ms: float
+    concurrency: int
+
+def _registrar_interacao(pergunta: str, rota: str, resultado: Optional[dict], answer: str, tempo_ms: float,
+                         ttft_ms: Optional[float] = None):
+    """ Enfileira a interação para a tabela `logs` (gravada em lote em segundo plano, sem I/O aqui) e
+    registra as métricas da requisição. Sem resultado (erro ou orquestrador sem resposta) conta como erro.
+    """
+    HTTP_LATENCY.observe(tempo_ms / 1000, rota)
+    if ttft_ms is not None:
+        HTTP_TTFT.observe(ttft_ms / 1000)
+    if resultado:
+        HTTP_REQUESTS.inc(rota, "ok")
+        ANSWERS_BY_AGENT.inc(resultado.get("agente") or "desconhecido")
+        if resultado.get("cache"):
+            ANSWER_CACHE.inc(resultado["cache"])
+    else:
+        HTTP_REQUESTS.inc(rota, "erro")
+        ERRORS.inc("rota")
+    resultado = resultado or {}
+    uso = resultado.get("token_usage") or {}
+    get_interaction_log().registrar(pergunta, answer, agente=resultado.get("agente"), rota=rota,
+                                    cache=resultado.get("cache"), tempo_ms=tempo_ms, ttft_ms=ttft_ms,
+                                    degradado=bool(resultado.get("degradado") or uso.get("degradado")),
+                                    detalhes={"token_usage": uso} if uso else None)
 
 # Modelo antigo - não mais usado diretamente na resposta da rota
 # class AnswerResponse(BaseModel):
 #     answer: str
 
+def _encerrar_trace(trace_req, resultado: Optional[dict], pedido: bool) -> Optional[Dict[str, Any]]:
+    """ Fecha o trace da requisição (exportando, se configurado) e o devolve se o cliente pediu. """
+    if trace_req is None:
+        return None
+    resultado = resultado or {}
+    trace_req.raiz.atributos.update(agente=resultado.get("agente"), cache=resultado.get("cache"))
+    encerrar_trace(trace_req)
+    return trace_req.to_dict() if pedido else None
+
 @router.post("/ask", response_model=DetailedAnswerResponse)
-async def ask_question(request: QuestionRequest):
+async def ask_question(request: QuestionRequest, trace: bool = Query(False, description="Inclui o trace por etapa na resposta"),
+                       x_lumia_trace: Optional[str] = Header(None)):
     """ Recebe uma pergunta, roteia, mede o tempo e retorna resposta detalhada com modelo. """
     start_time = time.perf_counter() # Marca o tempo de início
 
@@ -44,6 +113,9 @@ async def ask_question(request: QuestionRequest):
 
     final_response: DetailedAnswerResponse
     model_name = None # Inicializa como None
+    result_dict = None
+    pedido = pedido_de_trace(trace, x_lumia_trace)
+    trace_req = iniciar_trace("POST /ask", pergunta_chars=len(request.question)) if deve_rastrear(pedido) else None
     try:
         print(f"API Route: Recebida pergunta: {request.question}")
         # O orquestrador agora retorna um Dict ou None
@@ -64,7 +136,8 @@ async def ask_question(request: QuestionRequest):
                 raw_answer=result_dict.get("raw_answer"), # Será None se não existir no dict
                 logs=result_dict.get("logs", []), # Será lista vazia se não existir
                 processing_time_ms=duration_ms, # Inclui o tempo na resposta
-                model_used=model_name # Inclui o nome do modelo
+                model_used=model_name, # Inclui o nome do modelo
+                token_usage=result_dict.get("token_usage") or None
             )
         else:
             # Caso raro onde o orquestrador falha em retornar até mesmo uma resposta de fallback
@@ -80,6 +153,8 @@ async def ask_question(request: QuestionRequest):
         end_time = time.perf_counter() # Marca o tempo de fim (exceção)
         duration_ms = (end_time - start_time) * 1000
         print(f"API Route: Erro inesperado. Tempo: {duration_ms:.2f} ms. Erro: {e}")
+        if trace_req is not None:
+            trace_req.raiz.atributos["erro"] = type(e).__name__
         # Em caso de erro na própria rota/orquestrador, retorna uma resposta de erro detalhada
         # Não usamos HTTPException aqui para manter o formato DetailedAnswerResponse
         final_response = DetailedAnswerResponse(
@@ -89,4 +164,169 @@ async def ask_question(request: QuestionRequest):
             model_used=None # Nenhum modelo foi confirmado como usado devido ao erro
         )
 
-    return final_response 
\ No newline at end of file
+    final_response.trace = _encerrar_trace(trace_req, result_dict, pedido)
+    _registrar_interacao(request.question, "/ask", result_dict, final_response.answer, final_response.processing_time_ms)
+    return final_response 
+
+def _evento_sse(evento: str, dados: dict) -> str:
+    """ Formata um evento Server-Sent Events (uma linha `event:` e uma `data:` com JSON). """
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+@router.post("/ask/stream")
+async def ask_question_stream(request: QuestionRequest, trace: bool = Query(False, description="Inclui o trace por etapa no evento done"),
+                              x_lumia_trace: Optional[str] = Header(None)):
+    """ Como /ask, mas envia a resposta em streaming (SSE): eventos `token` à medida que são gerados
+    e um evento final `done` com raw_answer, logs, tempos e modelo (e o trace, se pedido).
+    """
+    if not request.question:
+        raise HTTPException(status_code=400, detail="A pergunta não pode estar vazia.")
+    pedido = pedido_de_trace(trace, x_lumia_trace)
+
+    async def gerar_eventos():
+        start_time = time.perf_counter()
+        first_token_ms = None
+        print(f"API Route (stream): Recebida pergunta: {request.question}")
+        trace_req = iniciar_trace("POST /ask/stream", pergunta_chars=len(request.question)) if deve_rastrear(pedido) else None
+        try:
+            async for tipo, conteudo in rotear_stream(request.question):
+                if tipo == "token":
+                    if first_token_ms is None:
+                        first_token_ms = (time.perf_counter() - start_time) * 1000
+                        if trace_req is not None:
+                            trace_req.raiz.atributos["ttft_ms"] = round(first_token_ms, 3)
+                    yield _evento_sse("token", {"text": conteudo})
+                elif tipo == "meta":
+                    duration_ms = (time.perf_counter() - start_time) * 1000
+                    if conteudo:
+                        print(f"API Route (stream): Concluído. TTFT: {first_token_ms or 0:.2f} ms. Tempo: {duration_ms:.2f} ms")
+                        meta = {
+                            "answer": conteudo.get("answer", ""),
+                            "raw_answer": conteudo.get("raw_answer"),
+                            "logs": conteudo.get("logs", []),
+                            "processing_time_ms": duration_ms,
+                            "time_to_first_token_ms": first_token_ms,
+                            "model_used": GROQ_MODEL,
+                            "token_usage": conteudo.get("token_usage") or None
+                        }
+                    else:
+                        meta = {
+                            "answer": "Desculpe, não consegui processar sua pergunta no momento.",
+                            "raw_answer": None,
+                            "logs": ["Error: Orchestrator failed to return a response."],
+                            "processing_time_ms": duration_ms,
+                            "time_to_first_token_ms": first_token_ms,
+                            "model_used": None
+                        }
+                    trace_dict = _encerrar_trace(trace_req, conteudo, pedido)
+                    if trace_dict is not None:
+                        meta["trace"] = trace_dict
+                    _registrar_interacao(request.question, "/ask/stream", conteudo, meta["answer"], duration_ms, first_token_ms)
+                    yield _evento_sse("done", meta)
+        except Exception as e:
+            duration_ms = (time.perf_counter() - start_time) * 1000
+            print(f"API Route (stream): Erro inesperado. Tempo: {duration_ms:.2f} ms. Erro: {e}")
+            if trace_req is not None:
+                trace_req.raiz.atributos["erro"] = type(e).__name__
+            _encerrar_trace(trace_req, None, pedido)
+            _registrar_interacao(request.question, "/ask/stream", None,
+                                 "Desculpe, ocorreu um erro interno grave ao processar sua pergunta.", duration_ms, first_token_ms)
+            yield _evento_sse("error", {
+                "answer": "Desculpe, ocorreu um erro interno grave ao processar sua pergunta.",
+                "logs": [f"Exception: {type(e).__name__}: {e}"],
+                "processing_time_ms": duration_ms
+            })
+
+    # X-Accel-Buffering desativa o buffer de proxies (nginx) para os tokens chegarem imediatamente
+    return StreamingResponse(gerar_eventos(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def _chave_do_lote(chaves: Optional[asyncio.Task], pergunta: str) -> Optional[str]:
+    """ Chave de cache da pergunta calculada pela passada em grupo do lote. Se a passada falhou, devolve
+    None e `rotear` calcula a chave sozinho (um erro no DB só afeta os itens em que ele se repetir).
+    """
+    if chaves is None:
+        return None
+    try:
+        return (await asyncio.shield(chaves)).get(pergunta)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"API Route (batch): Chaves de cache em grupo indisponíveis ({type(e).__name__}: {e}).")
+        return None
+
+async def _responder_item(index: int, pergunta: str, chaves: Optional[asyncio.Task], limite: asyncio.Semaphore) -> dict:
+    """ Processa uma pergunta do lote (respeitando o limite de concorrência) e monta o item de resposta. """
+    async with limite:
+        start_time = time.perf_counter()
+        result_dict = None
+        item = {"index": index, "question": pergunta, "raw_answer": None, "logs": [],
+                "model_used": None, "token_usage": None, "error": None}
+        try:
+            if not pergunta or not pergunta.strip():
+                raise ValueError("A pergunta não pode estar vazia.")
+            result_dict = await rotear(pergunta, chave_cache=await _chave_do_lote(chaves, pergunta))
+            if result_dict:
+                item.update(answer=result_dict.get("answer", "Erro: Resposta final não encontrada no resultado."),
+                            raw_answer=result_dict.get("raw_answer"), logs=result_dict.get("logs", []),
+                            model_used=GROQ_MODEL, token_usage=result_dict.get("token_usage") or None)
+            else:
+                item.update(answer="Desculpe, não consegui processar sua pergunta no momento.",
+                            logs=["Error: Orchestrator failed to return a response."])
+        except Exception as e:
+            print(f"API Route (batch): Erro na pergunta {index}: {e}")
+            item.update(answer="Desculpe, ocorreu um erro interno grave ao processar sua pergunta.",
+                        error=f"{type(e).__name__}: {e}")
+        item["processing_time_ms"] = (time.perf_counter() - start_time) * 1000
+        if pergunta and pergunta.strip():
+            _registrar_interacao(pergunta, "/ask/batch", result_dict, item["answer"], item["processing_time_ms"])
+        return item
+
+@router.post("/ask/batch", response_model=BatchAnswerResponse)
+async def ask_batch(request: BatchQuestionRequest):
+    """ Responde uma lista de perguntas com no máximo `concurrency` em paralelo.
+    As chaves de cache de todas as perguntas saem de uma única consulta FTS em grupo, aguardada por cada
+    item dentro do próprio tratamento de erro (uma falha no DB vira o `error` do item, não um 500 do
+    lote); perguntas repetidas no lote são coalescidas pelo orquestrador. Com `stream=true`, devolve
+    NDJSON: um item por linha assim que fica pronto e uma linha final com `done`.
+    """
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="A lista de perguntas não pode estar vazia.")
+    if len(request.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {BATCH_MAX_QUESTIONS} perguntas por lote.")
+
+    start_time = time.perf_counter()
+    concurrency = max(1, min(request.concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    print(f"API Route (batch): {len(request.questions)} perguntas, concorrência {concurrency}.")
+    limite = asyncio.Semaphore(concurrency)
+    validas = [q for q in request.questions if q and q.strip()]
+    chaves = asyncio.create_task(chaves_cache_lote(validas)) if validas else None
+    tarefas = [asyncio.create_task(_responder_item(i, q, chaves, limite))
+               for i, q in enumerate(request.questions)]
+
+    if not request.stream:
+        results = await asyncio.gather(*tarefas)
+        total_ms = (time.perf_counter() - start_time) * 1000
+        print(f"API Route (batch): Concluído em {total_ms:.2f} ms.")
+        return BatchAnswerResponse(results=results, total_time_ms=total_ms, concurrency=concurrency)
+
+    async def gerar_linhas():
+        try:
+            for tarefa in asyncio.as_completed(tarefas):
+                yield json.dumps(await tarefa, ensure_ascii=False) + "\n"
+            total_ms = (time.perf_counter() - start_time) * 1000
+            print(f"API Route (batch/stream): Concluído em {total_ms:.2f} ms.")
+            yield json.dumps({"done": True, "count": len(tarefas), "total_time_ms": total_ms,
+                              "concurrency": concurrency}) + "\n"
+        finally:
+            for tarefa in tarefas: # Cliente desconectou: não processa o resto do lote
+                tarefa.cancel()
+            if chaves is not None:
+                chaves.cancel()
+
+    return StreamingResponse(gerar_linhas(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/agents/health")
+async def agents_health():
+    """ Latência, taxa de acerto/erro e estado do disjuntor de cada agente temático registrado. """
+    return get_agent_registry().saude()
@@ -0,0 +1,94 @@
+import json
+import os
+import sys
+from datetime import date
+
+# Adiciona o diretório raiz ao sys.path para encontrar o módulo utils
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.db_handler import create_connection, create_table
+from utils.corpus_store import marcar_corpus_atualizado
+
+# --- Catálogo da assistência estudantil (lido pelo agents/assistencia_agent.py) --- #
+# auxilios e bolsas têm os mesmos campos tipados; editais_assistencia referencia o benefício pelo slug
+_COLUNAS_BENEFICIO = """ id integer PRIMARY KEY,
+                         slug text UNIQUE NOT NULL, -- Identificador curto (ex.: auxilio_moradia)
+                         nome text NOT NULL,
+                         sinonimos text, -- Outros nomes do benefício, um por linha
+                         valor real, -- Em reais, por período
+                         periodicidade text, -- mensal, semestral, parcela única...
+                         elegibilidade text,
+                         documentos text, -- Um por linha
+                         descricao text,
+                         url text,
+                         atualizado_em text DEFAULT CURRENT_TIMESTAMP """
+SQL_CREATE_AUXILIOS = f" CREATE TABLE IF NOT EXISTS auxilios ({_COLUNAS_BENEFICIO}); "
+SQL_CREATE_BOLSAS = f" CREATE TABLE IF NOT EXISTS bolsas ({_COLUNAS_BENEFICIO}, carga_horaria integer); "
+SQL_CREATE_EDITAIS = """ CREATE TABLE IF NOT EXISTS editais_assistencia (
+                            id integer PRIMARY KEY,
+                            numero text UNIQUE NOT NULL, -- Ex.: 05/2025
+                            titulo text NOT NULL,
+                            beneficio text, -- slug em auxilios/bolsas (NULL: edital geral)
+                            inscricao_inicio text, -- YYYY-MM-DD
+                            inscricao_fim text,
+                            resultado_em text,
+                            url text,
+                            atualizado_em text DEFAULT CURRENT_TIMESTAMP
+                        ); """
+
+def _linhas(valor):
+    if valor is None:
+        return None
+    return valor.strip() if isinstance(valor, str) else "\n".join(v.strip() for v in valor)
+
+def _data(valor):
+    return date.fromisoformat(valor).isoformat() if valor else None
+
+def _beneficio(item: dict) -> tuple:
+    valor = item.get("valor")
+    return (item["slug"], item["nome"], _linhas(item.get("sinonimos")), None if valor is None else float(valor),
+            item.get("periodicidade"), item.get("elegibilidade"), _linhas(item.get("documentos")),
+            item.get("descricao"), item.get("url"))
+
+def importar_assistencia(conn, dados: dict) -> tuple:
+    """ Grava (substituindo pelo slug/número) o catálogo a partir de um dict no formato:
+    {"auxilios": [{"slug": "auxilio_moradia", "nome": "Auxílio Moradia", "sinonimos": ["residência"],
+                   "valor": 400.0, "periodicidade": "mensal", "elegibilidade": "...",
+                   "documentos": ["RG", "CPF"], "descricao": "...", "url": "https://..."}],
+     "bolsas": [{... mesmos campos ..., "carga_horaria": 12}],
+     "editais": [{"numero": "05/2025", "titulo": "...", "beneficio": "auxilio_moradia",
+                  "inscricao_inicio": "2025-03-01", "inscricao_fim": "2025-03-15", "resultado_em": "2025-04-01",
+                  "url": "https://..."}]}
+    :return: (auxílios, bolsas, editais) gravados
+    """
+    for sql in (SQL_CREATE_AUXILIOS, SQL_CREATE_BOLSAS, SQL_CREATE_EDITAIS):
+        create_table(conn, sql)
+    auxilios = [_beneficio(item) for item in dados.get("auxilios", [])]
+    bolsas = [_beneficio(item) + (item.get("carga_horaria"),) for item in dados.get("bolsas", [])]
+    editais = [(e["numero"], e["titulo"], e.get("beneficio"), _data(e.get("inscricao_inicio")),
+                _data(e.get("inscricao_fim")), _data(e.get("resultado_em")), e.get("url"))
+               for e in dados.get("editais", [])]
+
+    colunas = "slug, nome, sinonimos, valor, periodicidade, elegibilidade, documentos, descricao, url"
+    with conn:
+        conn.executemany(f"INSERT OR REPLACE INTO auxilios({colunas}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", auxilios)
+        conn.executemany(f"INSERT OR REPLACE INTO bolsas({colunas}, carga_horaria) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", bolsas)
+        conn.executemany(""" INSERT OR REPLACE INTO editais_assistencia(numero, titulo, beneficio, inscricao_inicio,
+                             inscricao_fim, resultado_em, url) VALUES (?, ?, ?, ?, ?, ?, ?) """, editais)
+    # Nova versão do corpus: a API descarta as respostas em cache calculadas sobre os dados antigos
+    marcar_corpus_atualizado(conn)
+    return len(auxilios), len(bolsas), len(editais)
+
+# Ingestão: python scrapers/assistencia_ingest.py catalogo.json
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Uso: python scrapers/assistencia_ingest.py <arquivo.json>")
+        sys.exit(1)
+    with open(sys.argv[1], encoding="utf-8") as f:
+        dados = json.load(f)
+
+    conn = create_connection()
+    if conn is not None:
+        auxilios, bolsas, editais = importar_assistencia(conn, dados)
+        conn.close()
+        print(f"Assistência: {auxilios} auxílios, {bolsas} bolsas e {editais} editais gravados.")
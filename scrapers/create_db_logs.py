@@ -9,7 +9,14 @@ CREATE TABLE IF NOT EXISTS logs (
     pergunta TEXT NOT NULL,
     resposta TEXT NOT NULL,
     agente TEXT,
-    data_hora TEXT DEFAULT CURRENT_TIMESTAMP
+    data_hora TEXT DEFAULT CURRENT_TIMESTAMP,
+    -- Preenchidas pelo registro assíncrono da API (utils/interaction_log.py)
+    rota TEXT,
+    cache TEXT,
+    tempo_ms REAL,
+    ttft_ms REAL,
+    degradado INTEGER,
+    detalhes TEXT
 );
 """)
 
@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+from datetime import date
+
+# Adiciona o diretório raiz ao sys.path para encontrar o módulo utils
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.db_handler import create_connection, create_table
+from utils.corpus_store import marcar_corpus_atualizado
+from utils.text_normalizer import normalizar
+
+# --- Dados estruturados do Restaurante Universitário (lidos pelo agents/ru_agent.py) --- #
+# ru_cardapio: uma linha por (data, refeição), itens um por linha
+# ru_info: fatos fixos por tópico (preco, horario, localizacao, creditos, regras)
+SQL_CREATE_RU_CARDAPIO = """ CREATE TABLE IF NOT EXISTS ru_cardapio (
+                                data text NOT NULL, -- YYYY-MM-DD
+                                refeicao text NOT NULL, -- cafe | almoco | jantar
+                                itens text NOT NULL,
+                                atualizado_em text DEFAULT CURRENT_TIMESTAMP,
+                                PRIMARY KEY (data, refeicao)
+                            ); """
+SQL_CREATE_RU_INFO = """ CREATE TABLE IF NOT EXISTS ru_info (
+                            topico text PRIMARY KEY,
+                            titulo text NOT NULL,
+                            valor text NOT NULL,
+                            atualizado_em text DEFAULT CURRENT_TIMESTAMP
+                        ); """
+
+REFEICOES = {"cafe": "cafe", "cafe da manha": "cafe", "desjejum": "cafe",
+             "almoco": "almoco", "jantar": "jantar", "janta": "jantar"}
+
+def importar_ru(conn, dados: dict) -> tuple:
+    """ Grava (substituindo) o cardápio e as informações do RU a partir de um dict no formato:
+    {"cardapio": [{"data": "2025-03-10", "refeicao": "almoco", "itens": ["Arroz", "Feijão", ...]}],
+     "info": [{"topico": "preco", "titulo": "Preço da refeição", "valor": "..."}]}
+    :return: (refeições gravadas, tópicos gravados)
+    """
+    create_table(conn, SQL_CREATE_RU_CARDAPIO)
+    create_table(conn, SQL_CREATE_RU_INFO)
+    cardapio = []
+    for item in dados.get("cardapio", []):
+        refeicao = REFEICOES.get(normalizar(item["refeicao"]))
+        if refeicao is None:
+            raise ValueError(f"Refeição desconhecida: {item['refeicao']!r} (use cafe, almoco ou jantar).")
+        itens = item["itens"] if isinstance(item["itens"], str) else "\n".join(item["itens"])
+        cardapio.append((date.fromisoformat(item["data"]).isoformat(), refeicao, itens.strip()))
+    info = [(normalizar(item["topico"]), item["titulo"], item["valor"]) for item in dados.get("info", [])]
+
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO ru_cardapio(data, refeicao, itens) VALUES (?, ?, ?)", cardapio)
+        conn.executemany("INSERT OR REPLACE INTO ru_info(topico, titulo, valor) VALUES (?, ?, ?)", info)
+    # Nova versão do corpus: a API descarta as respostas em cache calculadas sobre os dados antigos
+    marcar_corpus_atualizado(conn)
+    return len(cardapio), len(info)
+
+# Ingestão: python scrapers/ru_ingest.py cardapio.json
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Uso: python scrapers/ru_ingest.py <arquivo.json>")
+        sys.exit(1)
+    with open(sys.argv[1], encoding="utf-8") as f:
+        dados = json.load(f)
+
+    conn = create_connection()
+    if conn is not None:
+        refeicoes, topicos = importar_ru(conn, dados)
+        conn.close()
+        print(f"RU: {refeicoes} refeições e {topicos} tópicos de informação gravados.")
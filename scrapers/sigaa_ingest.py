@@ -0,0 +1,60 @@
+import json
+import os
+import sys
+
+# Adiciona o diretório raiz ao sys.path para encontrar o módulo utils
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.db_handler import create_connection, create_table
+from utils.corpus_store import marcar_corpus_atualizado
+
+# --- Base de procedimentos do SIGAA (lida pelo agents/sigaa_agent.py) --- #
+# Uma linha por procedimento; gatilhos e passos são gravados um por linha
+SQL_CREATE_SIGAA_CONTENT = """ CREATE TABLE IF NOT EXISTS sigaa_content (
+                                  id integer PRIMARY KEY,
+                                  procedimento text UNIQUE NOT NULL, -- Identificador curto (ex.: trancamento_disciplina)
+                                  titulo text NOT NULL,
+                                  gatilhos text NOT NULL, -- Expressões que indicam este procedimento
+                                  passos text NOT NULL,
+                                  observacoes text,
+                                  url text,
+                                  atualizado_em text DEFAULT CURRENT_TIMESTAMP
+                              ); """
+
+def _linhas(valor) -> str:
+    return valor.strip() if isinstance(valor, str) else "\n".join(v.strip() for v in valor)
+
+def importar_sigaa(conn, procedimentos: list) -> int:
+    """ Grava (substituindo pelo identificador) os procedimentos de uma lista no formato:
+    [{"procedimento": "trancamento_disciplina", "titulo": "Trancamento de disciplina",
+      "gatilhos": ["trancar disciplina", "trancamento"], "passos": ["Acesse ...", "..."],
+      "observacoes": "...", "url": "https://..."}]
+    :return: Número de procedimentos gravados.
+    """
+    create_table(conn, SQL_CREATE_SIGAA_CONTENT)
+    linhas = [(p["procedimento"], p["titulo"], _linhas(p["gatilhos"]), _linhas(p["passos"]),
+               p.get("observacoes"), p.get("url")) for p in procedimentos]
+    with conn:
+        conn.executemany(""" INSERT INTO sigaa_content(procedimento, titulo, gatilhos, passos, observacoes, url)
+                             VALUES (?, ?, ?, ?, ?, ?)
+                             ON CONFLICT(procedimento) DO UPDATE SET
+                                 titulo = excluded.titulo, gatilhos = excluded.gatilhos, passos = excluded.passos,
+                                 observacoes = excluded.observacoes, url = excluded.url,
+                                 atualizado_em = CURRENT_TIMESTAMP """, linhas)
+    # Nova versão do corpus: a API descarta as respostas em cache calculadas sobre os dados antigos
+    marcar_corpus_atualizado(conn)
+    return len(linhas)
+
+# Ingestão: python scrapers/sigaa_ingest.py procedimentos.json
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Uso: python scrapers/sigaa_ingest.py <arquivo.json>")
+        sys.exit(1)
+    with open(sys.argv[1], encoding="utf-8") as f:
+        procedimentos = json.load(f)
+
+    conn = create_connection()
+    if conn is not None:
+        total = importar_sigaa(conn, procedimentos)
+        conn.close()
+        print(f"SIGAA: {total} procedimentos gravados.")
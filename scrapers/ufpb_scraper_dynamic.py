@@ -1,17 +1,18 @@
 import asyncio
 import sys
 import os
-import sqlite3
 from urllib.parse import urljoin, urlparse
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError, Page
 
 # Adiciona o diretório pai ao sys.path para encontrar o módulo utils
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from utils.db_handler import create_connection, create_table, insert_data
+from utils.db_handler import create_connection, configurar_wal
+from utils.corpus_store import preparar_corpus, registrar_pagina, inserir_paragrafo, marcar_corpus_atualizado, remover_paginas_orfas
+from utils.vector_index import construir_indice
 
 BASE_URL = "https://www.ufpb.br/"
-TABLE_NAME = "prape"
+TABLE_NAME = "prape" # View de compatibilidade sobre pages/paragraphs
 IGNORE_EXTENSIONS = [".pdf", ".jpg", ".jpeg", ".png", ".css", ".js", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".zip", ".rar", ".mp3", ".mp4", ".avi", ".mov", ".svg", ".xml", ".ico"]
 MIN_WORDS_PARAGRAPH = 10
 
@@ -40,18 +41,6 @@ def is_relevant_link(url, base_url):
         print(f"Erro ao analisar link {url}: {e}")
         return False
 
-def check_if_exists(conn, table, resposta):
-    """ Verifica se um registro com a mesma resposta já existe na tabela. """
-    sql = f''' SELECT 1 FROM {table} WHERE resposta = ? LIMIT 1 '''
-    cur = conn.cursor()
-    try:
-        cur.execute(sql, (resposta,))
-        exists = cur.fetchone() is not None
-        return exists
-    except sqlite3.Error as e:
-        print(f"Erro ao verificar existência na tabela {table}: {e}")
-        return False
-
 async def process_page(page: Page, current_url: str, conn) -> set:
     """ Extrai links e conteúdo de uma página, insere no DB e retorna novos links. """
     new_links_found = set()
@@ -91,12 +80,17 @@ async def process_page(page: Page, current_url: str, conn) -> set:
 
         # --- Inserção no Banco de Dados ---
         if paragraphs:
-            for para_text in paragraphs:
-                if not check_if_exists(conn, TABLE_NAME, para_text):
-                    # ATENÇÃO: Inserindo dados de TODO o site na tabela 'prape'!
-                    insert_id = insert_data(conn, TABLE_NAME, page_title, para_text)
+            # ATENÇÃO: Inserindo dados de TODO o site no corpus (pages/paragraphs, lido via view 'prape')!
+            page_id = registrar_pagina(conn, current_url, page_title, paragraphs)
+            if page_id is None:
+                print("  Página sem alterações desde a última coleta.")
+            else:
+                for position, para_text in enumerate(paragraphs):
+                    # Deduplicação via índice UNIQUE no hash do conteúdo (adota parágrafos de páginas migradas sem URL)
+                    insert_id = inserir_paragrafo(conn, page_id, position, para_text)
                     if insert_id:
                         inserted_count_page += 1
+            conn.commit() # Uma transação por página
 
     except Exception as e:
         print(f"Erro inesperado ao processar conteúdo/links de {current_url}: {e}")
@@ -119,15 +113,11 @@ async def scrape_prape():
     if conn is None:
         print("Erro: Não foi possível conectar ao banco de dados.")
         return
+    # WAL permite que a API continue lendo enquanto o scraper escreve
+    configurar_wal(conn)
 
-    # Garante que a tabela existe
-    sql_create_prape_table = f""" CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
-                                        id integer PRIMARY KEY,
-                                        pergunta text, -- Título da página
-                                        resposta text NOT NULL,
-                                        UNIQUE(resposta)
-                                    ); """
-    create_table(conn, sql_create_prape_table)
+    # Garante o schema normalizado (migrando a tabela antiga, se houver) e o índice FTS5
+    preparar_corpus(conn)
 
     async with async_playwright() as p:
         try:
@@ -184,6 +174,13 @@ async def scrape_prape():
     print(f"Total de links únicos visitados: {len(visited_links)}")
 
     if conn:
+        # Páginas migradas cujos parágrafos foram todos adotados por páginas rastreadas (com URL)
+        removidas = remover_paginas_orfas(conn)
+        print(f"Páginas antigas sem parágrafos removidas: {removidas}")
+        # Reindexa os vetores com o corpus atualizado (etapa offline, fora do caminho de serviço)
+        construir_indice(conn, TABLE_NAME)
+        # Nova versão do corpus: a API descarta as respostas em cache calculadas sobre o conteúdo antigo
+        marcar_corpus_atualizado(conn)
         conn.close()
         print("Conexão com o banco de dados fechada.")
 
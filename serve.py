@@ -0,0 +1,130 @@
+import argparse
+import os
+import sys
+
+import uvicorn
+
+# Adiciona o diretório raiz ao sys.path para garantir que os módulos sejam encontrados
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.db_handler import DB_PATH, create_connection, configurar_wal
+from utils.corpus_store import preparar_corpus
+from utils.interaction_log import migrar_tabela_logs
+from utils.vector_index import arquivos_indice
+from utils.rate_limiter import GROQ_RPM, GROQ_TPM, GROQ_MAX_CONCURRENCY
+
+# --- Modo de produção: python serve.py (main.py continua sendo o modo de desenvolvimento, com reload) --- #
+# O processo principal prepara o banco uma única vez (WAL, schema normalizado, índice FTS5, tabela logs) e pede ao
+# kernel que traga para o page cache os arquivos somente-leitura; depois sobe LUMIA_WORKERS processos
+# uvicorn. Os workers não repetem a preparação (LUMIA_CORPUS_PREPARADO=1) e abrem o corpus (SQLite com
+# mmap_size) e o índice vetorial (np.load com mmap) em modo mmap: as páginas ficam uma única vez na RAM,
+# compartilhadas por todos os workers. Ficam em memória por worker apenas as estruturas pequenas
+# (índice de títulos, catálogos SIGAA/assistência, cardápio do RU, pesos do classificador de intenção).
+#
+# Dimensionamento (por variável de ambiente ou argumento):
+#   LUMIA_WORKERS            processos (padrão: núcleos, até 4). O serviço espera mais pela Groq do que
+#                            usa CPU; acima do número de núcleos só aumenta memória (~100 MB por worker).
+#   LUMIA_DB_POOL_SIZE       conexões read-only por worker (total = workers x pool).
+#   LUMIA_GROQ_RPM / _TPM / _MAX_CONCURRENCY
+#                            limites da conta Groq. São divididos entre os workers (cada um tem seu
+#                            limitador), e o número de workers fica limitado a _MAX_CONCURRENCY;
+#                            LUMIA_GROQ_LIMITS_PER_WORKER=1 usa os valores como estão.
+#   LUMIA_GRACEFUL_TIMEOUT   segundos para concluir as requisições em andamento ao receber SIGTERM,
+#                            antes do shutdown (grava logs e traces pendentes). Deve ser menor que o
+#                            prazo de parada do orquestrador de containers.
+#   LUMIA_LIMIT_CONCURRENCY  conexões simultâneas por worker antes de responder 503 (0 = sem limite).
+#   LUMIA_MAX_REQUESTS       reinicia o worker após N requisições (0 = nunca).
+#   LUMIA_BACKLOG, LUMIA_KEEPALIVE
+#                            fila de conexões do socket e keep-alive HTTP (segundos).
+# Métricas (GET /metrics), cache de respostas em memória e single-flight são por worker.
+HOST = os.getenv("LUMIA_HOST", "0.0.0.0")
+PORT = int(os.getenv("LUMIA_PORT", "8000"))
+WORKERS = int(os.getenv("LUMIA_WORKERS", str(min(os.cpu_count() or 1, 4))))
+GRACEFUL_TIMEOUT = int(os.getenv("LUMIA_GRACEFUL_TIMEOUT", "20"))
+LIMIT_CONCURRENCY = int(os.getenv("LUMIA_LIMIT_CONCURRENCY", "0"))
+MAX_REQUESTS = int(os.getenv("LUMIA_MAX_REQUESTS", "0"))
+BACKLOG = int(os.getenv("LUMIA_BACKLOG", "2048"))
+KEEPALIVE = int(os.getenv("LUMIA_KEEPALIVE", "5"))
+PRELOAD_WARM = os.getenv("LUMIA_PRELOAD_WARM", "1") != "0" # Pré-carrega os arquivos mmap no page cache
+GROQ_LIMITS_PER_WORKER = os.getenv("LUMIA_GROQ_LIMITS_PER_WORKER", "0") == "1"
+
+def preparar_corpus_uma_vez():
+    """ Etapas com escrita no banco, feitas só no processo principal (evita N workers migrando ao mesmo tempo). """
+    conn = create_connection()
+    if conn is None:
+        return
+    configurar_wal(conn)
+    preparar_corpus(conn)
+    migrar_tabela_logs(conn)
+    conn.close()
+
+def aquecer_arquivos(caminhos):
+    """ Pede ao kernel que leia os arquivos para o page cache (readahead assíncrono, sem copiá-los para este
+    processo): o primeiro acesso via mmap em cada worker já encontra as páginas em memória.
+    """
+    if not hasattr(os, "posix_fadvise"): # Windows/macOS: o page cache aquece nas primeiras consultas
+        return
+    total = 0
+    for caminho in caminhos:
+        if not os.path.exists(caminho):
+            continue
+        fd = os.open(caminho, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            total += os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+    print(f"Serve: {total / 1024 / 1024:.1f} MB de artefatos somente-leitura enviados ao page cache.")
+
+def dividir_limites_groq(workers: int) -> int:
+    """ Cada worker tem seu limitador; divide os limites da conta para que a soma não os ultrapasse.
+    Cada worker precisa de ao menos uma chamada simultânea, então sobem no máximo LUMIA_GROQ_MAX_CONCURRENCY
+    workers. Retorna o número de workers a usar.
+    """
+    if workers <= 1 or GROQ_LIMITS_PER_WORKER:
+        return workers
+    if workers > GROQ_MAX_CONCURRENCY:
+        print(f"Serve: AVISO: {workers} workers excedem LUMIA_GROQ_MAX_CONCURRENCY={GROQ_MAX_CONCURRENCY} "
+              f"(cada worker precisa de ao menos 1 chamada simultânea); usando {max(1, GROQ_MAX_CONCURRENCY)} worker(s).")
+        workers = max(1, GROQ_MAX_CONCURRENCY)
+        if workers == 1:
+            return workers
+    concorrencia = GROQ_MAX_CONCURRENCY // workers
+    os.environ["LUMIA_GROQ_RPM"] = str(GROQ_RPM / workers)
+    os.environ["LUMIA_GROQ_TPM"] = str(GROQ_TPM / workers)
+    os.environ["LUMIA_GROQ_MAX_CONCURRENCY"] = str(concorrencia)
+    print(f"Serve: Limites da Groq por worker: {GROQ_RPM / workers:g} RPM, {GROQ_TPM / workers:g} TPM, "
+          f"{concorrencia} simultâneas.")
+    return workers
+
+def main():
+    parser = argparse.ArgumentParser(description="LumIA em modo de produção (vários workers uvicorn).")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+
+    preparar_corpus_uma_vez()
+    if PRELOAD_WARM:
+        aquecer_arquivos([DB_PATH, f"{DB_PATH}-wal", *arquivos_indice().values()])
+    workers = dividir_limites_groq(workers)
+    os.environ["LUMIA_CORPUS_PREPARADO"] = "1" # Herdado pelos workers: o lifespan pula a preparação
+
+    print(f"Serve: Iniciando {workers} worker(s) em {args.host}:{args.port}.")
+    uvicorn.run(
+        "main:app",
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        limit_concurrency=LIMIT_CONCURRENCY or None,
+        limit_max_requests=MAX_REQUESTS or None,
+        backlog=BACKLOG,
+        timeout_keep_alive=KEEPALIVE,
+        access_log=False, # Cada interação já vai para a tabela `logs`
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Raiz do projeto no sys.path (os módulos importam `utils.*`, `agents.*` a partir dela)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# O cliente da Groq exige a chave na importação dos agentes; os testes nunca chamam a API
+os.environ.setdefault("GROQ_API_KEY", "teste")
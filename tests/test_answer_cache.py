@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+import utils.answer_cache as answer_cache
+from utils.answer_cache import AnswerCache
+
+RESULTADO = {"answer": "O RU abre às 11h.", "raw_answer": "O RU abre às 11h.", "logs": ["RU"], "agente": "RU"}
+
+@pytest.fixture
+def corpus(monkeypatch):
+    """ Versão do corpus controlada pelo teste (corpus["versao"]). """
+    corpus = {"versao": "v1"}
+    async def ler_versao():
+        return corpus["versao"]
+    monkeypatch.setattr(answer_cache, "ler_versao_corpus", ler_versao)
+    return corpus
+
+def _forcar_verificacao(cache: AnswerCache):
+    cache._versao_checada_em = float("-inf") # Não espera CORPUS_VERSION_CHECK_INTERVAL
+
+def test_nova_versao_do_corpus_invalida_o_cache(corpus, tmp_path):
+    async def cenario():
+        cache = AnswerCache(sqlite_path=str(tmp_path / "cache.db"))
+        try:
+            assert await cache.get("k") is None
+            assert await cache.set("k", RESULTADO)
+            assert (await cache.get("k"))[1] == "memória"
+
+            corpus["versao"] = "v2"
+            _forcar_verificacao(cache)
+            return await cache.get("k"), cache.stats["invalidacoes"]
+        finally:
+            await cache.close()
+
+    item, invalidacoes = asyncio.run(cenario())
+    assert item is None
+    assert invalidacoes == 1
+
+@pytest.mark.parametrize("resultado", [
+    {"answer": "Desculpe, não consegui gerar uma resposta agora."},
+    {"answer": "Trechos encontrados: ...", "degradado": True},
+    {"answer": "Hoje o cardápio é feijoada.", "cacheavel": False},
+    {"answer": ""},
+])
+def test_respostas_de_erro_ou_degradadas_nao_sao_guardadas(corpus, tmp_path, resultado):
+    async def cenario():
+        cache = AnswerCache(sqlite_path=str(tmp_path / "cache.db"))
+        try:
+            guardou = await cache.set("k", resultado)
+            return guardou, await cache.get("k")
+        finally:
+            await cache.close()
+
+    assert asyncio.run(cenario()) == (False, None)
+
+def test_camada_sqlite_sobrevive_a_reinicio(corpus, tmp_path):
+    caminho = str(tmp_path / "cache.db")
+
+    async def cenario():
+        anterior = AnswerCache(sqlite_path=caminho)
+        await anterior.get("k") # Lê a versão do corpus
+        await anterior.set("k", RESULTADO)
+        await anterior.close()
+
+        reiniciado = AnswerCache(sqlite_path=caminho)
+        try:
+            return await reiniciado.get("k"), await reiniciado.get("k")
+        finally:
+            await reiniciado.close()
+
+    primeiro, segundo = asyncio.run(cenario())
+    assert primeiro == (RESULTADO, "sqlite")
+    assert segundo == (RESULTADO, "memória") # Promovido para a memória
+
+def test_reinicio_com_outro_corpus_ignora_entradas_antigas(corpus, tmp_path):
+    caminho = str(tmp_path / "cache.db")
+
+    async def cenario():
+        anterior = AnswerCache(sqlite_path=caminho)
+        await anterior.get("k")
+        await anterior.set("k", RESULTADO)
+        await anterior.close()
+
+        corpus["versao"] = "v2" # Scraping enquanto o serviço estava parado
+        reiniciado = AnswerCache(sqlite_path=caminho)
+        try:
+            return await reiniciado.get("k")
+        finally:
+            await reiniciado.close()
+
+    assert asyncio.run(cenario()) is None
@@ -0,0 +1,75 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import agents.assistencia_agent as assistencia
+from agents.assistencia_agent import AssistenciaAgent
+
+MORADIA = ("auxilio_moradia", "Auxílio Moradia", "moradia", 400.0, "mensal", "Renda até 1,5 salário mínimo",
+           "RG\nComprovante de matrícula", "Apoio para aluguel.", None, None)
+
+class PoolFalso:
+    """ Catálogo da assistência em memória; sem catálogo, as tabelas não existem. """
+    def __init__(self):
+        self.auxilios = None
+        self.editais = []
+
+    async def fetchall(self, sql, params=(), consulta="fetchall"):
+        if self.auxilios is None:
+            raise sqlite3.OperationalError("no such table: auxilios")
+        if "FROM auxilios" in sql:
+            return list(self.auxilios)
+        if "FROM bolsas" in sql:
+            return []
+        return list(self.editais)
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = PoolFalso()
+    monkeypatch.setattr(assistencia, "get_db_pool", lambda: pool)
+    async def versao():
+        return "v0"
+    monkeypatch.setattr(assistencia, "ler_versao_corpus", versao)
+    return pool
+
+def _resposta(agente, pergunta):
+    resultado = asyncio.run(agente.responder_pergunta(pergunta))
+    return resultado["answer"] if resultado else None
+
+def test_catalogo_vazio_nao_e_definitivo(pool):
+    agente = AssistenciaAgent()
+    asyncio.run(agente.carregar())
+    assert _resposta(agente, "qual o valor do auxílio moradia?") is None
+    pool.auxilios = [MORADIA] # assistencia_ingest rodou
+    asyncio.run(agente.atualizar("v0"))
+    assert _resposta(agente, "qual o valor do auxílio moradia?") == "Auxílio Moradia: R$ 400,00 (mensal)."
+
+def test_nova_versao_do_corpus_traz_valores_e_editais_novos(pool):
+    pool.auxilios = [MORADIA]
+    agente = AssistenciaAgent()
+    asyncio.run(agente.carregar())
+    pool.auxilios = [MORADIA[:3] + (450.0,) + MORADIA[4:]]
+    pool.editais = [("01/2030", "Edital Moradia", "auxilio_moradia", "2030-01-10", "2030-01-20", None, None)]
+    asyncio.run(agente.atualizar("v1"))
+    assert _resposta(agente, "qual o valor do auxílio moradia?") == "Auxílio Moradia: R$ 450,00 (mensal)."
+    assert "01/2030" in _resposta(agente, "qual o prazo do auxílio moradia?")
+
+def test_recarga_com_erro_mantem_o_catalogo(pool):
+    pool.auxilios = [MORADIA]
+    agente = AssistenciaAgent()
+    asyncio.run(agente.carregar())
+    pool.auxilios = None
+    asyncio.run(agente.atualizar("v1"))
+    assert "auxilio_moradia" in agente.beneficios and agente.versao == "v0"
+
+def test_situacao_do_edital_usa_a_data_local(pool, monkeypatch):
+    pool.auxilios = [MORADIA]
+    pool.editais = [("02/2026", "Edital Moradia", "auxilio_moradia", "2026-03-01", "2026-03-10", None, None)]
+    agente = AssistenciaAgent()
+    asyncio.run(agente.carregar())
+    # 10/03 às 22h em João Pessoa (11/03 em UTC): último dia de inscrição
+    monkeypatch.setattr(assistencia, "hoje", lambda: assistencia.date(2026, 3, 10))
+    assert "inscrições abertas" in agente._prazos("auxilio_moradia", "Auxílio Moradia")
+    monkeypatch.setattr(assistencia, "hoje", lambda: assistencia.date(2026, 3, 11))
+    assert "inscrições encerradas" in agente._prazos("auxilio_moradia", "Auxílio Moradia")
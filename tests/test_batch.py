@@ -0,0 +1,53 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import routes.assistente as assistente
+from routes.assistente import BatchQuestionRequest, ask_batch
+
+@pytest.fixture
+def orquestrador(monkeypatch):
+    """ Substitui o orquestrador da rota: registra as chamadas e falha nas perguntas com "falha". """
+    chamadas = {"lote": [], "rotear": []}
+
+    async def chaves_cache_lote(perguntas):
+        chamadas["lote"].append(list(perguntas))
+        return {p: f"chave:{p}" for p in perguntas}
+
+    async def rotear(pergunta, chave_cache=None):
+        chamadas["rotear"].append((pergunta, chave_cache))
+        if "falha" in pergunta:
+            raise sqlite3.OperationalError("database is locked")
+        return {"answer": f"resposta de {pergunta}", "raw_answer": None, "logs": [], "agente": "PRAPE"}
+
+    monkeypatch.setattr(assistente, "chaves_cache_lote", chaves_cache_lote)
+    monkeypatch.setattr(assistente, "rotear", rotear)
+    return chamadas
+
+def _responder(perguntas):
+    return asyncio.run(ask_batch(BatchQuestionRequest(questions=perguntas, concurrency=2)))
+
+def test_chaves_calculadas_numa_unica_passada_e_repassadas(orquestrador):
+    resposta = _responder(["bolsa", "ru", "bolsa"])
+    assert orquestrador["lote"] == [["bolsa", "ru", "bolsa"]]
+    assert sorted(orquestrador["rotear"]) == [("bolsa", "chave:bolsa"), ("bolsa", "chave:bolsa"), ("ru", "chave:ru")]
+    assert [r.answer for r in resposta.results] == ["resposta de bolsa", "resposta de ru", "resposta de bolsa"]
+    assert all(r.error is None for r in resposta.results)
+
+def test_erro_em_um_item_nao_derruba_o_lote(orquestrador):
+    resposta = _responder(["bolsa", "falha no ru", "", "sigaa"])
+    erros = {r.index: r.error for r in resposta.results}
+    assert erros[0] is None and erros[3] is None
+    assert erros[1] == "OperationalError: database is locked"
+    assert erros[2].startswith("ValueError")
+    assert [r.index for r in resposta.results] == [0, 1, 2, 3]
+
+def test_falha_na_passada_em_grupo_cai_para_a_chave_por_item(orquestrador, monkeypatch):
+    async def lote_quebrado(perguntas):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(assistente, "chaves_cache_lote", lote_quebrado)
+
+    resposta = _responder(["bolsa", "ru"])
+    assert all(r.error is None for r in resposta.results)
+    assert sorted(orquestrador["rotear"]) == [("bolsa", None), ("ru", None)] # rotear calcula a própria chave
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+import agents.registry as registry
+from agents.registry import AgentRegistry, CircuitBreaker, prazo_llm
+
+class Relogio:
+    """ Relógio controlado pelo teste no lugar de time.monotonic (que o event loop também usa: só em testes síncronos). """
+    def __init__(self):
+        self.agora = 1000.0
+    def __call__(self):
+        return self.agora
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(registry.time, "monotonic", relogio)
+    return relogio
+
+def test_abre_apos_falhas_seguidas(relogio):
+    breaker = CircuitBreaker(falhas_para_abrir=3, tempo_aberto=30)
+    for _ in range(2):
+        breaker.registrar_falha()
+    assert breaker.estado == "fechado" and breaker.permitir()
+    breaker.registrar_falha()
+    assert breaker.estado == "aberto"
+    assert not breaker.permitir()
+
+def test_sucesso_zera_falhas_seguidas(relogio):
+    breaker = CircuitBreaker(falhas_para_abrir=2, tempo_aberto=30)
+    breaker.registrar_falha()
+    breaker.registrar_sucesso()
+    breaker.registrar_falha()
+    assert breaker.estado == "fechado"
+
+def test_semiaberto_deixa_passar_uma_chamada_de_teste(relogio):
+    breaker = CircuitBreaker(falhas_para_abrir=1, tempo_aberto=30)
+    breaker.registrar_falha()
+    relogio.agora += 29
+    assert not breaker.permitir()
+    relogio.agora += 1
+    assert breaker.permitir() and breaker.estado == "semiaberto"
+    assert not breaker.permitir() # Só uma chamada de teste por vez
+
+def test_semiaberto_fecha_no_sucesso_e_reabre_na_falha(relogio):
+    breaker = CircuitBreaker(falhas_para_abrir=5, tempo_aberto=30)
+    for _ in range(5):
+        breaker.registrar_falha()
+    relogio.agora += 30
+    breaker.permitir()
+    breaker.registrar_falha() # Uma falha no teste basta para reabrir
+    assert breaker.estado == "aberto" and not breaker.permitir()
+    relogio.agora += 30
+    breaker.permitir()
+    breaker.registrar_sucesso()
+    assert breaker.estado == "fechado" and breaker.falhas_seguidas == 0
+
+def test_teste_cancelado_volta_a_aberto_e_testa_de_novo(relogio):
+    breaker = CircuitBreaker(falhas_para_abrir=1, tempo_aberto=30)
+    breaker.registrar_falha()
+    relogio.agora += 30
+    breaker.permitir()
+    breaker.cancelar_teste()
+    assert breaker.estado == "aberto"
+    assert breaker.permitir() # O prazo aberto já passou: a próxima chamada é o novo teste
+
+def test_registry_pula_agente_com_disjuntor_aberto():
+    chamadas = []
+    async def quebrado(pergunta):
+        chamadas.append(pergunta)
+        raise RuntimeError("fora do ar")
+
+    reg = AgentRegistry()
+    agente = reg.registrar("X", quebrado, ["x"], prioridade=1)
+    agente.breaker = CircuitBreaker(falhas_para_abrir=2, tempo_aberto=30)
+
+    async def cenario():
+        return [await reg.chamar(agente, f"p{i}") for i in range(3)]
+
+    assert asyncio.run(cenario()) == [None, None, None]
+    assert chamadas == ["p0", "p1"]
+    assert agente.stats["erros"] == 2 and agente.stats["puladas_breaker"] == 1
+    assert agente.saude()["breaker"] == "aberto"
+
+def test_registry_timeout_conta_como_falha():
+    async def lento(pergunta):
+        await asyncio.sleep(1)
+
+    reg = AgentRegistry()
+    agente = reg.registrar("Lento", lento, ["x"], prioridade=1, timeout=0.01)
+    agente.breaker = CircuitBreaker(falhas_para_abrir=1, tempo_aberto=30)
+    assert asyncio.run(reg.chamar(agente, "p")) is None
+    assert agente.stats["timeouts"] == 1 and agente.breaker.estado == "aberto"
+
+def test_prazo_llm_dentro_do_prazo_do_agente():
+    assert prazo_llm(15) == 15 - registry.AGENT_LLM_MARGIN
+    assert prazo_llm(4) == 2 # Margem maior que metade do prazo: o LLM fica com a metade
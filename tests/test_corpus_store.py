@@ -0,0 +1,65 @@
+import sqlite3
+
+import pytest
+
+from utils.corpus_store import inserir_paragrafo, migrar_prape, preparar_corpus, registrar_pagina, remover_paginas_orfas
+from utils.db_handler import registrar_funcoes
+
+LONGO = "Texto longo do edital de auxílio moradia. " * 30 # Acima de LUMIA_COMPRESS_MIN_LEN: vai comprimido
+
+@pytest.fixture
+def conn(tmp_path):
+    """ Banco no formato antigo: tabela `prape` com o título repetido em cada parágrafo (e uma duplicata). """
+    conn = sqlite3.connect(tmp_path / "lumia.db")
+    registrar_funcoes(conn)
+    conn.execute(""" CREATE TABLE prape (id integer PRIMARY KEY, pergunta text, resposta text NOT NULL,
+                                         resposta_hash integer) """)
+    conn.executemany("INSERT INTO prape(id, pergunta, resposta) VALUES (?, ?, ?)", [
+        (1, "Auxílio Moradia", "Primeiro parágrafo."),
+        (2, "Auxílio Moradia", LONGO),
+        (3, "Restaurante Universitário", "Cardápio da semana."),
+        (4, "Restaurante Universitário", "Primeiro parágrafo."), # Duplicata do id 1
+        (7, "Auxílio Moradia", "Terceiro parágrafo."),
+    ])
+    conn.commit()
+    yield conn
+    conn.close()
+
+def _tipo(conn, nome):
+    return conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (nome,)).fetchone()[0]
+
+def test_migrar_prape_preserva_ids_e_conteudo(conn):
+    assert migrar_prape(conn) is True
+    assert _tipo(conn, "prape") == "view"
+    linhas = conn.execute("SELECT id, pergunta, resposta, position FROM prape ORDER BY id").fetchall()
+    assert linhas == [
+        (1, "Auxílio Moradia", "Primeiro parágrafo.", 0),
+        (2, "Auxílio Moradia", LONGO, 1),
+        (3, "Restaurante Universitário", "Cardápio da semana.", 0),
+        (7, "Auxílio Moradia", "Terceiro parágrafo.", 2),
+    ]
+
+def test_migrar_prape_uma_pagina_por_titulo_e_comprime(conn):
+    migrar_prape(conn)
+    paginas = conn.execute("SELECT title, url, content_hash IS NOT NULL FROM pages ORDER BY title").fetchall()
+    assert paginas == [("Auxílio Moradia", None, 1), ("Restaurante Universitário", None, 1)]
+    texto, texto_z = conn.execute("SELECT texto, texto_z FROM paragraphs WHERE id = 2").fetchone()
+    assert texto is None and texto_z is not None
+    assert conn.execute("SELECT texto FROM paragraphs WHERE id = 1").fetchone()[0] == "Primeiro parágrafo."
+
+def test_preparar_corpus_idempotente_com_fts(conn):
+    preparar_corpus(conn)
+    preparar_corpus(conn) # Já migrado: não faz nada de novo
+    assert conn.execute("SELECT COUNT(*) FROM paragraphs").fetchone()[0] == 4
+    ids = conn.execute("SELECT rowid FROM prape_fts WHERE prape_fts MATCH 'cardapio'").fetchall()
+    assert ids == [(3,)]
+
+def test_scraper_adota_paragrafo_migrado(conn):
+    preparar_corpus(conn)
+    page_id = registrar_pagina(conn, "https://www.ufpb.br/ru", "Restaurante Universitário", ["Cardápio da semana."])
+    assert inserir_paragrafo(conn, page_id, 0, "Cardápio da semana.") == 3 # Mesmo id, nova página
+    assert conn.execute("SELECT url FROM prape WHERE id = 3").fetchone()[0] == "https://www.ufpb.br/ru"
+    assert remover_paginas_orfas(conn) == 1 # A página migrada do RU ficou vazia
+    # Já pertence a uma página rastreada: não é adotado de novo
+    outra = registrar_pagina(conn, "https://www.ufpb.br/outra", "Outra", ["Cardápio da semana."])
+    assert inserir_paragrafo(conn, outra, 0, "Cardápio da semana.") is None
@@ -0,0 +1,61 @@
+import asyncio
+import sqlite3
+
+import utils.corpus_watcher as cw
+from utils.corpus_watcher import CorpusWatcher
+
+def _versoes(monkeypatch, *respostas):
+    """ ler_versao_corpus devolve (ou levanta) as respostas em sequência. """
+    fila = list(respostas)
+    async def ler():
+        resposta = fila.pop(0)
+        if isinstance(resposta, Exception):
+            raise resposta
+        return resposta
+    monkeypatch.setattr(cw, "ler_versao_corpus", ler)
+
+def test_verificar_passa_a_versao_e_isola_erros_das_recargas(monkeypatch):
+    _versoes(monkeypatch, "v1")
+    recebidas = []
+    async def quebrada(versao):
+        raise RuntimeError("tabela sumiu")
+    async def ok(versao):
+        recebidas.append(versao)
+
+    watcher = CorpusWatcher(intervalo=60)
+    watcher.registrar("quebrada", quebrada)
+    watcher.registrar("ok", ok)
+    asyncio.run(watcher.verificar())
+    assert recebidas == ["v1"]
+    assert watcher.stats == {"verificacoes": 1, "erros": 1}
+
+def test_versao_indisponivel_pula_a_rodada(monkeypatch):
+    _versoes(monkeypatch, sqlite3.OperationalError("database is locked"))
+    chamadas = []
+    async def recarga(versao):
+        chamadas.append(versao)
+
+    watcher = CorpusWatcher(intervalo=60)
+    watcher.registrar("x", recarga)
+    asyncio.run(watcher.verificar())
+    assert chamadas == [] and watcher.stats["erros"] == 1
+
+def test_task_periodica_roda_e_para(monkeypatch):
+    _versoes(monkeypatch, *["v1"] * 100)
+    chamadas = []
+    async def recarga(versao):
+        chamadas.append(versao)
+
+    async def cenario():
+        watcher = CorpusWatcher(intervalo=0.01)
+        watcher.registrar("x", recarga)
+        watcher.iniciar()
+        await asyncio.sleep(0.1)
+        await watcher.parar()
+        parou_com = len(chamadas)
+        await asyncio.sleep(0.05)
+        return parou_com
+
+    parou_com = asyncio.run(cenario())
+    assert parou_com >= 2
+    assert len(chamadas) == parou_com # Nada roda depois de parar
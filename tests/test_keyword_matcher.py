@@ -0,0 +1,49 @@
+from utils.keyword_matcher import KeywordMatcher
+
+CATEGORIAS = {
+    "RU": ["ru", "restaurante universitário", "cardápio"],
+    "SIGAA": ["sigaa", "matrícula", "trancamento"],
+    "ASSISTENCIA": ["auxílio", "bolsa", "auxílio moradia"],
+    "UFPB": ["ufpb", "curso", "campus"],
+}
+
+def test_fronteira_de_palavra():
+    matcher = KeywordMatcher(CATEGORIAS)
+    assert matcher.encontrar("qual a estrutura do curso?") == ["curso"] # "ru" não casa dentro de "estrutura"
+    assert matcher.encontrar("onde fica a rua do campus") == ["campus"]
+    assert matcher.encontrar("o RU abre hoje?") == ["ru"]
+    assert matcher.encontrar("bolsista") == [] # Prefixo não basta
+
+def test_acentos_caixa_e_espacos():
+    matcher = KeywordMatcher(CATEGORIAS)
+    assert matcher.encontrar("Cardapio do Restaurante   Universitario") == ["cardapio", "restaurante universitario"]
+    assert matcher.encontrar("MATRÍCULA no SIGAA") == ["matricula", "sigaa"]
+
+def test_plurais_simples():
+    matcher = KeywordMatcher(CATEGORIAS)
+    assert matcher.encontrar("bolsas e auxílios") == ["bolsa", "auxilio"]
+    assert matcher.encontrar("os cursos da UFPB") == ["curso", "ufpb"]
+
+def test_termo_mais_longo_tem_precedencia():
+    matcher = KeywordMatcher(CATEGORIAS)
+    assert matcher.encontrar("inscrição no auxílio moradia") == ["auxilio moradia"]
+
+def test_pontuar_pesa_termos_compostos_e_desempata_pela_ordem():
+    matcher = KeywordMatcher(CATEGORIAS)
+    assert matcher.pontuar("auxílio moradia no campus") == [("ASSISTENCIA", 2.0), ("UFPB", 1.0)]
+    assert matcher.pontuar("matrícula no RU") == [("RU", 1.0), ("SIGAA", 1.0)] # Empate: ordem de declaração
+    assert matcher.pontuar("bom dia") == []
+
+def test_termo_em_varias_categorias_e_matcher_vazio():
+    matcher = KeywordMatcher({"A": ["edital"], "B": ["Edital"]})
+    assert matcher.pontuar("edital aberto") == [("A", 1.0), ("B", 1.0)]
+    assert KeywordMatcher({}).encontrar("qualquer coisa") == []
+
+def test_palavras_chave_dos_agentes_nao_casam_palavras_acentuadas_comuns():
+    # O matcher ignora acentos: uma palavra-chave "ira" casaria o verbo "irá"
+    from agents.registry import get_agent_registry
+    import orchestrator.router # noqa: F401 - registra os agentes
+
+    ranking = [agente.nome for agente, _ in get_agent_registry().ranquear("o auxílio irá atrasar?")]
+    assert ranking[0] == "ASSISTENCIA" and "SIGAA" not in ranking
+    assert [agente.nome for agente, _ in get_agent_registry().ranquear("como calcular o meu IRA?")] == ["SIGAA"]
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+import utils.rate_limiter as rl
+from utils.rate_limiter import LimiteExcedido, RateLimiter, _TokenBucket, calcular_backoff, ler_retry_after
+
+class Relogio:
+    """ Substitui time.monotonic do módulo por um relógio controlado pelo teste. """
+    def __init__(self):
+        self.agora = 1000.0
+    def __call__(self):
+        return self.agora
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(rl.time, "monotonic", relogio)
+    return relogio
+
+def test_token_bucket_comeca_cheio_e_repoe_pela_taxa(relogio):
+    balde = _TokenBucket(60) # 1 por segundo
+    assert balde.espera_para(60) == 0.0
+    balde.consumir(60)
+    assert balde.espera_para(1) == pytest.approx(1.0)
+    relogio.agora += 30
+    assert balde.espera_para(30) == 0.0
+    assert balde.espera_para(40) == pytest.approx(10.0)
+
+def test_token_bucket_nao_passa_da_capacidade(relogio):
+    balde = _TokenBucket(60)
+    relogio.agora += 3600
+    assert balde.espera_para(0) == 0.0
+    assert balde.nivel == 60
+
+def test_token_bucket_pedido_maior_que_o_balde_espera_encher(relogio):
+    balde = _TokenBucket(60)
+    balde.consumir(60)
+    assert balde.espera_para(500) == pytest.approx(60.0) # Não fica impossível: espera o balde cheio
+
+def test_token_bucket_saldo_negativo_apos_corrigir_uso(relogio):
+    balde = _TokenBucket(60)
+    balde.consumir(80) # Uso real maior que o reservado (registrar_uso)
+    assert balde.espera_para(1) == pytest.approx(21.0)
+
+def test_calcular_backoff_exponencial_limitado(monkeypatch):
+    monkeypatch.setattr(rl.random, "uniform", lambda a, b: b) # Pior caso do jitter
+    assert calcular_backoff(0) == rl.BACKOFF_BASE
+    assert calcular_backoff(2) == rl.BACKOFF_BASE * 4
+    assert calcular_backoff(50) == rl.BACKOFF_MAX
+
+def test_calcular_backoff_jitter_total():
+    for tentativa in range(6):
+        atraso = calcular_backoff(tentativa)
+        assert 0 <= atraso <= min(rl.BACKOFF_MAX, rl.BACKOFF_BASE * 2 ** tentativa)
+
+def test_calcular_backoff_respeita_retry_after():
+    for _ in range(20):
+        atraso = calcular_backoff(0, retry_after=7)
+        assert 7 <= atraso <= 7 + rl.BACKOFF_BASE
+
+def test_ler_retry_after():
+    assert ler_retry_after({"retry-after": "12"}) == 12.0
+    assert ler_retry_after({"retry-after": "-3"}) == 0.0
+    assert ler_retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0 # Data no passado
+    assert ler_retry_after({"retry-after": "amanhã"}) is None
+    assert ler_retry_after({}) is None
+
+def test_vaga_rejeita_quando_espera_passa_do_limite():
+    async def cenario():
+        limitador = RateLimiter(rpm=60, tpm=6000, max_concorrencia=1, max_espera=1)
+        limitador.pausar(30) # 429 com Retry-After de 30s
+        with pytest.raises(LimiteExcedido):
+            async with limitador.vaga(100):
+                pass
+        return limitador
+
+    limitador = asyncio.run(cenario())
+    assert limitador.stats["rejeitadas"] == 1 and limitador.stats["http_429"] == 1
+    assert limitador.fila == 0 and limitador.em_voo == 0
+
+def test_vaga_consome_baldes_e_libera_concorrencia():
+    async def cenario():
+        limitador = RateLimiter(rpm=60, tpm=6000, max_concorrencia=1, max_espera=1)
+        async with limitador.vaga(100) as esperado:
+            assert limitador.em_voo == 1
+        limitador.sincronizar({"x-ratelimit-remaining-tokens": "0"})
+        with pytest.raises(LimiteExcedido): # 500 tokens a 100/s: 5s de espera
+            async with limitador.vaga(500):
+                pass
+        return limitador, esperado
+
+    limitador, esperado = asyncio.run(cenario())
+    assert esperado < 1
+    assert limitador.stats["requisicoes"] == 1 and limitador.em_voo == 0
+    assert limitador._concorrencia.locked() is False
@@ -0,0 +1,73 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import agents.ru_agent as ru
+from agents.ru_agent import CardapioCache
+
+class PoolFalso:
+    """ Pool que devolve as linhas do RU ou falha como um banco ocupado. """
+    def __init__(self):
+        self.falhar = False
+        self.itens = "Arroz\nFeijão"
+        self.consultas = 0
+
+    async def fetchall(self, sql, params=(), consulta="fetchall"):
+        self.consultas += 1
+        if self.falhar:
+            raise sqlite3.OperationalError("database is locked")
+        if "ru_cardapio" in sql:
+            return [(ru.hoje().isoformat(), "almoco", self.itens)]
+        return [("preco", "Preço", "R$ 2,00")]
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = PoolFalso()
+    monkeypatch.setattr(ru, "get_db_pool", lambda: pool)
+    return pool
+
+def test_recarga_com_erro_mantem_os_dados_anteriores(pool):
+    cache = CardapioCache(ttl=600, retry=30)
+    assert asyncio.run(cache.recarregar("v1"))
+    pool.falhar = True
+    assert not asyncio.run(cache.recarregar("v2"))
+    assert cache.disponivel
+    assert cache.cardapio[(ru.hoje().isoformat(), "almoco")] == ["Arroz", "Feijão"]
+    assert cache.info["preco"] == ("Preço", "R$ 2,00")
+
+def test_recarga_com_erro_e_repetida_antes_do_ttl(pool):
+    cache = CardapioCache(ttl=600, retry=30)
+    asyncio.run(cache.recarregar("v1"))
+    pool.falhar = True
+    asyncio.run(cache.recarregar("v1"))
+    assert not cache.vencido("v1")
+    cache._falhou_em -= 30 # 30s depois, bem antes dos 600s do TTL
+    assert cache.vencido("v1")
+    pool.falhar = False
+    pool.itens = "Macarrão"
+    asyncio.run(cache.atualizar("v1"))
+    assert cache.cardapio[(ru.hoje().isoformat(), "almoco")] == ["Macarrão"]
+    assert not cache.vencido("v1")
+
+def test_atualizar_recarrega_com_nova_versao_ttl_ou_novo_dia(pool):
+    cache = CardapioCache(ttl=600, retry=30)
+    asyncio.run(cache.recarregar("v1"))
+    asyncio.run(cache.atualizar("v1"))
+    assert pool.consultas == 2 # Nada mudou: nenhuma consulta nova
+    asyncio.run(cache.atualizar("v2")) # ru_ingest rodou
+    assert pool.consultas == 4
+    cache._carregado_em -= 600
+    assert cache.vencido("v2")
+    asyncio.run(cache.atualizar("v2"))
+    cache._carregado_para = ru.hoje() - ru.timedelta(days=1) # Virada do dia
+    assert cache.vencido("v2")
+
+def test_primeira_carga_com_erro_deixa_o_agente_indisponivel(pool, monkeypatch):
+    async def versao():
+        return None
+    monkeypatch.setattr(ru, "ler_versao_corpus", versao)
+    pool.falhar = True
+    cache = CardapioCache()
+    asyncio.run(cache.garantir())
+    assert not cache.disponivel and cache.cardapio == {}
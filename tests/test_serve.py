@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+import serve
+
+@pytest.fixture
+def limites(monkeypatch):
+    monkeypatch.setattr(serve, "GROQ_RPM", 30.0)
+    monkeypatch.setattr(serve, "GROQ_TPM", 6000.0)
+    monkeypatch.setattr(serve, "GROQ_MAX_CONCURRENCY", 4)
+    monkeypatch.setattr(serve, "GROQ_LIMITS_PER_WORKER", False)
+    for nome in ("LUMIA_GROQ_RPM", "LUMIA_GROQ_TPM", "LUMIA_GROQ_MAX_CONCURRENCY"):
+        monkeypatch.delenv(nome, raising=False)
+
+def test_limites_divididos_entre_os_workers(limites):
+    assert serve.dividir_limites_groq(2) == 2
+    assert float(os.environ["LUMIA_GROQ_RPM"]) == 15
+    assert int(os.environ["LUMIA_GROQ_MAX_CONCURRENCY"]) == 2
+
+def test_workers_acima_da_concorrencia_da_conta_sao_limitados(limites):
+    assert serve.dividir_limites_groq(8) == 4
+    # A soma das concorrências por worker nunca passa do limite da conta
+    assert 4 * int(os.environ["LUMIA_GROQ_MAX_CONCURRENCY"]) <= 4
+    assert 4 * float(os.environ["LUMIA_GROQ_RPM"]) == 30
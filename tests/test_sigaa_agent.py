@@ -0,0 +1,72 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import agents.sigaa_agent as sigaa
+from agents.sigaa_agent import SIGAAAgent
+
+TRANCAMENTO = ("trancamento", "Trancamento de disciplina", "trancar disciplina\ntrancamento",
+               "Acesse o SIGAA\nClique em Trancar", None, None)
+ATESTADO = ("atestado", "Atestado de matrícula", "atestado de matricula\ncomprovante de matricula",
+            "Acesse o SIGAA\nEmita o atestado", None, None)
+
+class PoolFalso:
+    """ Pool com a tabela sigaa_content em memória; sem linhas definidas, a tabela não existe. """
+    def __init__(self):
+        self.linhas = None
+
+    async def fetchall(self, sql, params=(), consulta="fetchall"):
+        if self.linhas is None:
+            raise sqlite3.OperationalError("no such table: sigaa_content")
+        return list(self.linhas)
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = PoolFalso()
+    monkeypatch.setattr(sigaa, "get_db_pool", lambda: pool)
+    async def versao():
+        return "v0"
+    monkeypatch.setattr(sigaa, "ler_versao_corpus", versao)
+    return pool
+
+def test_carga_vazia_nao_e_definitiva(pool):
+    agente = SIGAAAgent()
+    asyncio.run(agente.carregar())
+    assert asyncio.run(agente.responder_pergunta("como trancar disciplina?")) is None
+    pool.linhas = [TRANCAMENTO] # sigaa_ingest rodou
+    asyncio.run(agente.atualizar("v0"))
+    assert asyncio.run(agente.responder_pergunta("como trancar disciplina?"))["answer"].startswith("Trancamento")
+
+def test_nova_versao_do_corpus_recarrega_os_procedimentos(pool):
+    pool.linhas = [TRANCAMENTO]
+    agente = SIGAAAgent()
+    asyncio.run(agente.carregar())
+    pool.linhas = [TRANCAMENTO, ATESTADO]
+    asyncio.run(agente.atualizar("v0")) # Mesma versão: nada muda
+    assert set(agente.respostas) == {"trancamento"}
+    asyncio.run(agente.atualizar("v1"))
+    assert set(agente.respostas) == {"trancamento", "atestado"} and agente.versao == "v1"
+
+def test_recarga_com_erro_mantem_os_procedimentos(pool):
+    pool.linhas = [TRANCAMENTO]
+    agente = SIGAAAgent()
+    asyncio.run(agente.carregar())
+    pool.linhas = None
+    asyncio.run(agente.atualizar("v1"))
+    assert set(agente.respostas) == {"trancamento"}
+    assert agente.versao == "v0" # A próxima verificação tenta de novo
+
+HISTORICO = ("historico", "Histórico escolar", "historico\nnota\nnotas finais", "Acesse o SIGAA\nEmita o histórico", None, None)
+
+def test_gatilho_unico_de_uma_palavra_nao_basta(pool):
+    pool.linhas = [TRANCAMENTO, HISTORICO]
+    agente = SIGAAAgent()
+    assert asyncio.run(agente.responder_pergunta("minha nota saiu?")) is None
+    assert asyncio.run(agente.responder_pergunta("como emitir o histórico escolar?"))["answer"].startswith("Histórico")
+
+def test_empate_entre_procedimentos_segue_para_o_llm(pool):
+    pool.linhas = [TRANCAMENTO, HISTORICO]
+    agente = SIGAAAgent()
+    assert asyncio.run(agente.responder_pergunta("trancar disciplina afeta as notas finais?")) is None
+    assert asyncio.run(agente.responder_pergunta("preciso trancar disciplina"))["answer"].startswith("Trancamento")
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+def _trabalho(chamadas, liberar: asyncio.Event, resultado="ok"):
+    """ Trabalho lento que conta as execuções e só termina quando `liberar` é setado. """
+    async def fn():
+        chamadas.append(1)
+        await liberar.wait()
+        return resultado
+    return fn
+
+def test_chamadas_concorrentes_executam_uma_vez():
+    async def cenario():
+        sf, chamadas, liberar = SingleFlight(), [], asyncio.Event()
+        tarefas = [asyncio.create_task(sf.executar("k", _trabalho(chamadas, liberar))) for _ in range(3)]
+        await asyncio.sleep(0)
+        liberar.set()
+        return sf, chamadas, await asyncio.gather(*tarefas)
+
+    sf, chamadas, resultados = asyncio.run(cenario())
+    assert len(chamadas) == 1
+    assert resultados == [("ok", False), ("ok", True), ("ok", True)]
+    assert sf.stats["lideres"] == 1 and sf.stats["coalescidas"] == 2
+    assert sf._voos == {} and sf._espera == {}
+
+def test_cancelar_lider_nao_afeta_coalescidos():
+    async def cenario():
+        sf, chamadas, liberar = SingleFlight(), [], asyncio.Event()
+        lider = asyncio.create_task(sf.executar("k", _trabalho(chamadas, liberar)))
+        await asyncio.sleep(0)
+        seguidor = asyncio.create_task(sf.executar("k", _trabalho(chamadas, liberar)))
+        await asyncio.sleep(0)
+        lider.cancel()
+        await asyncio.sleep(0)
+        liberar.set()
+        with pytest.raises(asyncio.CancelledError):
+            await lider
+        return sf, chamadas, await seguidor
+
+    sf, chamadas, resultado = asyncio.run(cenario())
+    assert resultado == ("ok", True)
+    assert len(chamadas) == 1 # O trabalho não foi refeito
+    assert sf.stats["cancelamentos"] == 1
+
+def test_trabalho_cancelado_quando_todos_desistem():
+    async def cenario():
+        sf, chamadas, liberar = SingleFlight(), [], asyncio.Event()
+        tarefas = [asyncio.create_task(sf.executar("k", _trabalho(chamadas, liberar))) for _ in range(2)]
+        await asyncio.sleep(0)
+        voo = sf._voos["k"]
+        for t in tarefas:
+            t.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        await asyncio.sleep(0)
+        return sf, voo
+
+    sf, voo = asyncio.run(cenario())
+    assert voo.cancelled()
+    assert sf.stats["cancelamentos"] == 2
+    assert sf._voos == {} and sf._espera == {}
+
+def test_voo_manual_abortado_pelo_lider_faz_coalescido_tentar_de_novo():
+    async def cenario():
+        sf, chamadas, liberar = SingleFlight(), [], asyncio.Event()
+        voo = sf.iniciar("k") # Ex.: streaming cujo cliente desconectou
+        seguidor = asyncio.create_task(sf.executar("k", _trabalho(chamadas, liberar, "novo")))
+        await asyncio.sleep(0)
+        sf.falhar(voo, asyncio.CancelledError())
+        await asyncio.sleep(0)
+        liberar.set()
+        return sf, chamadas, await seguidor
+
+    sf, chamadas, resultado = asyncio.run(cenario())
+    assert resultado == ("novo", False) # Virou líder de um novo voo
+    assert len(chamadas) == 1
+    assert sf.stats["cancelamentos"] == 0
+
+def test_erro_propagado_a_todos_e_chave_liberada():
+    async def cenario():
+        sf, liberar = SingleFlight(), asyncio.Event()
+        async def falha():
+            await liberar.wait()
+            raise ValueError("groq fora")
+        tarefas = [asyncio.create_task(sf.executar("k", falha)) for _ in range(2)]
+        await asyncio.sleep(0)
+        liberar.set()
+        return sf, await asyncio.gather(*tarefas, return_exceptions=True)
+
+    sf, resultados = asyncio.run(cenario())
+    assert all(isinstance(r, ValueError) for r in resultados)
+    assert sf.stats["erros"] == 1
+    assert sf._voos == {}
@@ -0,0 +1,53 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import agents.ufpb_agent as ufpb
+from agents.ufpb_agent import UFPBAgent
+
+class PoolFalso:
+    """ Tabela `pages` em memória; sem páginas definidas, o corpus ainda não foi migrado. """
+    def __init__(self):
+        self.paginas = None
+
+    async def fetchall(self, sql, params=(), consulta="fetchall"):
+        if self.paginas is None:
+            raise sqlite3.OperationalError("database is locked")
+        return list(self.paginas)
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = PoolFalso()
+    monkeypatch.setattr(ufpb, "get_db_pool", lambda: pool)
+    async def versao():
+        return "v0"
+    monkeypatch.setattr(ufpb, "ler_versao_corpus", versao)
+    return pool
+
+def test_novo_scraping_reconstroi_o_indice_de_titulos(pool):
+    pool.paginas = [(1, "Campus II - Areia", "https://www.ufpb.br/campus2"),
+                    (2, "Biblioteca Central", "https://www.ufpb.br/biblioteca")]
+    agente = UFPBAgent()
+    asyncio.run(agente.carregar())
+    assert [p for p, _ in agente.indice.candidatas("biblioteca central")] == [2]
+
+    # O scraper removeu a página 2 e publicou a 3
+    pool.paginas = [(1, "Campus II - Areia", "https://www.ufpb.br/campus2"),
+                    (3, "Biblioteca Setorial", "https://www.ufpb.br/bs")]
+    asyncio.run(agente.atualizar("v0"))
+    assert 2 in agente.indice.paginas # Mesma versão: nada muda
+    asyncio.run(agente.atualizar("v1"))
+    assert set(agente.indice.paginas) == {1, 3} and agente.versao == "v1"
+    assert [p for p, _ in agente.indice.candidatas("biblioteca")] == [3]
+
+def test_indice_vazio_ou_erro_na_recarga(pool):
+    agente = UFPBAgent()
+    asyncio.run(agente.carregar()) # Banco ocupado no startup
+    assert agente.indice.paginas == {}
+    pool.paginas = [(1, "Biblioteca Central", None)]
+    asyncio.run(agente.atualizar(None)) # Vazio não é definitivo, mesmo sem mudança de versão
+    assert set(agente.indice.paginas) == {1}
+    pool.paginas = None
+    asyncio.run(agente.atualizar("v2"))
+    assert set(agente.indice.paginas) == {1} and agente.versao == "v0"
@@ -0,0 +1,49 @@
+import asyncio
+import os
+import sqlite3
+
+import pytest
+
+import utils.vector_index as vi
+from utils.vector_index import VectorIndex, construir_indice, versao_atual
+
+@pytest.fixture
+def indice_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(vi, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(vi, "MANIFEST_PATH", os.path.join(str(tmp_path), "atual.json"))
+    return tmp_path
+
+def _corpus(paragrafos):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE paragrafos (id INTEGER PRIMARY KEY, pergunta TEXT, resposta TEXT)")
+    conn.executemany("INSERT INTO paragrafos VALUES (?, ?, ?)", paragrafos)
+    return conn
+
+def test_nova_versao_publicada_e_carregada_pela_recarga(indice_dir):
+    construir_indice(_corpus([(1, "RU", "cardápio do restaurante universitário")]), "paragrafos", dim=64)
+    indice = VectorIndex()
+    assert indice.carregar()
+    primeira = indice.versao
+    assert indice.buscar("restaurante universitário")[0]["id"] == 1
+
+    asyncio.run(indice.atualizar("v1")) # Manifesto inalterado: nada a recarregar
+    assert indice.versao == primeira
+
+    construir_indice(_corpus([(1, "RU", "cardápio do restaurante universitário"),
+                              (2, "Biblioteca", "horário da biblioteca central")]), "paragrafos", dim=64)
+    assert versao_atual() != primeira
+    asyncio.run(indice.atualizar("v2"))
+    assert indice.versao == versao_atual()
+    assert indice.buscar("biblioteca central")[0]["id"] == 2
+
+def test_versao_publicada_invalida_mantem_a_carregada(indice_dir):
+    construir_indice(_corpus([(1, "RU", "cardápio do restaurante universitário")]), "paragrafos", dim=64)
+    indice = VectorIndex()
+    assert indice.carregar()
+    primeira = indice.versao
+
+    construir_indice(_corpus([(1, "RU", "cardápio do restaurante universitário")]), "paragrafos", dim=64)
+    os.remove(vi.arquivos_indice()["ids"])
+    asyncio.run(indice.atualizar("v2"))
+    assert indice.versao == primeira
+    assert indice.buscar("restaurante universitário")[0]["id"] == 1
@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Iterable, Tuple
+
+import aiosqlite
+
+# Adiciona o diretório raiz ao sys.path para encontrar o módulo utils
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.text_normalizer import normalizar
+from utils.db_handler import DB_DIR
+from utils.corpus_watcher import CORPUS_VERSION_CHECK_INTERVAL, ler_versao_corpus
+
+# --- Configuração do cache de respostas --- #
+CACHE_MAX_ENTRIES = int(os.getenv("LUMIA_CACHE_MAX_ENTRIES", "1024")) # Tamanho do LRU em memória
+CACHE_TTL_SECONDS = float(os.getenv("LUMIA_CACHE_TTL", str(6 * 3600)))
+CACHE_SQLITE_ENABLED = os.getenv("LUMIA_CACHE_SQLITE", "1") == "1" # Camada persistente opcional
+CACHE_DB_PATH = os.path.join(DB_DIR, 'answer_cache.db') # Arquivo separado: o corpus é servido read-only
+# Respostas de erro do LLM ("Desculpe, ...") não são guardadas
+NON_CACHEABLE_PREFIX = "Desculpe"
+
+def montar_chave(pergunta: str, contexto_ids: Iterable[int]) -> str:
+    """ Chave = pergunta normalizada (caixa, acentos e espaços) + hash dos ids do contexto recuperado. """
+    ids = ",".join(str(i) for i in contexto_ids)
+    contexto_hash = hashlib.blake2b(ids.encode("utf-8"), digest_size=8).hexdigest()
+    return f"{normalizar(pergunta)}|{contexto_hash}"
+
+class AnswerCache:
+    """ Cache de respostas em duas camadas: LRU com TTL em memória e, opcionalmente, SQLite persistente.
+    Todas as entradas são descartadas quando a versão do corpus (tabela corpus_meta) muda.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS,
+                 sqlite_path: Optional[str] = CACHE_DB_PATH if CACHE_SQLITE_ENABLED else None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sqlite_path = sqlite_path
+        self._memoria: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._open_lock = asyncio.Lock()
+        self._corpus_versao: Optional[str] = None
+        self._versao_checada_em = 0.0
+        self.stats = {"hits_memoria": 0, "hits_sqlite": 0, "misses": 0, "sets": 0, "invalidacoes": 0}
+
+    async def _abrir_sqlite(self) -> Optional[aiosqlite.Connection]:
+        if self.sqlite_path is None:
+            return None
+        async with self._open_lock:
+            if self._conn is None:
+                try:
+                    self._conn = await aiosqlite.connect(self.sqlite_path)
+                    await self._conn.execute("PRAGMA journal_mode=WAL")
+                    await self._conn.execute("PRAGMA synchronous=NORMAL")
+                    await self._conn.execute(""" CREATE TABLE IF NOT EXISTS answer_cache (
+                                                    chave text PRIMARY KEY,
+                                                    valor text NOT NULL, -- JSON do resultado
+                                                    expira_em real NOT NULL,
+                                                    corpus_versao text
+                                                ); """)
+                    await self._conn.commit()
+                except aiosqlite.Error as e:
+                    print(f"AnswerCache: Erro ao abrir camada SQLite ({e}). Usando apenas memória.")
+                    self.sqlite_path = None
+                    self._conn = None
+        return self._conn
+
+    async def _verificar_versao_corpus(self):
+        """ Consulta (no máximo a cada CORPUS_VERSION_CHECK_INTERVAL) a versão do corpus e invalida se mudou. """
+        agora = time.monotonic()
+        if agora - self._versao_checada_em < CORPUS_VERSION_CHECK_INTERVAL:
+            return
+        self._versao_checada_em = agora
+        try:
+            versao = await ler_versao_corpus()
+        except Exception:
+            return # Banco indisponível agora: verifica de novo no próximo intervalo
+        if versao != self._corpus_versao:
+            if self._corpus_versao is not None:
+                print(f"AnswerCache: Corpus atualizado ({self._corpus_versao} -> {versao}). Invalidando cache.")
+                await self.limpar()
+            self._corpus_versao = versao
+
+    async def get(self, chave: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """ Retorna (resultado, camada) ou None. """
+        await self._verificar_versao_corpus()
+        agora = time.time()
+
+        item = self._memoria.get(chave)
+        if item is not None:
+            expira_em, valor = item
+            if expira_em > agora:
+                self._memoria.move_to_end(chave)
+                self.stats["hits_memoria"] += 1
+                return valor, "memória"
+            del self._memoria[chave]
+
+        conn = await self._abrir_sqlite()
+        if conn is not None:
+            async with conn.execute("SELECT valor, expira_em FROM answer_cache WHERE chave = ? AND corpus_versao IS ?",
+                                    (chave, self._corpus_versao)) as cursor:
+                row = await cursor.fetchone()
+            if row and row[1] > agora:
+                valor = json.loads(row[0])
+                self._guardar_memoria(chave, valor, row[1]) # Promove para a memória
+                self.stats["hits_sqlite"] += 1
+                return valor, "sqlite"
+
+        self.stats["misses"] += 1
+        return None
+
+    def _guardar_memoria(self, chave: str, valor: Dict[str, Any], expira_em: float):
+        self._memoria[chave] = (expira_em, valor)
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.max_entries:
+            self._memoria.popitem(last=False) # Remove o menos usado recentemente
+
+    async def set(self, chave: str, resultado: Dict[str, Any]) -> bool:
+        """ Guarda o resultado (apenas answer/raw_answer/logs/agente). Respostas de erro, respostas degradadas
+        (LLM indisponível, ver LLMAgent._falha) e as marcadas com "cacheavel": False não são guardadas.
+        """
+        answer = resultado.get("answer") or ""
+        if (not answer or answer.startswith(NON_CACHEABLE_PREFIX) or resultado.get("degradado")
+                or resultado.get("cacheavel") is False):
+            return False
+        valor = {"answer": answer, "raw_answer": resultado.get("raw_answer"), "logs": list(resultado.get("logs") or []),
+                 "agente": resultado.get("agente")}
+        expira_em = time.time() + self.ttl
+        self._guardar_memoria(chave, valor, expira_em)
+        conn = await self._abrir_sqlite()
+        if conn is not None:
+            await conn.execute("INSERT OR REPLACE INTO answer_cache(chave, valor, expira_em, corpus_versao) VALUES (?, ?, ?, ?)",
+                               (chave, json.dumps(valor, ensure_ascii=False), expira_em, self._corpus_versao))
+            await conn.commit()
+        self.stats["sets"] += 1
+        return True
+
+    async def limpar(self):
+        """ Invalida todas as entradas (memória e SQLite). """
+        self._memoria.clear()
+        conn = await self._abrir_sqlite()
+        if conn is not None:
+            await conn.execute("DELETE FROM answer_cache")
+            await conn.commit()
+        self.stats["invalidacoes"] += 1
+
+    def resumo_stats(self) -> str:
+        s = self.stats
+        return (f"hits_memoria={s['hits_memoria']} hits_sqlite={s['hits_sqlite']} misses={s['misses']} "
+                f"entradas={len(self._memoria)}")
+
+    async def close(self):
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+_answer_cache: Optional[AnswerCache] = None
+
+def get_answer_cache() -> AnswerCache:
+    """ Retorna o cache compartilhado do processo. """
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache()
+    return _answer_cache
+
+async def close_answer_cache():
+    global _answer_cache
+    if _answer_cache is not None:
+        await _answer_cache.close()
+        _answer_cache = None
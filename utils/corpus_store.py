@@ -0,0 +1,191 @@
+import sqlite3
+import sys
+import os
+from datetime import datetime, timezone
+from typing import Optional, List
+
+# Adiciona o diretório raiz ao sys.path para encontrar o módulo utils
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.db_handler import (
+    create_connection, comprimir_texto, hash_conteudo, garantir_hash_conteudo,
+)
+from utils.fts_search import criar_indice_fts, FTS_TABLE
+
+# --- Schema normalizado do corpus --- #
+# pages: uma linha por página rastreada; paragraphs: parágrafos com FK para a página.
+# `prape` passa a ser uma VIEW com as mesmas colunas de antes (id, pergunta, resposta),
+# então os agentes e o índice FTS continuam lendo "prape" sem mudanças.
+LEGACY_TABLE = "prape"
+
+SQL_CREATE_PAGES = """ CREATE TABLE IF NOT EXISTS pages (
+                            id integer PRIMARY KEY,
+                            url text UNIQUE,
+                            title text,
+                            fetched_at text,
+                            content_hash integer -- Hash do conteúdo da página (detecta páginas inalteradas)
+                        ); """
+SQL_CREATE_PARAGRAPHS = """ CREATE TABLE IF NOT EXISTS paragraphs (
+                                id integer PRIMARY KEY,
+                                page_id integer NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+                                position integer NOT NULL DEFAULT 0,
+                                texto text, -- Texto em claro (NULL quando comprimido)
+                                texto_z blob, -- Texto comprimido com zlib
+                                resposta_hash integer NOT NULL UNIQUE
+                            ); """
+SQL_CREATE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_paragraphs_page ON paragraphs(page_id, position)",
+    "CREATE INDEX IF NOT EXISTS idx_pages_title ON pages(title)",
+]
+SQL_CREATE_VIEW = f""" CREATE VIEW IF NOT EXISTS {LEGACY_TABLE} AS
+                            SELECT pa.id AS id,
+                                   pg.title AS pergunta,
+                                   COALESCE(pa.texto, descomprimir(pa.texto_z)) AS resposta,
+                                   pa.resposta_hash AS resposta_hash,
+                                   pa.page_id AS page_id,
+                                   pa.position AS position,
+                                   pg.url AS url
+                            FROM paragraphs pa
+                            JOIN pages pg ON pg.id = pa.page_id; """
+
+SQL_CREATE_META = """ CREATE TABLE IF NOT EXISTS corpus_meta (
+                            chave text PRIMARY KEY,
+                            valor text
+                        ); """
+
+def _tipo_objeto(conn: sqlite3.Connection, nome: str) -> Optional[str]:
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (nome,)).fetchone()
+    return row[0] if row else None
+
+def _criar_schema(conn: sqlite3.Connection):
+    conn.execute(SQL_CREATE_PAGES)
+    conn.execute(SQL_CREATE_PARAGRAPHS)
+    for sql in SQL_CREATE_INDEXES:
+        conn.execute(sql)
+
+def migrar_prape(conn: sqlite3.Connection) -> bool:
+    """ Migração única da tabela `prape` (título repetido por parágrafo) para pages/paragraphs.
+    Os ids dos parágrafos são preservados, então o índice vetorial continua válido.
+    :return: True se a migração foi executada agora.
+    """
+    garantir_hash_conteudo(conn, LEGACY_TABLE) # Deduplica antes (paragraphs.resposta_hash é UNIQUE)
+    total = conn.execute(f"SELECT COUNT(*) FROM {LEGACY_TABLE}").fetchone()[0]
+    print(f"Corpus: Migrando {total} parágrafos de '{LEGACY_TABLE}' para pages/paragraphs...")
+    try:
+        conn.execute("BEGIN")
+        _criar_schema(conn)
+        # Dados antigos não têm URL nem data de coleta: uma página por título distinto
+        conn.execute(f"INSERT INTO pages(title) SELECT DISTINCT pergunta FROM {LEGACY_TABLE}")
+        conn.execute(f""" INSERT INTO paragraphs(id, page_id, position, texto, resposta_hash)
+                          SELECT p.id, pg.id,
+                                 ROW_NUMBER() OVER (PARTITION BY pg.id ORDER BY p.id) - 1,
+                                 p.resposta, p.resposta_hash
+                          FROM {LEGACY_TABLE} p
+                          JOIN pages pg ON pg.title IS p.pergunta """)
+
+        # Comprime os parágrafos longos
+        longos = conn.execute("SELECT id, texto FROM paragraphs WHERE length(texto) > 0").fetchall()
+        comprimidos = [(blob, row_id) for row_id, texto in longos if (blob := comprimir_texto(texto)) is not None]
+        conn.executemany("UPDATE paragraphs SET texto = NULL, texto_z = ? WHERE id = ?", comprimidos)
+
+        # Hash por página (concatenação dos parágrafos em ordem)
+        por_pagina = {}
+        for page_id, texto in conn.execute(f"SELECT page_id, resposta FROM paragraphs JOIN {LEGACY_TABLE} USING (id) ORDER BY page_id, position"):
+            por_pagina.setdefault(page_id, []).append(texto)
+        conn.executemany("UPDATE pages SET content_hash = ? WHERE id = ?",
+                         [(hash_conteudo("\n".join(textos)), page_id) for page_id, textos in por_pagina.items()])
+
+        # O FTS antigo tem triggers na tabela; recriado abaixo sobre a view
+        conn.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        conn.execute(f"DROP TABLE {LEGACY_TABLE}")
+        conn.execute(SQL_CREATE_VIEW)
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Corpus: Erro na migração, nada foi alterado: {e}")
+        return False
+
+    print(f"Corpus: {len(por_pagina)} páginas e {total} parágrafos migrados ({len(comprimidos)} comprimidos).")
+    conn.execute("VACUUM") # Devolve ao disco o espaço dos títulos repetidos
+    return True
+
+def preparar_corpus(conn: sqlite3.Connection):
+    """ Garante o schema normalizado (migrando `prape` se necessário), a view de compatibilidade e o FTS. """
+    tipo = _tipo_objeto(conn, LEGACY_TABLE)
+    if tipo == "table":
+        migrar_prape(conn)
+    elif tipo is None:
+        _criar_schema(conn)
+        conn.execute(SQL_CREATE_VIEW)
+        conn.commit()
+    conn.execute(SQL_CREATE_META)
+    conn.execute("INSERT OR IGNORE INTO corpus_meta(chave, valor) VALUES ('versao', ?)", (_agora_iso(),))
+    conn.commit()
+    remover_paginas_orfas(conn)
+    criar_indice_fts(conn)
+
+def marcar_corpus_atualizado(conn: sqlite3.Connection) -> str:
+    """ Registra uma nova versão do corpus (ao fim de um scraping). Caches de resposta usam
+    esta versão para invalidar respostas calculadas sobre o conteúdo antigo.
+    """
+    # Microssegundos: ingestões em sequência (RU, SIGAA, assistência) no mesmo segundo geram versões distintas
+    versao = datetime.now(timezone.utc).isoformat(timespec="microseconds")
+    conn.execute(SQL_CREATE_META)
+    conn.execute("INSERT OR REPLACE INTO corpus_meta(chave, valor) VALUES ('versao', ?)", (versao,))
+    conn.commit()
+    return versao
+
+def _agora_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+def registrar_pagina(conn: sqlite3.Connection, url: str, titulo: str, paragrafos: List[str]) -> Optional[int]:
+    """ Insere/atualiza a página pela URL.
+    :return: id da página, ou None se o conteúdo não mudou desde a última coleta (nada a reinserir).
+    """
+    content_hash = hash_conteudo("\n".join(paragrafos))
+    row = conn.execute("SELECT id, content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+    if row and row[1] == content_hash:
+        return None
+    if row:
+        # Página mudou: os parágrafos antigos saem (os triggers removem do FTS) e entram os atuais
+        conn.execute("DELETE FROM paragraphs WHERE page_id = ?", (row[0],))
+    fetched_at = _agora_iso()
+    row = conn.execute(""" INSERT INTO pages(url, title, fetched_at, content_hash) VALUES (?, ?, ?, ?)
+                           ON CONFLICT(url) DO UPDATE SET title = excluded.title,
+                                                          fetched_at = excluded.fetched_at,
+                                                          content_hash = excluded.content_hash
+                           RETURNING id """, (url, titulo, fetched_at, content_hash)).fetchone()
+    return row[0]
+
+def inserir_paragrafo(conn: sqlite3.Connection, page_id: int, posicao: int, texto: str) -> Optional[int]:
+    """ Insere o parágrafo (comprimido se for longo), deduplicando pelo hash do conteúdo. Se o mesmo texto
+    já existe numa página migrada da tabela antiga (sem URL), o parágrafo passa para a página rastreada,
+    que tem URL e data de coleta; o id é mantido (índice vetorial e FTS continuam válidos).
+    :return: id inserido ou adotado, ou None se já pertencia a outra página rastreada.
+    """
+    blob = comprimir_texto(texto)
+    row = conn.execute(""" INSERT INTO paragraphs(page_id, position, texto, texto_z, resposta_hash)
+                           VALUES (?, ?, ?, ?, ?)
+                           ON CONFLICT(resposta_hash) DO UPDATE SET page_id = excluded.page_id,
+                                                                    position = excluded.position
+                               WHERE paragraphs.page_id IN (SELECT id FROM pages WHERE url IS NULL)
+                           RETURNING id """,
+                       (page_id, posicao, None if blob else texto, blob, hash_conteudo(texto))).fetchone()
+    return row[0] if row else None
+
+def remover_paginas_orfas(conn: sqlite3.Connection) -> int:
+    """ Apaga as páginas migradas (sem URL) que ficaram sem parágrafos depois que o scraper adotou o
+    conteúdo delas (ver `inserir_paragrafo`).
+    :return: Número de páginas removidas.
+    """
+    cur = conn.execute(""" DELETE FROM pages
+                           WHERE url IS NULL AND NOT EXISTS (SELECT 1 FROM paragraphs WHERE page_id = pages.id) """)
+    conn.commit()
+    return cur.rowcount
+
+# Migração manual: python utils/corpus_store.py
+if __name__ == '__main__':
+    conn = create_connection()
+    if conn is not None:
+        preparar_corpus(conn)
+        conn.close()
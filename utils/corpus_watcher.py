@@ -0,0 +1,100 @@
+import asyncio
+import os
+import sqlite3
+import sys
+from typing import Awaitable, Callable, Dict, Optional
+
+# Adiciona o diretório raiz ao sys.path para encontrar o módulo utils
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.db_handler import get_db_pool
+
+# --- Atualização dos dados mantidos em memória --- #
+# Intervalo entre leituras da versão do corpus (corpus_meta, ver utils/corpus_store.py); o cache de
+# respostas usa o mesmo intervalo para se invalidar depois de um scraping
+CORPUS_VERSION_CHECK_INTERVAL = float(os.getenv("LUMIA_CACHE_VERSION_CHECK", "30"))
+
+Recarga = Callable[[Optional[str]], Awaitable[None]]
+
+async def ler_versao_corpus() -> Optional[str]:
+    """ Versão atual do corpus, ou None se o banco ainda não tem corpus_meta. Outros erros são propagados. """
+    try:
+        row = await get_db_pool().fetchone("SELECT valor FROM corpus_meta WHERE chave = 'versao'",
+                                           consulta="versao_corpus")
+    except sqlite3.OperationalError as e:
+        if "no such table" in str(e):
+            return None
+        raise
+    return row[0] if row else None
+
+class CorpusWatcher:
+    """ Task de fundo que mantém atualizados os dados que agentes e índices carregam do DB para a memória.
+    A cada `intervalo` segundos lê a versão do corpus e chama cada recarga registrada com ela. A recarga
+    decide se há trabalho a fazer (versão diferente da carregada, dados vencidos, carga anterior falhou);
+    se falhar, deve manter os dados atuais: a próxima verificação tenta de novo.
+    """
+
+    def __init__(self, intervalo: float = CORPUS_VERSION_CHECK_INTERVAL):
+        self.intervalo = intervalo
+        self._recargas: Dict[str, Recarga] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"verificacoes": 0, "erros": 0}
+
+    def registrar(self, nome: str, recarga: Recarga):
+        self._recargas[nome] = recarga
+
+    async def verificar(self):
+        """ Uma rodada: lê a versão do corpus e passa por todas as recargas registradas. """
+        self.stats["verificacoes"] += 1
+        try:
+            versao = await ler_versao_corpus()
+        except Exception as e: # Banco ocupado/pool esgotado: fica para a próxima rodada
+            self.stats["erros"] += 1
+            print(f"CorpusWatcher: Versão do corpus indisponível ({type(e).__name__}: {e}).")
+            return
+        for nome, recarga in self._recargas.items():
+            try:
+                await recarga(versao)
+            except Exception as e:
+                self.stats["erros"] += 1
+                print(f"CorpusWatcher: Erro ao atualizar {nome} ({type(e).__name__}: {e}).")
+
+    async def _executar(self):
+        while True:
+            await asyncio.sleep(self.intervalo)
+            await self.verificar()
+
+    def iniciar(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._executar())
+            print(f"CorpusWatcher: Ativo a cada {self.intervalo:g}s ({', '.join(self._recargas) or 'nada registrado'}).")
+
+    async def parar(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+_corpus_watcher: Optional[CorpusWatcher] = None
+
+def get_corpus_watcher() -> CorpusWatcher:
+    """ Retorna o vigia compartilhado do processo. """
+    global _corpus_watcher
+    if _corpus_watcher is None:
+        _corpus_watcher = CorpusWatcher()
+    return _corpus_watcher
+
+def registrar_recarga(nome: str, recarga: Recarga):
+    """ Atalho usado pelos módulos que mantêm dados do DB em memória. """
+    get_corpus_watcher().registrar(nome, recarga)
+
+async def init_corpus_watcher():
+    """ Chamado no startup da API, depois das cargas iniciais. """
+    get_corpus_watcher().iniciar()
+
+async def close_corpus_watcher():
+    if _corpus_watcher is not None:
+        await _corpus_watcher.parar()
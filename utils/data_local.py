@@ -0,0 +1,13 @@
+import os
+from datetime import date, datetime, timedelta, timezone
+
+# --- Data local da UFPB --- #
+# Os containers rodam em UTC: entre 21h e 24h em João Pessoa, date.today() já é o dia seguinte. Cardápio
+# do dia, situação dos editais e demais respostas que dependem de "hoje" usam a data local
+# (LUMIA_RU_UTC_OFFSET continua aceito, do tempo em que só o agente do RU usava o fuso)
+UTC_OFFSET = int(os.getenv("LUMIA_UTC_OFFSET", os.getenv("LUMIA_RU_UTC_OFFSET", "-3"))) # Sem horário de verão
+FUSO_LOCAL = timezone(timedelta(hours=UTC_OFFSET))
+
+def hoje() -> date:
+    """ Data de hoje no fuso da UFPB. """
+    return datetime.now(FUSO_LOCAL).date()
@@ -1,19 +1,59 @@
 import sqlite3
 import os
+import sys
+import asyncio
+import hashlib
+import zlib
+from contextlib import asynccontextmanager
+from typing import Optional, List, Any, Sequence
+
+import aiosqlite
+
+# Adiciona o diretório raiz ao sys.path para encontrar o módulo utils
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.text_normalizer import normalizar
+from utils.metrics import DB_LATENCY
 
 DB_DIR = os.path.join(os.path.dirname(__file__), '..', 'db')
 DB_PATH = os.path.join(DB_DIR, 'lumia.db')
 
+# --- Configuração do pool de leitura (serviço) --- #
+POOL_SIZE = int(os.getenv("LUMIA_DB_POOL_SIZE", "4"))
+MMAP_SIZE = int(os.getenv("LUMIA_DB_MMAP_SIZE", str(256 * 1024 * 1024))) # bytes mapeados em memória
+CACHE_SIZE_KB = int(os.getenv("LUMIA_DB_CACHE_SIZE_KB", str(64 * 1024))) # cache de páginas por conexão
+
+# --- Compressão dos parágrafos (schema normalizado) --- #
+# Textos a partir deste tamanho são gravados com zlib; <= 0 desativa a compressão
+COMPRESS_MIN_LEN = int(os.getenv("LUMIA_COMPRESS_MIN_LEN", "512"))
+
 # Garante que o diretório db exista
 if not os.path.exists(DB_DIR):
     os.makedirs(DB_DIR)
 
+def comprimir_texto(texto):
+    """ Comprime o texto com zlib se valer a pena. Retorna o blob ou None (texto deve ficar em claro). """
+    if COMPRESS_MIN_LEN <= 0 or texto is None or len(texto) < COMPRESS_MIN_LEN:
+        return None
+    blob = zlib.compress(texto.encode("utf-8"), 6)
+    return blob if len(blob) < len(texto.encode("utf-8")) else None
+
+def descomprimir_texto(blob):
+    """ Inverso de `comprimir_texto`. Registrada no SQLite como `descomprimir()` (usada pela view prape). """
+    if blob is None:
+        return None
+    return zlib.decompress(blob).decode("utf-8")
+
+def registrar_funcoes(conn):
+    """ Registra as funções SQL exigidas pelo schema normalizado em uma conexão sqlite3. """
+    conn.create_function("descomprimir", 1, descomprimir_texto, deterministic=True)
+
 def create_connection():
     """ Cria uma conexão com o banco de dados SQLite especificado por DB_PATH """
     conn = None
     try:
         conn = sqlite3.connect(DB_PATH)
-        print(f"Conexão com SQLite DB versão {sqlite3.sqlite_version} bem-sucedida.")
+        registrar_funcoes(conn)
     except sqlite3.Error as e:
         print(f"Erro ao conectar ao banco de dados SQLite: {e}")
     return conn
@@ -42,18 +82,167 @@ def insert_data(conn, table, pergunta, resposta):
         print(f"Erro ao inserir dados na tabela {table}: {e}")
         return None
 
+def hash_conteudo(texto):
+    """ Hash de 64 bits (inteiro com sinal, cabe em INTEGER do SQLite) do texto normalizado.
+    Parágrafos que diferem só em caixa, acentos ou espaços recebem o mesmo hash.
+    """
+    digest = hashlib.blake2b(normalizar(texto).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+def garantir_hash_conteudo(conn, table):
+    """ Migração idempotente: adiciona a coluna `resposta_hash`, preenche as linhas antigas,
+    remove duplicatas (mantendo o menor id) e cria o índice UNIQUE usado na deduplicação.
+    """
+    try:
+        cur = conn.cursor()
+        colunas = [row[1] for row in cur.execute(f"PRAGMA table_info({table})")]
+        if "resposta_hash" not in colunas:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN resposta_hash INTEGER")
+
+        pendentes = cur.execute(f"SELECT id, resposta FROM {table} WHERE resposta_hash IS NULL").fetchall()
+        if pendentes:
+            print(f"Calculando hash de conteúdo para {len(pendentes)} registros de {table}...")
+            cur.executemany(f"UPDATE {table} SET resposta_hash = ? WHERE id = ?",
+                            [(hash_conteudo(resposta), row_id) for row_id, resposta in pendentes])
+            cur.execute(f""" DELETE FROM {table} WHERE id NOT IN (
+                                SELECT MIN(id) FROM {table} GROUP BY resposta_hash
+                            ) """)
+            if cur.rowcount:
+                print(f"{cur.rowcount} registros duplicados removidos de {table}.")
+
+        cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_resposta_hash ON {table}(resposta_hash)")
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Erro ao preparar hash de conteúdo na tabela {table}: {e}")
+
+def insert_data_unique(conn, table, pergunta, resposta, commit=True):
+    """ Insere o registro apenas se não houver outro com o mesmo hash de conteúdo (INSERT OR IGNORE).
+    Custa uma busca no índice UNIQUE, independente do tamanho do parágrafo ou da tabela.
+    :return: id inserido, ou None se já existia (ou em caso de erro).
+    """
+    sql = f''' INSERT OR IGNORE INTO {table}(pergunta,resposta,resposta_hash)
+              VALUES(?,?,?) '''
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, (pergunta, resposta, hash_conteudo(resposta)))
+        if commit:
+            conn.commit()
+        return cur.lastrowid if cur.rowcount == 1 else None
+    except sqlite3.Error as e:
+        print(f"Erro ao inserir dados na tabela {table}: {e}")
+        return None
+
+def configurar_wal(conn):
+    """ Ativa o modo WAL (persistente no arquivo): leitores não bloqueiam o scraper e vice-versa. """
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    except sqlite3.Error as e:
+        print(f"Erro ao ativar WAL: {e}")
+
+class AsyncDBPool:
+    """ Pool de conexões aiosqlite somente-leitura, compartilhado por todos os agentes.
+    As conexões são abertas uma vez (no startup da API) e reutilizadas a cada requisição;
+    cada uma roda em sua própria thread, então as consultas não bloqueiam o event loop.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, size: int = POOL_SIZE):
+        self.db_path = os.path.abspath(db_path)
+        self.size = size
+        self._queue: Optional[asyncio.Queue] = None
+        self._conns: List[aiosqlite.Connection] = []
+        self._open_lock = asyncio.Lock()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        # URI read-only: o processo de serviço nunca escreve no corpus
+        conn = await aiosqlite.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        await conn.create_function("descomprimir", 1, descomprimir_texto, deterministic=True)
+        await conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        await conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+        await conn.execute("PRAGMA temp_store=MEMORY")
+        await conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    async def open(self):
+        """ Abre as conexões do pool (idempotente). """
+        async with self._open_lock:
+            if self._queue is not None:
+                return
+            queue = asyncio.Queue()
+            for _ in range(self.size):
+                conn = await self._connect()
+                self._conns.append(conn)
+                queue.put_nowait(conn)
+            self._queue = queue
+            print(f"DBPool: {self.size} conexões read-only abertas (SQLite {sqlite3.sqlite_version}).")
+
+    async def close(self):
+        """ Fecha todas as conexões do pool. """
+        for conn in self._conns:
+            await conn.close()
+        self._conns = []
+        self._queue = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        """ Empresta uma conexão do pool; abre o pool sob demanda se o startup não o fez. """
+        if self._queue is None:
+            await self.open()
+        queue = self._queue
+        conn = await queue.get()
+        try:
+            yield conn
+        finally:
+            queue.put_nowait(conn)
+
+    async def fetchall(self, sql: str, params: Sequence[Any] = (), consulta: str = "fetchall") -> List[tuple]:
+        async with self.acquire() as conn:
+            with DB_LATENCY.tempo(consulta): # Só a consulta, sem a espera por uma conexão livre
+                async with conn.execute(sql, params) as cursor:
+                    return await cursor.fetchall()
+
+    async def fetchone(self, sql: str, params: Sequence[Any] = (), consulta: str = "fetchone") -> Optional[tuple]:
+        async with self.acquire() as conn:
+            with DB_LATENCY.tempo(consulta):
+                async with conn.execute(sql, params) as cursor:
+                    return await cursor.fetchone()
+
+_db_pool: Optional[AsyncDBPool] = None
+
+def get_db_pool() -> AsyncDBPool:
+    """ Retorna o pool compartilhado (criado uma única vez por processo). """
+    global _db_pool
+    if _db_pool is None:
+        _db_pool = AsyncDBPool()
+    return _db_pool
+
+async def init_db_pool() -> AsyncDBPool:
+    """ Chamado no startup da API: abre as conexões antes da primeira requisição. """
+    pool = get_db_pool()
+    await pool.open()
+    return pool
+
+async def close_db_pool():
+    """ Chamado no shutdown da API. """
+    global _db_pool
+    if _db_pool is not None:
+        await _db_pool.close()
+        _db_pool = None
+
 # Exemplo de uso (pode ser removido ou comentado)
 if __name__ == '__main__':
     sql_create_prape_table = """ CREATE TABLE IF NOT EXISTS prape (
                                         id integer PRIMARY KEY,
                                         pergunta text,
-                                        resposta text NOT NULL
+                                        resposta text NOT NULL,
+                                        resposta_hash integer
                                     ); """
 
     conn = create_connection()
 
     if conn is not None:
         create_table(conn, sql_create_prape_table)
+        garantir_hash_conteudo(conn, 'prape')
         # Exemplo de inserção
         # insert_id = insert_data(conn, 'prape', 'Qual o horário de funcionamento?', 'De segunda a sexta, das 8h às 17h.')
         # if insert_id:
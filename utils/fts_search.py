@@ -0,0 +1,250 @@
+import sqlite3
+import sys
+import os
+from typing import List, Dict, Any, Optional, Tuple
+
+# Adiciona o diretório raiz ao sys.path para encontrar o módulo utils
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.text_normalizer import tokenizar, radical, MIN_RADICAL
+from utils.metrics import DB_LATENCY
+from utils.tracing import span
+
+# --- Configuração do índice FTS5 --- #
+SOURCE_TABLE = "prape"
+FTS_TABLE = "prape_fts"
+# Peso do título (pergunta) e do parágrafo (resposta) no BM25
+BM25_WEIGHTS = (2.0, 1.0)
+SNIPPET_TOKENS = 24
+MAX_QUERY_TERMS = 12
+# Consultas por instrução em `buscar_fts_lote_async` (o SQLite aceita até 500 SELECTs num UNION ALL)
+LOTE_MAX_CONSULTAS = 200
+# Pesos da confiança do top-1 (ver `calcular_confianca`): cobertura dos termos, termos no título e
+# margem de score BM25 sobre o segundo colocado
+CONFIANCA_PESOS = {"cobertura": 0.6, "titulo": 0.2, "margem": 0.2}
+
+def criar_indice_fts(conn: sqlite3.Connection, source_table: str = SOURCE_TABLE, fts_table: str = FTS_TABLE) -> bool:
+    """ Cria (se necessário) a tabela virtual FTS5 espelhando `source_table` e os triggers de sincronização.
+    Na primeira criação o índice é reconstruído a partir do conteúdo existente.
+    :return: True se o índice estiver pronto para uso.
+    """
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table,))
+        existia = cur.fetchone() is not None
+
+        # Tabela "external content": o texto fica só em `source_table`, o FTS guarda apenas o índice invertido
+        cur.execute(f""" CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+                            pergunta, resposta,
+                            content='{source_table}', content_rowid='id',
+                            tokenize='unicode61 remove_diacritics 2'
+                        ); """)
+
+        # Triggers mantêm o índice sincronizado com inserts/updates/deletes feitos pelo scraper
+        cur.execute("SELECT type FROM sqlite_master WHERE name = ?", (source_table,))
+        tipo = cur.fetchone()
+        if tipo and tipo[0] == "view":
+            _criar_triggers_normalizado(cur, fts_table)
+        else:
+            _criar_triggers_tabela(cur, source_table, fts_table)
+
+        # Ranking padrão (coluna `rank`) = BM25 com peso maior para o título
+        weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+        cur.execute(f"INSERT INTO {fts_table}({fts_table}, rank) VALUES ('rank', 'bm25({weights})')")
+
+        if not existia:
+            print(f"FTS: Construindo índice {fts_table} a partir de {source_table}...")
+            cur.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"FTS: Erro ao criar índice {fts_table}: {e}")
+        return False
+
+def _criar_triggers_tabela(cur, source_table: str, fts_table: str):
+    """ Triggers para quando `source_table` é uma tabela simples (id, pergunta, resposta). """
+    cur.execute(f""" CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {source_table} BEGIN
+                        INSERT INTO {fts_table}(rowid, pergunta, resposta) VALUES (new.id, new.pergunta, new.resposta);
+                    END; """)
+    cur.execute(f""" CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {source_table} BEGIN
+                        INSERT INTO {fts_table}({fts_table}, rowid, pergunta, resposta) VALUES ('delete', old.id, old.pergunta, old.resposta);
+                    END; """)
+    cur.execute(f""" CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE ON {source_table} BEGIN
+                        INSERT INTO {fts_table}({fts_table}, rowid, pergunta, resposta) VALUES ('delete', old.id, old.pergunta, old.resposta);
+                        INSERT INTO {fts_table}(rowid, pergunta, resposta) VALUES (new.id, new.pergunta, new.resposta);
+                    END; """)
+
+def _criar_triggers_normalizado(cur, fts_table: str):
+    """ Triggers para o schema normalizado (view sobre pages/paragraphs, ver utils/corpus_store.py). """
+    titulo = "(SELECT title FROM pages WHERE id = {}.page_id)"
+    texto = "COALESCE({0}.texto, descomprimir({0}.texto_z))"
+    cur.execute(f""" CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON paragraphs BEGIN
+                        INSERT INTO {fts_table}(rowid, pergunta, resposta) VALUES (new.id, {titulo.format('new')}, {texto.format('new')});
+                    END; """)
+    cur.execute(f""" CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON paragraphs BEGIN
+                        INSERT INTO {fts_table}({fts_table}, rowid, pergunta, resposta) VALUES ('delete', old.id, {titulo.format('old')}, {texto.format('old')});
+                    END; """)
+    cur.execute(f""" CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE ON paragraphs BEGIN
+                        INSERT INTO {fts_table}({fts_table}, rowid, pergunta, resposta) VALUES ('delete', old.id, {titulo.format('old')}, {texto.format('old')});
+                        INSERT INTO {fts_table}(rowid, pergunta, resposta) VALUES (new.id, {titulo.format('new')}, {texto.format('new')});
+                    END; """)
+    # Título mudou: reindexa todos os parágrafos da página
+    cur.execute(f""" CREATE TRIGGER IF NOT EXISTS {fts_table}_pages_au AFTER UPDATE OF title ON pages BEGIN
+                        INSERT INTO {fts_table}({fts_table}, rowid, pergunta, resposta)
+                            SELECT 'delete', p.id, old.title, {texto.format('p')} FROM paragraphs p WHERE p.page_id = old.id;
+                        INSERT INTO {fts_table}(rowid, pergunta, resposta)
+                            SELECT p.id, new.title, {texto.format('p')} FROM paragraphs p WHERE p.page_id = new.id;
+                    END; """)
+
+def montar_consulta_fts(pergunta: str) -> Optional[str]:
+    """ Converte a pergunta livre em uma expressão MATCH do FTS5: o radical de cada termo como prefixo
+    ("bolsas" -> "bols"*, que casa "bolsa", "bolsas", "bolsista"), unidos por OR. Sem o prefixo a busca
+    perderia plurais e flexões que o LIKE '%termo%' original encontrava. O BM25 se encarrega de priorizar
+    os parágrafos que cobrem mais termos.
+    """
+    termos = []
+    for token in tokenizar(pergunta, min_len=3):
+        termo = radical(token)
+        if termo not in termos:
+            termos.append(termo)
+    if not termos:
+        return None
+    # Termos curtos (códigos como "iv") só casam exatos: como prefixo, "iv"* casaria "ivan", "ivone"...
+    return " OR ".join(f'"{t}"*' if len(t) >= MIN_RADICAL else f'"{t}"' for t in termos[:MAX_QUERY_TERMS])
+
+def _montar_sql(k: int, fts_table: str = FTS_TABLE, source_table: str = SOURCE_TABLE) -> str:
+    # O LIMIT fica na subconsulta: a proveniência (página/URL) só é buscada para os top-k
+    return f""" SELECT r.rowid, r.pergunta, r.resposta, r.rank, r.trecho, v.page_id, v.url
+                FROM (SELECT rowid, pergunta, resposta, rank,
+                             snippet({fts_table}, 1, '[', ']', '...', {SNIPPET_TOKENS}) AS trecho
+                      FROM {fts_table}
+                      WHERE {fts_table} MATCH ?
+                      ORDER BY rank
+                      LIMIT {int(k)}) r
+                JOIN {source_table} v ON v.id = r.rowid
+                ORDER BY r.rank """
+
+def _row_to_dict(row: Tuple) -> Dict[str, Any]:
+    # bm25() retorna valores negativos (menor = melhor); invertemos para "maior = melhor"
+    return {
+        "id": row[0],
+        "pergunta": row[1],
+        "resposta": row[2],
+        "score": -row[3],
+        "trecho": row[4],
+        "page_id": row[5],
+        "url": row[6],
+    }
+
+def buscar_fts(conn: sqlite3.Connection, pergunta: str, k: int = 3) -> List[Dict[str, Any]]:
+    """ Retorna os top-k parágrafos ranqueados por BM25, com trecho (snippet) destacado. """
+    consulta = montar_consulta_fts(pergunta)
+    if consulta is None:
+        return []
+    try:
+        cur = conn.execute(_montar_sql(k), (consulta,))
+        return [_row_to_dict(row) for row in cur.fetchall()]
+    except sqlite3.Error as e:
+        print(f"FTS: Erro na busca ranqueada: {e}")
+        return []
+
+def _radicais(texto: str) -> set:
+    # Mesma normalização da consulta: "bolsas" na pergunta cobre "bolsa" no parágrafo
+    return {radical(t) for t in tokenizar(texto, min_len=3)}
+
+def calcular_confianca(pergunta: str, resultados: List[Dict[str, Any]]) -> Dict[str, float]:
+    """ Confiança (0 a 1) de que o top-1 de `resultados` responde a pergunta sozinho.
+    Combina a fração dos termos da pergunta presentes no parágrafo/título (cobertura), a fração presente
+    no título e a margem relativa do score BM25 sobre o segundo resultado (passe k >= 2 na busca).
+    """
+    componentes = {"confianca": 0.0, "cobertura": 0.0, "titulo": 0.0, "margem": 0.0}
+    termos = _radicais(pergunta)
+    if not resultados or not termos:
+        return componentes
+    top = resultados[0]
+    termos_titulo = _radicais(top.get("pergunta") or "")
+    termos_texto = _radicais(top.get("resposta") or "") | termos_titulo
+    componentes["cobertura"] = len(termos & termos_texto) / len(termos)
+    componentes["titulo"] = len(termos & termos_titulo) / len(termos)
+    if len(resultados) == 1:
+        componentes["margem"] = 1.0
+    elif top["score"] > 0:
+        componentes["margem"] = max(0.0, (top["score"] - resultados[1]["score"]) / top["score"])
+    componentes["confianca"] = sum(peso * componentes[nome] for nome, peso in CONFIANCA_PESOS.items())
+    return componentes
+
+async def buscar_fts_async(conn, pergunta: str, k: int = 3) -> List[Dict[str, Any]]:
+    """ Versão assíncrona de `buscar_fts` para conexões aiosqlite. """
+    consulta = montar_consulta_fts(pergunta)
+    if consulta is None:
+        return []
+    try:
+        with span("db.fts", k=k), DB_LATENCY.tempo("fts"):
+            async with conn.execute(_montar_sql(k), (consulta,)) as cursor:
+                rows = await cursor.fetchall()
+        return [_row_to_dict(tuple(row)) for row in rows]
+    except sqlite3.Error as e: # aiosqlite propaga os erros do sqlite3
+        print(f"FTS (async): Erro na busca ranqueada: {e}")
+        return []
+
+async def buscar_fts_lote_async(conn, perguntas: List[str], k: int = 3) -> List[List[Dict[str, Any]]]:
+    """ `buscar_fts_async` para várias perguntas numa única instrução (UNION ALL das buscas, cada uma com
+    seu próprio top-k): uma ida ao banco por lote em vez de uma por pergunta. Perguntas repetidas são
+    buscadas uma vez. Ao contrário da versão unitária, erros do SQLite são propagados ao chamador.
+    :return: Resultados na mesma ordem de `perguntas`.
+    """
+    consultas: Dict[str, int] = {} # Expressão MATCH -> posição na instrução
+    por_pergunta = []
+    for pergunta in perguntas:
+        consulta = montar_consulta_fts(pergunta)
+        if consulta is not None:
+            consultas.setdefault(consulta, len(consultas))
+        por_pergunta.append(consulta)
+
+    resultados: Dict[int, List[Dict[str, Any]]] = {}
+    ordem = list(consultas)
+    for inicio in range(0, len(ordem), LOTE_MAX_CONSULTAS):
+        parte = ordem[inicio:inicio + LOTE_MAX_CONSULTAS]
+        sql = " UNION ALL ".join(f"SELECT {inicio + i} AS consulta, b.* FROM ({_montar_sql(k)}) b"
+                                 for i in range(len(parte))) + " ORDER BY 1, 5" # Consulta, depois rank
+        with span("db.fts_lote", k=k, consultas=len(parte)), DB_LATENCY.tempo("fts_lote"):
+            async with conn.execute(sql, parte) as cursor:
+                rows = await cursor.fetchall()
+        for row in rows:
+            resultados.setdefault(row[0], []).append(_row_to_dict(tuple(row)[1:]))
+    return [resultados.get(consultas[c], []) if c is not None else [] for c in por_pergunta]
+
+async def buscar_fts_em_paginas_async(conn, pergunta: str, page_ids: List[int], k: int = 3) -> List[Dict[str, Any]]:
+    """ Como `buscar_fts_async`, mas só entre os parágrafos das páginas indicadas (schema normalizado). """
+    consulta = montar_consulta_fts(pergunta)
+    if consulta is None or not page_ids:
+        return []
+    placeholders = ",".join("?" * len(page_ids))
+    sql = f""" SELECT f.rowid, f.pergunta, f.resposta, f.rank,
+                      snippet({FTS_TABLE}, 1, '[', ']', '...', {SNIPPET_TOKENS}), v.page_id, v.url
+               FROM {FTS_TABLE} f
+               JOIN {SOURCE_TABLE} v ON v.id = f.rowid
+               WHERE {FTS_TABLE} MATCH ? AND f.rowid IN (SELECT id FROM paragraphs WHERE page_id IN ({placeholders}))
+               ORDER BY f.rank
+               LIMIT {int(k)} """
+    try:
+        with span("db.fts_paginas", k=k, paginas=len(page_ids)), DB_LATENCY.tempo("fts_paginas"):
+            async with conn.execute(sql, (consulta, *page_ids)) as cursor:
+                rows = await cursor.fetchall()
+        return [_row_to_dict(tuple(row)) for row in rows]
+    except sqlite3.Error as e:
+        print(f"FTS (async): Erro na busca por páginas: {e}")
+        return []
+
+# Permite (re)construir o índice manualmente: python utils/fts_search.py
+# (em bancos ainda não migrados, rode antes `python utils/corpus_store.py`)
+if __name__ == '__main__':
+    from utils.db_handler import create_connection
+
+    conn = create_connection()
+    if conn is not None:
+        if criar_indice_fts(conn):
+            conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+            conn.commit()
+            print("Índice FTS pronto.")
+        conn.close()
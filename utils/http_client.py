@@ -0,0 +1,56 @@
+import os
+from typing import Optional
+
+import httpx
+
+# --- Configuração do cliente HTTP compartilhado --- #
+# Um único AsyncClient por processo: conexões keep-alive (e HTTP/2) reaproveitadas entre requisições,
+# evitando um handshake TCP+TLS novo com a api.groq.com a cada pergunta.
+HTTP2_ENABLED = os.getenv("LUMIA_HTTP2", "1") == "1"
+HTTP_MAX_CONNECTIONS = int(os.getenv("LUMIA_HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("LUMIA_HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LUMIA_HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("LUMIA_HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("LUMIA_HTTP_READ_TIMEOUT", "120"))
+HTTP_POOL_TIMEOUT = float(os.getenv("LUMIA_HTTP_POOL_TIMEOUT", "10"))
+
+_client: Optional[httpx.AsyncClient] = None
+
+def _http2_disponivel() -> bool:
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401 (dependência opcional do httpx para HTTP/2)
+        return True
+    except ImportError:
+        print("HTTPClient: Pacote 'h2' não instalado, usando HTTP/1.1 (instale httpx[http2]).")
+        return False
+
+def _criar_cliente() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT, pool=HTTP_POOL_TIMEOUT)
+    http2 = _http2_disponivel()
+    print(f"HTTPClient: Cliente compartilhado criado (http2={http2}, max_connections={HTTP_MAX_CONNECTIONS}).")
+    return httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout)
+
+def get_http_client() -> httpx.AsyncClient:
+    """ Retorna o cliente compartilhado, criando-o sob demanda se o startup ainda não o fez. """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _criar_cliente()
+    return _client
+
+async def init_http_client() -> httpx.AsyncClient:
+    """ Chamado no startup da API. """
+    return get_http_client()
+
+async def close_http_client():
+    """ Chamado no shutdown da API: fecha as conexões abertas. """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,218 @@
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Adiciona o diretório raiz ao sys.path para encontrar o módulo utils
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.text_normalizer import tokenizar
+from utils.vector_index import DB_DIR, _features
+
+# --- Configuração do classificador de intenção --- #
+# Modelo linear (regressão logística multinomial) sobre n-gramas com hashing, treinado offline
+# a partir da tabela `logs` (respostas de agentes temáticos) + arquivo semente; o artefato é um .npz de poucas dezenas de KB
+INTENT_PATH = os.path.join(DB_DIR, 'lumia_intent.npz')
+SEED_PATH = os.path.join(DB_DIR, 'intent_seed.jsonl')
+INTENT_DIM = int(os.getenv("LUMIA_INTENT_DIM", "2048")) # Dimensão do espaço de hashing
+INTENT_FALLBACK = "LLM" # Classe "nenhum agente temático": vai direto ao LLM fallback
+TRAIN_EPOCHS = 400
+TRAIN_LR = 2.0
+TRAIN_L2 = 1e-4
+VALIDATION_FRACTION = 0.2 # Separado para calibrar a temperatura (e medir a acurácia)
+# Rótulos dos logs que não dizem a intenção: "LLM" é quem respondeu quando nenhum agente temático achou a
+# resposta (a pergunta pode ser de SIGAA/assistência sem entrada no catálogo) e "IDENTIDADE" é a resposta
+# fixa sobre o assistente. A classe LLM vem só do arquivo semente.
+ROTULOS_SO_SEMENTE = {INTENT_FALLBACK, "IDENTIDADE"}
+
+def _indices_features(texto: str, dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ Features esparsas da pergunta: palavras, n-gramas de caracteres (como no índice vetorial) e bigramas
+    de palavras, com hashing assinado. Retorna (índices, valores) com norma L2 = 1.
+    """
+    tokens = tokenizar(texto)
+    feats = _features(texto) + [f"b:{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+    contagem: Dict[int, float] = {}
+    for feat in feats:
+        h = zlib.crc32(feat.encode("utf-8"))
+        contagem[h % dim] = contagem.get(h % dim, 0.0) + (1.0 if (h >> 31) & 1 else -1.0)
+    if not contagem:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    indices = np.fromiter(contagem.keys(), dtype=np.int64, count=len(contagem))
+    valores = np.fromiter(contagem.values(), dtype=np.float32, count=len(contagem))
+    valores = np.sign(valores) * np.log1p(np.abs(valores))
+    norma = np.linalg.norm(valores)
+    return indices, (valores / norma if norma > 0 else valores)
+
+def _matriz(perguntas: List[str], dim: int) -> np.ndarray:
+    x = np.zeros((len(perguntas), dim), dtype=np.float32)
+    for i, pergunta in enumerate(perguntas):
+        indices, valores = _indices_features(pergunta, dim)
+        np.add.at(x[i], indices, valores)
+    return x
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    z = logits - logits.max(axis=-1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=-1, keepdims=True)
+
+def _ajustar(x: np.ndarray, y: np.ndarray, n_classes: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ Regressão logística multinomial por gradiente descendente em lote (conjuntos pequenos: segundos na CPU). """
+    w = np.zeros((x.shape[1], n_classes), dtype=np.float32)
+    b = np.zeros(n_classes, dtype=np.float32)
+    alvo = np.eye(n_classes, dtype=np.float32)[y]
+    for _ in range(TRAIN_EPOCHS):
+        grad = (_softmax(x @ w + b) - alvo) / len(y)
+        w -= TRAIN_LR * (x.T @ grad + TRAIN_L2 * w)
+        b -= TRAIN_LR * grad.sum(axis=0)
+    return w, b
+
+def _calibrar_temperatura(logits: np.ndarray, y: np.ndarray) -> float:
+    """ Temperature scaling: a temperatura que minimiza a log-loss na validação (probabilidades calibradas). """
+    melhor, melhor_nll = 1.0, float("inf")
+    for t in np.geomspace(0.25, 8.0, 41):
+        p = _softmax(logits / t)[np.arange(len(y)), y]
+        nll = float(-np.log(np.maximum(p, 1e-12)).mean())
+        if nll < melhor_nll:
+            melhor, melhor_nll = float(t), nll
+    return melhor
+
+def carregar_exemplos(conn: Optional[sqlite3.Connection], seed_path: str = SEED_PATH) -> List[Tuple[str, str]]:
+    """ (pergunta, agente) do arquivo semente + tabela `logs` (scrapers/create_db_logs.py).
+    O agente dos logs é o que respondeu: "Agente SIGAA"/"sigaa" viram "SIGAA". Dos logs só entram as
+    respostas de agentes temáticos (ver ROTULOS_SO_SEMENTE): treinar com o fallback ensinaria o modelo a
+    mandar direto ao LLM perguntas que um agente passaria a responder quando o catálogo fosse completado.
+    """
+    exemplos = []
+    if os.path.exists(seed_path):
+        with open(seed_path, encoding="utf-8") as f:
+            for linha in f:
+                if linha.strip():
+                    item = json.loads(linha)
+                    exemplos.append((item["pergunta"], item["agente"].upper()))
+    else:
+        print(f"IntentClassifier: Arquivo semente não encontrado em {seed_path}.")
+    if conn is not None:
+        try:
+            rows = conn.execute("SELECT pergunta, agente FROM logs WHERE agente IS NOT NULL AND agente != ''").fetchall()
+        except sqlite3.Error as e:
+            print(f"IntentClassifier: Tabela logs indisponível ({e}); usando só o arquivo semente.")
+            rows = []
+        for pergunta, agente in rows:
+            agente = agente.upper().replace("AGENTE ", "").strip()
+            if agente not in ROTULOS_SO_SEMENTE:
+                exemplos.append((pergunta, agente))
+    return exemplos
+
+def treinar_classificador(conn: Optional[sqlite3.Connection], seed_path: str = SEED_PATH,
+                          dim: int = INTENT_DIM) -> Dict[str, float]:
+    """ Etapa OFFLINE: treina o modelo e grava o artefato (escrita em temporário + troca atômica).
+    Classes com menos de 2 exemplos são ignoradas. :return: métricas do treino.
+    """
+    start = time.perf_counter()
+    exemplos = carregar_exemplos(conn, seed_path)
+    por_classe: Dict[str, int] = {}
+    for _, agente in exemplos:
+        por_classe[agente] = por_classe.get(agente, 0) + 1
+    classes = sorted(c for c, n in por_classe.items() if n >= 2)
+    exemplos = [(p, a) for p, a in exemplos if a in classes]
+    if len(classes) < 2:
+        raise ValueError("São necessárias pelo menos 2 classes com exemplos para treinar o classificador.")
+
+    perguntas = [p for p, _ in exemplos]
+    y = np.array([classes.index(a) for _, a in exemplos], dtype=np.int64)
+    x = _matriz(perguntas, dim)
+
+    # Separação estratificada e determinística: a validação calibra a temperatura e mede a acurácia
+    rng = np.random.default_rng(0)
+    validacao = np.zeros(len(y), dtype=bool)
+    for c in range(len(classes)):
+        idx = np.flatnonzero(y == c)
+        n_val = int(len(idx) * VALIDATION_FRACTION)
+        validacao[rng.permutation(idx)[:n_val]] = True
+    temperatura, acuracia = 1.0, float("nan")
+    if validacao.any():
+        w, b = _ajustar(x[~validacao], y[~validacao], len(classes))
+        logits = x[validacao] @ w + b
+        temperatura = _calibrar_temperatura(logits, y[validacao])
+        acuracia = float((logits.argmax(axis=1) == y[validacao]).mean())
+
+    w, b = _ajustar(x, y, len(classes)) # Modelo final com todos os exemplos
+    os.makedirs(DB_DIR, exist_ok=True)
+    tmp_path = f"{INTENT_PATH}.tmp.npz"
+    np.savez(tmp_path, w=w.astype(np.float32), b=b, classes=np.array(classes),
+             temperatura=np.float32(temperatura), dim=np.int64(dim),
+             meta=np.array(json.dumps({"exemplos": len(y), "acuracia_validacao": acuracia, "built_at": time.time()})))
+    os.replace(tmp_path, INTENT_PATH)
+
+    print(f"IntentClassifier: {len(y)} exemplos, {len(classes)} classes ({', '.join(classes)}), "
+          f"acurácia de validação {acuracia:.2f}, temperatura {temperatura:.2f}, "
+          f"treinado em {time.perf_counter() - start:.2f}s.")
+    return {"exemplos": len(y), "classes": len(classes), "acuracia_validacao": acuracia, "temperatura": temperatura}
+
+class IntentClassifier:
+    """ Classificador de intenção somente-leitura sobre o artefato gerado por `treinar_classificador`. """
+
+    def __init__(self):
+        self.w: Optional[np.ndarray] = None # (dim, classes): uma linha contígua por feature
+        self.b: Optional[np.ndarray] = None
+        self.classes: List[str] = []
+        self.temperatura = 1.0
+        self.dim = INTENT_DIM
+
+    def carregar(self) -> bool:
+        """ Lê o artefato. Retorna False se o modelo ainda não foi treinado. """
+        if not os.path.exists(INTENT_PATH):
+            print("IntentClassifier: Modelo não encontrado. Rode `python utils/intent_classifier.py` para treinar.")
+            return False
+        try:
+            with np.load(INTENT_PATH) as dados:
+                self.w = np.ascontiguousarray(dados["w"])
+                self.b = dados["b"]
+                self.classes = [str(c) for c in dados["classes"]]
+                self.temperatura = float(dados["temperatura"])
+                self.dim = int(dados["dim"])
+            print(f"IntentClassifier: Modelo carregado ({len(self.classes)} classes, dim={self.dim}).")
+            return True
+        except (OSError, KeyError, ValueError) as e:
+            print(f"IntentClassifier: Erro ao carregar o modelo: {e}")
+            self.w = None
+            return False
+
+    @property
+    def disponivel(self) -> bool:
+        return self.w is not None
+
+    def classificar(self, pergunta: str) -> List[Tuple[str, float]]:
+        """ [(classe, probabilidade calibrada)] da mais para a menos provável. Só lê as linhas dos pesos das
+        features presentes na pergunta (algumas dezenas): microssegundos por pergunta.
+        """
+        if not self.disponivel:
+            return []
+        indices, valores = _indices_features(pergunta, self.dim)
+        probs = _softmax((valores @ self.w[indices] + self.b) / self.temperatura)
+        ordem = np.argsort(-probs)
+        return [(self.classes[i], float(probs[i])) for i in ordem]
+
+_intent_classifier: Optional[IntentClassifier] = None
+
+def get_intent_classifier() -> IntentClassifier:
+    """ Retorna a instância única do classificador, carregada na primeira chamada. """
+    global _intent_classifier
+    if _intent_classifier is None:
+        _intent_classifier = IntentClassifier()
+        _intent_classifier.carregar()
+    return _intent_classifier
+
+# Etapa offline de treino: python utils/intent_classifier.py
+if __name__ == '__main__':
+    from utils.db_handler import create_connection
+
+    conn = create_connection()
+    treinar_classificador(conn)
+    if conn is not None:
+        conn.close()
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import aiosqlite
+
+# Adiciona o diretório raiz ao sys.path para encontrar o módulo utils
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.db_handler import DB_PATH
+
+# --- Registro das interações na tabela `logs` (também lida pelo utils/intent_classifier.py) --- #
+INTERACTION_LOG_ENABLED = os.getenv("LUMIA_INTERACTION_LOG", "1") != "0"
+LOG_QUEUE_SIZE = int(os.getenv("LUMIA_LOG_QUEUE_SIZE", "10000")) # Registros em memória; cheia = descarta
+LOG_BATCH_SIZE = int(os.getenv("LUMIA_LOG_BATCH_SIZE", "200")) # Registros por transação
+LOG_FLUSH_INTERVAL = float(os.getenv("LUMIA_LOG_FLUSH_INTERVAL", "2")) # Segundos até gravar um lote incompleto
+LOG_CLOSE_TIMEOUT = float(os.getenv("LUMIA_LOG_CLOSE_TIMEOUT", "10")) # Prazo para gravar os pendentes no shutdown
+
+SQL_CREATE_LOGS = """ CREATE TABLE IF NOT EXISTS logs (
+                         id INTEGER PRIMARY KEY,
+                         pergunta TEXT NOT NULL,
+                         resposta TEXT NOT NULL,
+                         agente TEXT,
+                         data_hora TEXT DEFAULT CURRENT_TIMESTAMP,
+                         rota TEXT,
+                         cache TEXT,
+                         tempo_ms REAL,
+                         ttft_ms REAL,
+                         degradado INTEGER,
+                         detalhes TEXT
+                     ); """
+# Colunas acrescentadas à tabela original de scrapers/create_db_logs.py (migradas com ALTER TABLE)
+COLUNAS_EXTRAS = {"rota": "TEXT", "cache": "TEXT", "tempo_ms": "REAL", "ttft_ms": "REAL",
+                  "degradado": "INTEGER", "detalhes": "TEXT"}
+_COLUNAS = ("pergunta", "resposta", "agente", "data_hora", "rota", "cache", "tempo_ms", "ttft_ms", "degradado", "detalhes")
+_SQL_INSERT = f"INSERT INTO logs({', '.join(_COLUNAS)}) VALUES ({', '.join('?' * len(_COLUNAS))})"
+_FIM = object() # Sentinela: o consumidor grava o que resta e termina
+
+def migrar_tabela_logs(conn: sqlite3.Connection):
+    """ Versão síncrona da criação/migração feita em `iniciar`. O serve.py a executa uma vez antes de subir
+    os workers, para que eles não disputem o mesmo ALTER TABLE.
+    """
+    conn.execute(SQL_CREATE_LOGS)
+    existentes = {row[1] for row in conn.execute("PRAGMA table_info(logs)")}
+    for coluna, tipo in COLUNAS_EXTRAS.items():
+        if coluna not in existentes:
+            conn.execute(f"ALTER TABLE logs ADD COLUMN {coluna} {tipo}")
+    conn.commit()
+
+class InteractionLogger:
+    """ Registro assíncrono das interações: as rotas só enfileiram (sem I/O no caminho da requisição) e
+    uma task em segundo plano grava em lotes, numa transação por lote, quando junta LOG_BATCH_SIZE
+    registros ou a cada LOG_FLUSH_INTERVAL segundos. Com a fila cheia o registro é descartado (e contado):
+    o log nunca atrasa uma resposta. Ao fechar, os registros pendentes são gravados.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, tamanho_fila: int = LOG_QUEUE_SIZE,
+                 tamanho_lote: int = LOG_BATCH_SIZE, intervalo: float = LOG_FLUSH_INTERVAL):
+        self.db_path = os.path.abspath(db_path)
+        self.tamanho_fila = tamanho_fila
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self._fila: Optional[asyncio.Queue] = None
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"enfileirados": 0, "gravados": 0, "descartados": 0, "lotes": 0, "erros": 0}
+
+    async def iniciar(self):
+        """ Abre a conexão de escrita, garante o schema e inicia o consumidor (idempotente). """
+        if self._task is not None:
+            return
+        try:
+            self._conn = await aiosqlite.connect(self.db_path)
+            await self._conn.execute("PRAGMA synchronous=NORMAL") # Com WAL: sem fsync por commit
+            await self._conn.execute(SQL_CREATE_LOGS)
+            async with self._conn.execute("PRAGMA table_info(logs)") as cursor:
+                existentes = {row[1] for row in await cursor.fetchall()}
+            for coluna, tipo in COLUNAS_EXTRAS.items():
+                if coluna not in existentes:
+                    await self._conn.execute(f"ALTER TABLE logs ADD COLUMN {coluna} {tipo}")
+            await self._conn.commit()
+        except Exception as e:
+            print(f"InteractionLog: Erro ao abrir a tabela logs ({e}). Registro desativado.")
+            if self._conn is not None:
+                await self._conn.close()
+                self._conn = None
+            return
+        self._fila = asyncio.Queue(maxsize=self.tamanho_fila)
+        self._task = asyncio.create_task(self._consumir(self._fila))
+        print(f"InteractionLog: Ativo (lotes de {self.tamanho_lote}, a cada {self.intervalo:g}s, fila {self.tamanho_fila}).")
+
+    def registrar(self, pergunta: str, resposta: str, agente: Optional[str] = None, rota: Optional[str] = None,
+                  cache: Optional[str] = None, tempo_ms: Optional[float] = None, ttft_ms: Optional[float] = None,
+                  degradado: bool = False, detalhes: Optional[Dict[str, Any]] = None) -> bool:
+        """ Enfileira um registro sem bloquear. Retorna False se foi descartado (fila cheia ou log inativo). """
+        if self._fila is None:
+            return False
+        registro = (pergunta, resposta or "", agente, time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()), rota, cache,
+                    tempo_ms, ttft_ms, int(bool(degradado)),
+                    json.dumps(detalhes, ensure_ascii=False) if detalhes else None)
+        try:
+            self._fila.put_nowait(registro)
+        except asyncio.QueueFull:
+            self.stats["descartados"] += 1
+            return False
+        self.stats["enfileirados"] += 1
+        return True
+
+    async def _consumir(self, fila: asyncio.Queue):
+        fim = False
+        while not fim:
+            item = await fila.get()
+            if item is _FIM:
+                break
+            lote = [item]
+            prazo = time.monotonic() + self.intervalo
+            while len(lote) < self.tamanho_lote:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(fila.get(), timeout=restante)
+                except asyncio.TimeoutError:
+                    break
+                if item is _FIM:
+                    fim = True
+                    break
+                lote.append(item)
+            await self._gravar(lote)
+
+    async def _gravar(self, lote: List[tuple]):
+        try:
+            await self._conn.executemany(_SQL_INSERT, lote)
+            await self._conn.commit()
+            self.stats["gravados"] += len(lote)
+            self.stats["lotes"] += 1
+        except Exception as e: # Um lote perdido não pode derrubar o consumidor
+            self.stats["erros"] += 1
+            print(f"InteractionLog: Erro ao gravar lote de {len(lote)} registros: {e}")
+
+    async def fechar(self):
+        """ Grava os registros pendentes (até LOG_CLOSE_TIMEOUT segundos) e fecha a conexão. Nunca espera por
+        vaga na fila: se o consumidor já morreu ou não termina no prazo, os pendentes são descartados.
+        """
+        if self._task is not None:
+            fila, task = self._fila, self._task
+            self._fila = None # Novos registros são descartados a partir daqui
+            self._task = None
+            if task.done():
+                self.stats["descartados"] += fila.qsize()
+                print(f"InteractionLog: Consumidor já encerrado; {fila.qsize()} registros pendentes descartados.")
+            else:
+                limite = time.monotonic() + LOG_CLOSE_TIMEOUT
+                try:
+                    # Fila cheia: o sentinela entra quando o consumidor abrir vaga, sem passar do prazo
+                    await asyncio.wait_for(fila.put(_FIM), timeout=LOG_CLOSE_TIMEOUT)
+                    await asyncio.wait_for(task, timeout=max(0.0, limite - time.monotonic())) # Cancela a task ao estourar
+                except asyncio.TimeoutError:
+                    task.cancel()
+                    self.stats["descartados"] += fila.qsize()
+                    print(f"InteractionLog: Pendentes não gravados em {LOG_CLOSE_TIMEOUT:g}s; "
+                          f"{fila.qsize()} registros descartados.")
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+        print(f"InteractionLog: Encerrado | {self.resumo_stats()}")
+
+    @property
+    def pendentes(self) -> int:
+        """ Registros na fila aguardando gravação. """
+        return self._fila.qsize() if self._fila is not None else 0
+
+    def resumo_stats(self) -> str:
+        s = self.stats
+        return (f"enfileirados={s['enfileirados']} gravados={s['gravados']} pendentes={self.pendentes} "
+                f"descartados={s['descartados']} lotes={s['lotes']} erros={s['erros']}")
+
+_interaction_log: Optional[InteractionLogger] = None
+
+def get_interaction_log() -> InteractionLogger:
+    """ Retorna o registro compartilhado do processo. """
+    global _interaction_log
+    if _interaction_log is None:
+        _interaction_log = InteractionLogger()
+    return _interaction_log
+
+async def init_interaction_log() -> InteractionLogger:
+    """ Chamado no startup da API. Com LUMIA_INTERACTION_LOG=0 o registro fica inativo (registrar é no-op). """
+    logger = get_interaction_log()
+    if INTERACTION_LOG_ENABLED:
+        await logger.iniciar()
+    return logger
+
+async def close_interaction_log():
+    global _interaction_log
+    if _interaction_log is not None:
+        await _interaction_log.fechar()
+        _interaction_log = None
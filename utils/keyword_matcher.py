@@ -0,0 +1,44 @@
+import re
+import sys
+import os
+from typing import Dict, List, Tuple
+
+# Adiciona o diretório raiz ao sys.path para encontrar o módulo utils
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.text_normalizer import normalizar
+
+class KeywordMatcher:
+    """ Casa várias listas de palavras-chave (uma por categoria) contra um texto em uma única passada.
+    Todas as palavras-chave viram uma só regex (alternância, mais longas primeiro) sobre o texto
+    normalizado (minúsculas, sem acentos), com fronteira de palavra: "ru" não casa com "estrutura",
+    "curso" ou "rua". Plurais simples ("bolsas", "auxilios") também casam.
+    """
+
+    def __init__(self, categorias: Dict[str, List[str]]):
+        self.ordem = list(categorias) # Desempate: ordem de declaração das categorias
+        self._categorias_por_termo: Dict[str, List[str]] = {}
+        for categoria, keywords in categorias.items():
+            for keyword in keywords:
+                termo = normalizar(keyword)
+                self._categorias_por_termo.setdefault(termo, [])
+                if categoria not in self._categorias_por_termo[termo]:
+                    self._categorias_por_termo[termo].append(categoria)
+        termos = sorted(self._categorias_por_termo, key=len, reverse=True)
+        alternancia = "|".join(re.escape(t).replace(r"\ ", r"\s+") for t in termos) or "(?!)" # Sem termos: nunca casa
+        self._regex = re.compile(rf"\b({alternancia})(?:s|es)?\b")
+
+    def encontrar(self, texto: str) -> List[str]:
+        """ Termos (normalizados) encontrados no texto, na ordem em que aparecem. """
+        return [m.group(1) for m in self._regex.finditer(normalizar(texto))]
+
+    def pontuar(self, texto: str) -> List[Tuple[str, float]]:
+        """ Categorias com pelo menos um termo no texto, da maior para a menor pontuação.
+        Cada ocorrência vale o número de palavras do termo (termos compostos são mais específicos).
+        """
+        pontos: Dict[str, float] = {}
+        for termo in self.encontrar(texto):
+            peso = float(len(termo.split()))
+            for categoria in self._categorias_por_termo[termo]:
+                pontos[categoria] = pontos.get(categoria, 0.0) + peso
+        return sorted(pontos.items(), key=lambda item: (-item[1], self.ordem.index(item[0])))
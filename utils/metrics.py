@@ -0,0 +1,145 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+# --- Métricas em memória no formato texto do Prometheus (servidas em GET /metrics, ver main.py) --- #
+# Sem dependências: contadores e histogramas são dicts indexados pela tupla de labels. O serviço roda
+# em um único event loop, então registrar é só uma busca no dict + bisect (sem locks).
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Segundos: de consultas ao SQLite (ms) a respostas completas do LLM (dezenas de segundos)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _rotulos(nomes: Tuple[str, ...], valores: Tuple, extra: str = "") -> str:
+    partes = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if valor != int(valor) else str(int(valor))
+
+class Counter:
+    def __init__(self, nome: str, ajuda: str, labels: Tuple[str, ...] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.labels = labels
+        self._valores: Dict[Tuple, float] = {}
+
+    def inc(self, *valores_labels, valor: float = 1.0):
+        self._valores[valores_labels] = self._valores.get(valores_labels, 0.0) + valor
+
+    def render(self) -> List[str]:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        for chave, valor in sorted(self._valores.items()):
+            linhas.append(f"{self.nome}{_rotulos(self.labels, chave)} {_numero(valor)}")
+        return linhas
+
+class Histogram:
+    def __init__(self, nome: str, ajuda: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {} # labels -> [contagem por bucket..., +Inf, soma]
+
+    def observe(self, valor: float, *valores_labels):
+        serie = self._series.get(valores_labels)
+        if serie is None:
+            serie = self._series[valores_labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        serie[bisect_left(self.buckets, valor)] += 1 # Contagem não cumulativa; acumulada só no render
+        serie[-1] += valor
+
+    @contextmanager
+    def tempo(self, *valores_labels):
+        """ Observa a duração do bloco `with` (em segundos). """
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio, *valores_labels)
+
+    def render(self) -> List[str]:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        for chave, serie in sorted(self._series.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float("inf"),), serie[:-1]):
+                acumulado += contagem
+                le = 'le="%s"' % ("+Inf" if limite == float("inf") else _numero(limite))
+                linhas.append(f"{self.nome}_bucket{_rotulos(self.labels, chave, le)} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_rotulos(self.labels, chave)} {_numero(serie[-1])}")
+            linhas.append(f"{self.nome}_count{_rotulos(self.labels, chave)} {acumulado}")
+        return linhas
+
+class GaugeFunc:
+    """ Gauge lido no momento do scrape: `fn` retorna um número ou {valor_do_label: número}. """
+
+    def __init__(self, nome: str, ajuda: str, fn: Callable[[], Union[float, Dict[str, float]]], label: Optional[str] = None):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.fn = fn
+        self.label = label
+
+    def render(self) -> List[str]:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} gauge"]
+        try:
+            valor = self.fn()
+        except Exception: # Recurso ainda não inicializado: gauge omitido
+            return linhas
+        if isinstance(valor, dict):
+            for chave, v in sorted(valor.items()):
+                linhas.append(f"{self.nome}{_rotulos((self.label,), (chave,))} {_numero(v)}")
+        else:
+            linhas.append(f"{self.nome} {_numero(valor)}")
+        return linhas
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metricas: Dict[str, Union[Counter, Histogram, GaugeFunc]] = {}
+
+    def _registrar(self, metrica):
+        self._metricas[metrica.nome] = metrica
+        return metrica
+
+    def counter(self, nome: str, ajuda: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._registrar(Counter(nome, ajuda, labels))
+
+    def histogram(self, nome: str, ajuda: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._registrar(Histogram(nome, ajuda, labels, buckets))
+
+    def gauge_func(self, nome: str, ajuda: str, fn: Callable, label: Optional[str] = None) -> GaugeFunc:
+        return self._registrar(GaugeFunc(nome, ajuda, fn, label))
+
+    def render(self) -> str:
+        linhas = []
+        for metrica in self._metricas.values():
+            linhas.extend(metrica.render())
+        return "\n".join(linhas) + "\n"
+
+metrics = MetricsRegistry()
+
+# --- Métricas do serviço (registradas nos pontos indicados) --- #
+# routes/assistente.py
+HTTP_LATENCY = metrics.histogram("lumia_http_request_duration_seconds", "Tempo total de resposta por rota.", ("rota",))
+HTTP_REQUESTS = metrics.counter("lumia_http_requests_total", "Perguntas respondidas por rota e resultado (ok/erro).", ("rota", "status"))
+HTTP_TTFT = metrics.histogram("lumia_http_time_to_first_token_seconds", "Tempo até o primeiro token no /ask/stream.")
+ANSWER_CACHE = metrics.counter("lumia_answer_cache_total", "Resultado do cache de respostas por pergunta.", ("resultado",))
+ANSWERS_BY_AGENT = metrics.counter("lumia_answers_total", "Respostas entregues por agente que respondeu.", ("agente",))
+# orchestrator/router.py
+ROUTING_DECISIONS = metrics.counter("lumia_routing_decisions_total", "Decisões de roteamento por origem e primeiro agente candidato.", ("origem", "agente"))
+ROUTING_LATENCY = metrics.histogram("lumia_routing_duration_seconds", "Tempo da decisão de roteamento (classificador/palavras-chave).", ("origem",))
+# agents/registry.py
+AGENT_LATENCY = metrics.histogram("lumia_agent_duration_seconds", "Latência das chamadas aos agentes temáticos.", ("agente",))
+AGENT_CALLS = metrics.counter("lumia_agent_calls_total", "Chamadas aos agentes por resultado (resposta/vazia/erro/timeout/disjuntor/cancelada).", ("agente", "resultado"))
+# utils/db_handler.py, utils/fts_search.py, utils/vector_index.py
+DB_LATENCY = metrics.histogram("lumia_db_query_duration_seconds", "Tempo das consultas ao SQLite (pool read-only).", ("consulta",))
+# agents/llm_agent.py
+LLM_LATENCY = metrics.histogram("lumia_llm_request_duration_seconds", "Tempo de cada requisição à Groq (sem a fila), por status.", ("status",))
+LLM_QUEUE_WAIT = metrics.histogram("lumia_llm_queue_wait_seconds", "Espera no limitador antes de enviar à Groq.")
+LLM_TOKENS = metrics.counter("lumia_llm_tokens_total", "Tokens reportados pela Groq (prompt/completion).", ("tipo",))
+LLM_RETRIES = metrics.counter("lumia_llm_retries_total", "Retentativas de requisições à Groq (429/5xx/conexão).")
+ERRORS = metrics.counter("lumia_errors_total", "Erros por origem (rota, llm, llm_degradado).", ("origem",))
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# --- Limites do provedor (Groq) aplicados do lado do cliente --- #
+GROQ_RPM = float(os.getenv("LUMIA_GROQ_RPM", "30")) # Requisições por minuto
+GROQ_TPM = float(os.getenv("LUMIA_GROQ_TPM", "6000")) # Tokens (prompt + resposta) por minuto
+GROQ_MAX_CONCURRENCY = int(os.getenv("LUMIA_GROQ_MAX_CONCURRENCY", "4")) # Requisições simultâneas
+GROQ_MAX_WAIT = float(os.getenv("LUMIA_GROQ_MAX_WAIT", "15")) # Espera máxima na fila antes de degradar
+# Retentativas (429/5xx/falha de conexão) com backoff exponencial e jitter
+GROQ_MAX_RETRIES = int(os.getenv("LUMIA_GROQ_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("LUMIA_GROQ_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("LUMIA_GROQ_BACKOFF_MAX", "20"))
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class LimiteExcedido(Exception):
+    """ A requisição esperaria mais que o permitido pelo limitador (ou pelo Retry-After da Groq). """
+
+class _TokenBucket:
+    def __init__(self, por_minuto: float):
+        self.capacidade = por_minuto
+        self.taxa = por_minuto / 60.0 # Reposição por segundo
+        self.nivel = por_minuto
+        self._atualizado_em = time.monotonic()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self.nivel = min(self.capacidade, self.nivel + (agora - self._atualizado_em) * self.taxa)
+        self._atualizado_em = agora
+
+    def espera_para(self, quantidade: float) -> float:
+        """ Segundos até haver `quantidade` disponível (0 se já houver). """
+        self._repor()
+        quantidade = min(quantidade, self.capacidade) # Pedido maior que o balde: espera encher
+        falta = quantidade - self.nivel
+        return 0.0 if falta <= 0 else falta / self.taxa
+
+    def consumir(self, quantidade: float):
+        self._repor()
+        self.nivel -= quantidade
+
+class RateLimiter:
+    """ Limitador adaptativo de chamadas à Groq: baldes de requisições/min e tokens/min, teto de
+    concorrência e pausa global quando a Groq responde 429 com Retry-After. As requisições esperam
+    em fila (FIFO); quem esperaria mais que `max_espera` recebe LimiteExcedido e o chamador degrada.
+    """
+
+    def __init__(self, rpm: float = GROQ_RPM, tpm: float = GROQ_TPM,
+                 max_concorrencia: int = GROQ_MAX_CONCURRENCY, max_espera: float = GROQ_MAX_WAIT):
+        self._requisicoes = _TokenBucket(rpm)
+        self._tokens = _TokenBucket(tpm)
+        self._concorrencia = asyncio.Semaphore(max_concorrencia)
+        self._fila_lock = asyncio.Lock()
+        self.max_espera = max_espera
+        self._pausado_ate = 0.0
+        self.fila = 0 # Requisições aguardando vaga agora
+        self.em_voo = 0 # Requisições em andamento na Groq agora
+        self.stats = {"requisicoes": 0, "fila_max": 0, "espera_total_s": 0.0, "espera_max_s": 0.0,
+                      "http_429": 0, "retentativas": 0, "rejeitadas": 0}
+
+    @asynccontextmanager
+    async def vaga(self, tokens_estimados: int):
+        """ Aguarda vaga (baldes + concorrência) para uma requisição de ~`tokens_estimados` tokens.
+        Rende os segundos esperados na fila.
+        """
+        inicio = time.monotonic()
+        prazo = inicio + self.max_espera
+        self.fila += 1
+        self.stats["fila_max"] = max(self.stats["fila_max"], self.fila)
+        try:
+            async with self._fila_lock: # FIFO: o primeiro da fila espera os baldes, os demais esperam por ele
+                while True:
+                    agora = time.monotonic()
+                    espera = max(self._pausado_ate - agora,
+                                 self._requisicoes.espera_para(1),
+                                 self._tokens.espera_para(tokens_estimados))
+                    if espera <= 0:
+                        break
+                    if agora + espera > prazo:
+                        self.stats["rejeitadas"] += 1
+                        raise LimiteExcedido(f"espera estimada de {espera:.1f}s excede {self.max_espera:.0f}s")
+                    await asyncio.sleep(espera)
+                self._requisicoes.consumir(1)
+                self._tokens.consumir(tokens_estimados)
+            restante = prazo - time.monotonic()
+            try:
+                await asyncio.wait_for(self._concorrencia.acquire(), timeout=max(restante, 0.001))
+            except asyncio.TimeoutError:
+                self.stats["rejeitadas"] += 1
+                raise LimiteExcedido(f"sem vaga de concorrência em {self.max_espera:.0f}s")
+        finally:
+            self.fila -= 1
+
+        esperado = time.monotonic() - inicio
+        self.stats["requisicoes"] += 1
+        self.stats["espera_total_s"] += esperado
+        self.stats["espera_max_s"] = max(self.stats["espera_max_s"], esperado)
+        self.em_voo += 1
+        try:
+            yield esperado
+        finally:
+            self.em_voo -= 1
+            self._concorrencia.release()
+
+    def registrar_uso(self, reservado: int, real: Optional[int]):
+        """ Corrige o balde de tokens com a contagem real reportada pela Groq. """
+        if real is not None:
+            self._tokens.consumir(real - reservado)
+
+    def sincronizar(self, headers):
+        """ Ajusta o balde de tokens ao que a Groq informa ainda restar (x-ratelimit-remaining-tokens). """
+        restante = headers.get("x-ratelimit-remaining-tokens")
+        if restante is None:
+            return
+        try:
+            restante = float(restante)
+        except ValueError:
+            return
+        self._tokens._repor()
+        self._tokens.nivel = min(self._tokens.nivel, restante)
+
+    def pausar(self, segundos: float):
+        """ Após um 429: ninguém envia nada à Groq antes do Retry-After. """
+        self.stats["http_429"] += 1
+        self._pausado_ate = max(self._pausado_ate, time.monotonic() + segundos)
+
+    def resumo_stats(self) -> str:
+        s = self.stats
+        media_ms = (s["espera_total_s"] / s["requisicoes"] * 1000) if s["requisicoes"] else 0.0
+        return (f"fila={self.fila} em_voo={self.em_voo} fila_max={s['fila_max']} espera_media_ms={media_ms:.0f} "
+                f"espera_max_ms={s['espera_max_s'] * 1000:.0f} http_429={s['http_429']} "
+                f"retentativas={s['retentativas']} rejeitadas={s['rejeitadas']}")
+
+def ler_retry_after(headers) -> Optional[float]:
+    """ Segundos indicados pelo cabeçalho Retry-After (número ou data HTTP), se houver. """
+    valor = headers.get("retry-after")
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def calcular_backoff(tentativa: int, retry_after: Optional[float] = None) -> float:
+    """ Backoff exponencial com jitter total; respeita o Retry-After (nunca tenta antes dele). """
+    atraso = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** tentativa)))
+    if retry_after is not None:
+        atraso = retry_after + random.uniform(0, BACKOFF_BASE)
+    return atraso
+
+_groq_limiter: Optional[RateLimiter] = None
+
+def get_groq_limiter() -> RateLimiter:
+    """ Retorna o limitador compartilhado do processo para as chamadas à Groq. """
+    global _groq_limiter
+    if _groq_limiter is None:
+        _groq_limiter = RateLimiter()
+    return _groq_limiter
@@ -0,0 +1,102 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+class SingleFlight:
+    """ Coalescência de chamadas idênticas em andamento ("single-flight").
+    A primeira chamada para uma chave (líder) executa o trabalho; as concorrentes com a mesma chave
+    apenas aguardam o mesmo resultado (ou a mesma exceção). Ao terminar, a chave é liberada:
+    chamadas posteriores executam de novo (ou caem no cache de respostas).
+    """
+
+    def __init__(self):
+        self._voos: Dict[str, asyncio.Future] = {}
+        self._espera: Dict[asyncio.Future, int] = {} # Chamadores aguardando cada voo (líder + coalescidos)
+        self.stats = {"lideres": 0, "coalescidas": 0, "erros": 0, "cancelamentos": 0}
+
+    async def executar(self, chave: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """ Executa `fn()` uma única vez por chave entre chamadas concorrentes.
+        :return: (resultado, coalescida). `coalescida` é True se o resultado veio de outra chamada.
+        O trabalho roda em uma task própria: cancelar um chamador não afeta os demais, e a task
+        só é cancelada quando todos os que a aguardavam desistiram.
+        """
+        while True:
+            voo = self._voos.get(chave)
+            coalescida = voo is not None and not voo.done()
+            if coalescida:
+                self.stats["coalescidas"] += 1
+            else:
+                self.stats["lideres"] += 1
+                voo = asyncio.ensure_future(fn())
+                self._registrar(chave, voo)
+
+            self._espera[voo] = self._espera.get(voo, 0) + 1
+            try:
+                return await asyncio.shield(voo), coalescida
+            except asyncio.CancelledError:
+                if voo.cancelled() and not _cancelando_chamador():
+                    # O voo foi abortado pelo seu líder (ex.: cliente do streaming desconectou), não por nós:
+                    # tenta de novo, possivelmente como novo líder
+                    self._liberar(chave, voo)
+                    continue
+                self.stats["cancelamentos"] += 1
+                if self._espera.get(voo, 0) <= 1 and not voo.done() and isinstance(voo, asyncio.Task):
+                    voo.cancel() # Ninguém mais espera por este resultado
+                raise
+            finally:
+                restantes = self._espera.pop(voo, 1) - 1
+                if restantes > 0:
+                    self._espera[voo] = restantes
+
+    def aguardar(self, chave: str) -> Optional[asyncio.Future]:
+        """ Retorna o voo em andamento para a chave (para aguardar com `asyncio.shield`), ou None. """
+        voo = self._voos.get(chave)
+        if voo is None or voo.done():
+            return None
+        self.stats["coalescidas"] += 1
+        return voo
+
+    def iniciar(self, chave: str) -> asyncio.Future:
+        """ Registra um voo conduzido manualmente pelo chamador (ex.: resposta em streaming).
+        O líder deve encerrá-lo com `concluir` ou `falhar`.
+        """
+        self.stats["lideres"] += 1
+        voo = asyncio.get_running_loop().create_future()
+        self._registrar(chave, voo)
+        return voo
+
+    def concluir(self, voo: asyncio.Future, resultado: Any):
+        if not voo.done():
+            voo.set_result(resultado)
+
+    def falhar(self, voo: asyncio.Future, erro: BaseException):
+        """ Propaga o erro aos coalescidos; cancelamento do líder faz os coalescidos tentarem de novo. """
+        if voo.done():
+            return
+        if isinstance(erro, (asyncio.CancelledError, GeneratorExit)):
+            voo.cancel()
+        else:
+            voo.set_exception(erro)
+
+    def _registrar(self, chave: str, voo: asyncio.Future):
+        self._voos[chave] = voo
+        voo.add_done_callback(lambda f: self._encerrar(chave, f))
+
+    def _liberar(self, chave: str, voo: asyncio.Future):
+        if self._voos.get(chave) is voo:
+            del self._voos[chave]
+
+    def _encerrar(self, chave: str, voo: asyncio.Future):
+        self._liberar(chave, voo)
+        if not voo.cancelled() and voo.exception() is not None: # Também marca a exceção como lida
+            self.stats["erros"] += 1
+
+    def resumo_stats(self) -> str:
+        s = self.stats
+        return (f"lideres={s['lideres']} coalescidas={s['coalescidas']} erros={s['erros']} "
+                f"cancelamentos={s['cancelamentos']} em_andamento={len(self._voos)}")
+
+def _cancelando_chamador() -> bool:
+    """ True se a task atual recebeu um pedido de cancelamento (Python 3.11+). """
+    task = asyncio.current_task()
+    cancelling = getattr(task, "cancelling", None)
+    return bool(cancelling()) if cancelling is not None else False
@@ -0,0 +1,62 @@
+import re
+import unicodedata
+from typing import List
+
+# Stopwords do português que não ajudam a ranquear parágrafos
+STOPWORDS = {
+    "a", "ao", "aos", "as", "com", "como", "da", "das", "de", "do", "dos", "e", "em",
+    "entre", "era", "essa", "esse", "esta", "este", "eu", "foi", "ha", "isso", "ja",
+    "la", "lhe", "mais", "mas", "me", "meu", "minha", "na", "nas", "nao", "no", "nos",
+    "o", "os", "ou", "para", "pela", "pelo", "por", "pra", "qual", "quais", "quando",
+    "que", "quem", "se", "sao", "ser", "seu", "sua", "te", "tem", "um", "uma", "voce",
+    "onde", "faco", "fazer", "posso", "sobre",
+}
+
+# Sufixos flexionais removidos por `radical` (do mais longo ao mais curto): plural e gênero/número de
+# substantivos e adjetivos ("inscrições"/"inscrição", "editais"/"edital", "auxílios"/"auxílio")
+_SUFIXOS_RADICAL = ("coes", "cao", "oes", "ais", "eis", "ao", "al", "el", "es", "s")
+_VOGAIS_FINAIS = "aeo"
+MIN_RADICAL = 4
+
+# Tokens curtos que identificam algo e não podem ser descartados por tamanho: números e algarismos romanos
+# ("campus IV" e "campus II" são coisas diferentes)
+_CODIGO_RE = re.compile(r"\d+|[ivx]+")
+
+_WORD_RE = re.compile(r"\w+")
+_SPACES_RE = re.compile(r"\s+")
+
+def remover_acentos(texto: str) -> str:
+    """ Remove acentos/diacríticos mantendo as letras base ("auxílio" -> "auxilio"). """
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+def normalizar(texto: str) -> str:
+    """ Normaliza texto para comparação: minúsculas, sem acentos e espaços colapsados. """
+    return _SPACES_RE.sub(" ", remover_acentos(texto.lower())).strip()
+
+def e_codigo(token: str) -> bool:
+    """ Número ou algarismo romano (token normalizado). """
+    return _CODIGO_RE.fullmatch(token) is not None
+
+def tokenizar(texto: str, remover_stopwords: bool = True, min_len: int = 2) -> List[str]:
+    """ Quebra o texto normalizado em palavras, opcionalmente sem stopwords. Códigos (ver `e_codigo`) são
+    mantidos mesmo abaixo de `min_len`.
+    """
+    tokens = _WORD_RE.findall(normalizar(texto))
+    if remover_stopwords:
+        tokens = [t for t in tokens if t not in STOPWORDS]
+    return [t for t in tokens if len(t) >= min_len or e_codigo(t)]
+
+def radical(token: str) -> str:
+    """ Radical leve de um token normalizado, para casar singular/plural e variações de gênero por
+    prefixo ("bolsas" e "bolsa" -> "bols"). Não é um stemmer completo: só remove um sufixo flexional e a
+    vogal final, e nunca encurta o token abaixo de MIN_RADICAL letras.
+    """
+    base = token
+    for sufixo in _SUFIXOS_RADICAL:
+        if base.endswith(sufixo) and len(base) - len(sufixo) >= MIN_RADICAL:
+            base = base[:-len(sufixo)] + ("c" if sufixo in ("coes", "cao") else "")
+            break
+    if base[-1:] in _VOGAIS_FINAIS and len(base) > MIN_RADICAL:
+        base = base[:-1]
+    return base
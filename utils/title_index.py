@@ -0,0 +1,82 @@
+import math
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# Adiciona o diretório raiz ao sys.path para encontrar o módulo utils
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.text_normalizer import tokenizar, radical, e_codigo
+
+# --- Índice de títulos/seções das páginas rastreadas --- #
+# Títulos do site seguem "Página — UNIVERSIDADE FEDERAL DA PARAÍBA - UFPB SEÇÃO"; a parte antes do
+# travessão pesa mais que a seção (e que os trechos da URL)
+TITLE_WEIGHT = 1.0
+SECTION_WEIGHT = 0.4
+_SITE_RE = re.compile(r"universidade federal da para[ií]ba\s*-\s*ufpb", re.IGNORECASE)
+
+# Termos em no máximo esta fração das páginas são "raros": a pergunta depende deles (ver `termos_raros`)
+RARE_MAX_FRACTION = 0.01
+
+def termos(texto: str) -> List[str]:
+    """ Termos comparáveis entre pergunta, títulos e trechos: radicais (plural e flexões caem na mesma
+    entrada) e códigos curtos ("iv", "2025"), que distinguem páginas parecidas.
+    """
+    return [radical(t) for t in tokenizar(texto, min_len=3)]
+
+def separar_titulo(titulo: str, url: Optional[str] = None) -> Tuple[str, str]:
+    """ (nome da página, seção do site) a partir do título e do caminho da URL. """
+    pagina, _, secao = (titulo or "").partition(" — ")
+    secao = _SITE_RE.sub(" ", secao)
+    if url:
+        secao += " " + " ".join(p for p in urlparse(url).path.replace("-", " ").split("/") if p)
+    return pagina, secao
+
+class TitleIndex:
+    """ Índice invertido em memória termo -> páginas, sobre títulos e seções (primeira etapa da busca do
+    UFPBAgent: restringe a busca de parágrafos a poucas páginas candidatas).
+    Pontuação da página = soma do IDF dos termos da pergunta, ponderado por onde o termo aparece.
+    """
+
+    def __init__(self):
+        self.paginas: Dict[int, Tuple[str, Optional[str]]] = {} # page_id -> (título, url)
+        self._postings: Dict[str, Dict[int, float]] = {} # termo -> {page_id: peso}
+        self._idf: Dict[str, float] = {}
+
+    def construir(self, paginas: List[Tuple[int, str, Optional[str]]]):
+        """ (page_id, título, url) de todas as páginas. """
+        self.paginas = {page_id: (titulo, url) for page_id, titulo, url in paginas}
+        self._postings = {}
+        for page_id, titulo, url in paginas:
+            pagina, secao = separar_titulo(titulo, url)
+            pesos: Dict[str, float] = {}
+            for termo in termos(secao):
+                pesos[termo] = SECTION_WEIGHT
+            for termo in termos(pagina):
+                pesos[termo] = TITLE_WEIGHT
+            for termo, peso in pesos.items():
+                self._postings.setdefault(termo, {})[page_id] = peso
+        total = len(paginas)
+        self._idf = {t: math.log((1 + total) / (1 + len(p))) + 1.0 for t, p in self._postings.items()}
+
+    def termos_raros(self, pergunta: str) -> List[str]:
+        """ Termos da pergunta que a resposta precisa conter: códigos (campus "IV" não é o campus "II") e
+        termos presentes em poucas páginas. Termos que nenhum título contém não entram (palavras genéricas
+        da pergunta que o índice não conhece).
+        """
+        limite = max(1, int(len(self.paginas) * RARE_MAX_FRACTION))
+        return [t for t in dict.fromkeys(termos(pergunta))
+                if e_codigo(t) or 0 < len(self._postings.get(t, ())) <= limite]
+
+    def candidatas(self, pergunta: str, n: int = 5) -> List[Tuple[int, float]]:
+        """ As `n` páginas de maior pontuação para a pergunta (apenas as com algum termo em comum). """
+        pontos: Dict[int, float] = {}
+        for termo in set(termos(pergunta)):
+            idf = self._idf.get(termo)
+            if idf is None:
+                continue
+            for page_id, peso in self._postings[termo].items():
+                pontos[page_id] = pontos.get(page_id, 0.0) + idf * peso
+        return sorted(pontos.items(), key=lambda item: -item[1])[:n]
@@ -0,0 +1,82 @@
+import math
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+# --- Orçamento de tokens do prompt (llama3-8b-8192: janela fixa de 8192 tokens) --- #
+CONTEXT_WINDOW = int(os.getenv("LUMIA_CONTEXT_WINDOW", "8192")) # Prompt + resposta
+PROMPT_MAX_TOKENS = int(os.getenv("LUMIA_PROMPT_MAX_TOKENS", "3072")) # Teto do prompt (latência/custo na Groq)
+COMPLETION_MAX_TOKENS = int(os.getenv("LUMIA_COMPLETION_MAX_TOKENS", "1024"))
+COMPLETION_MIN_TOKENS = int(os.getenv("LUMIA_COMPLETION_MIN_TOKENS", "256")) # Sempre reservado para a resposta
+QUESTION_MAX_TOKENS = int(os.getenv("LUMIA_QUESTION_MAX_TOKENS", "256"))
+MIN_PARAGRAPH_TOKENS = 48 # Trechos truncados menores que isso são descartados (não ajudam o modelo)
+MESSAGE_OVERHEAD_TOKENS = 16 # Template de chat (role, delimitadores) que a Groq adiciona ao prompt
+# Estimativa local: o tokenizer do llama3 gera ~1 token a cada 4 caracteres de uma palavra em português
+CHARS_PER_TOKEN = float(os.getenv("LUMIA_CHARS_PER_TOKEN", "4"))
+
+_PEDACOS_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+TRUNCATION_MARK = " [...]"
+
+def estimar_tokens(texto: Optional[str]) -> int:
+    """ Estimativa conservadora (sem tokenizer) do número de tokens: palavras longas contam como
+    vários tokens e cada sinal de pontuação como um.
+    """
+    if not texto:
+        return 0
+    return sum(max(1, math.ceil(len(p) / CHARS_PER_TOKEN)) for p in _PEDACOS_RE.findall(texto))
+
+def truncar_para_tokens(texto: str, max_tokens: int) -> str:
+    """ Corta o texto (em fronteira de palavra) para caber em `max_tokens`. """
+    if estimar_tokens(texto) <= max_tokens:
+        return texto
+    limite = max_tokens - estimar_tokens(TRUNCATION_MARK)
+    total = 0
+    fim = 0
+    for match in _PEDACOS_RE.finditer(texto):
+        total += max(1, math.ceil(len(match.group()) / CHARS_PER_TOKEN))
+        if total > limite:
+            break
+        fim = match.end()
+    return texto[:fim].rstrip() + TRUNCATION_MARK
+
+def orcamento_prompt() -> int:
+    """ Tokens disponíveis para o prompt: o teto configurado, sem invadir a reserva mínima da resposta. """
+    return max(0, min(PROMPT_MAX_TOKENS, CONTEXT_WINDOW - COMPLETION_MIN_TOKENS - MESSAGE_OVERHEAD_TOKENS))
+
+def calcular_max_tokens(prompt_tokens: int) -> int:
+    """ `max_tokens` da requisição: o configurado, limitado ao que sobra da janela depois do prompt. """
+    restante = CONTEXT_WINDOW - prompt_tokens - MESSAGE_OVERHEAD_TOKENS
+    return max(1, min(COMPLETION_MAX_TOKENS, restante))
+
+def ajustar_contexto(contexto: List[str], orcamento: int, custo_item: int = 2) -> Tuple[List[str], int, int]:
+    """ Encaixa os parágrafos (em ordem de relevância, melhor primeiro) em `orcamento` tokens.
+    O primeiro que não couber é truncado (se sobrar espaço útil); os de menor ranking são descartados.
+    :return: (parágrafos que cabem, quantos foram truncados, quantos foram descartados)
+    """
+    selecionados: List[str] = []
+    truncados = 0
+    restante = orcamento
+    for i, item in enumerate(contexto):
+        custo = estimar_tokens(item) + custo_item
+        if custo <= restante:
+            selecionados.append(item)
+            restante -= custo
+            continue
+        if restante - custo_item >= MIN_PARAGRAPH_TOKENS:
+            selecionados.append(truncar_para_tokens(item, restante - custo_item))
+            truncados = 1
+        return selecionados, truncados, len(contexto) - len(selecionados)
+    return selecionados, truncados, 0
+
+def resumo_uso(uso: Dict[str, int]) -> str:
+    """ Linha de log com os tokens de uma requisição (estimados localmente e, se disponível, reportados pela Groq). """
+    partes = [f"prompt_estimado={uso.get('prompt_tokens_estimados', 0)}", f"max_tokens={uso.get('max_tokens', 0)}"]
+    if "prompt_tokens" in uso:
+        partes.append(f"prompt={uso['prompt_tokens']} completion={uso.get('completion_tokens', 0)}")
+    if uso.get("espera_fila_ms") or uso.get("retentativas"):
+        partes.append(f"espera_fila_ms={uso.get('espera_fila_ms', 0)} retentativas={uso.get('retentativas', 0)}")
+    if uso.get("degradado"):
+        partes.append("degradado=1 (LLM indisponível, resposta do DB)")
+    if uso.get("paragrafos_truncados") or uso.get("paragrafos_descartados"):
+        partes.append(f"contexto truncado={uso.get('paragrafos_truncados', 0)} descartado={uso.get('paragrafos_descartados', 0)}")
+    return "Tokens: " + " ".join(partes)
@@ -0,0 +1,191 @@
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# --- Trace por requisição: spans aninhados e cronometrados (rotas -> orquestrador -> agentes -> LLM) --- #
+# Devolvido no campo `trace` das respostas quando pedido (?trace=true ou header X-LumIA-Trace: 1) e,
+# opcionalmente, exportado em OTLP/JSON (uma linha por trace, formato do receiver otlpjsonfile do
+# OpenTelemetry Collector). Sem trace ativo, `span()` é só uma leitura de ContextVar.
+TRACE_EXPORT_PATH = os.getenv("LUMIA_TRACE_EXPORT", "") # Arquivo .jsonl; vazio desativa a exportação
+TRACE_SAMPLE = float(os.getenv("LUMIA_TRACE_SAMPLE", "1")) # Fração das requisições exportadas sem pedido explícito
+SERVICE_NAME = "lumia"
+
+class Span:
+    __slots__ = ("nome", "atributos", "inicio", "fim", "filhos", "trace")
+
+    def __init__(self, nome: str, trace: "Trace", atributos: Dict[str, Any], inicio: Optional[float] = None):
+        self.nome = nome
+        self.trace = trace
+        self.atributos = atributos
+        self.inicio = time.perf_counter() if inicio is None else inicio
+        self.fim: Optional[float] = None
+        self.filhos: List["Span"] = []
+
+    def to_dict(self, origem: float) -> Dict[str, Any]:
+        """ Árvore do span com tempos em ms relativos a `origem` (início do trace). """
+        fim = self.fim if self.fim is not None else time.perf_counter()
+        dados = {"name": self.nome, "start_ms": round((self.inicio - origem) * 1000, 3),
+                 "duration_ms": round((fim - self.inicio) * 1000, 3), "attributes": self.atributos}
+        if self.fim is None:
+            dados["attributes"] = {**self.atributos, "incompleto": True} # Ainda em andamento (ex.: task cancelada)
+        if self.filhos:
+            dados["children"] = [filho.to_dict(origem) for filho in self.filhos]
+        return dados
+
+class Trace:
+    """ Um trace por requisição; a raiz é o span da rota. """
+
+    def __init__(self, nome: str, **atributos):
+        self.trace_id = os.urandom(16).hex()
+        self.inicio_ns = time.time_ns() # Relógio de parede só para a exportação; durações usam perf_counter
+        self.raiz = Span(nome, self, atributos)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"trace_id": self.trace_id, **self.raiz.to_dict(self.raiz.inicio)}
+
+_span_atual: ContextVar[Optional[Span]] = ContextVar("lumia_span_atual", default=None)
+
+def iniciar_trace(nome: str, **atributos) -> Trace:
+    """ Abre o trace da requisição e o torna o contexto atual (tasks criadas a partir daqui herdam). """
+    trace = Trace(nome, **atributos)
+    _span_atual.set(trace.raiz)
+    return trace
+
+def encerrar_trace(trace: Trace, exportar: bool = True):
+    """ Fecha o span raiz, limpa o contexto e envia o trace ao exportador (se configurado). Idempotente. """
+    _span_atual.set(None)
+    if trace.raiz.fim is not None:
+        return
+    trace.raiz.fim = time.perf_counter()
+    if exportar:
+        exportador = get_trace_exporter()
+        if exportador is not None:
+            exportador.exportar(trace)
+
+def deve_rastrear(pedido: bool) -> bool:
+    """ Trace explícito (query/header) ou amostragem para o arquivo de exportação. """
+    return pedido or (bool(TRACE_EXPORT_PATH) and random.random() < TRACE_SAMPLE)
+
+def pedido_de_trace(query: bool, header: Optional[str]) -> bool:
+    return query or (header or "").strip().lower() in ("1", "true", "yes", "on")
+
+@contextmanager
+def span(nome: str, **atributos):
+    """ Span filho do atual durante o bloco `with`. Retorna o Span (ou None sem trace ativo), para
+    acrescentar atributos com `s.atributos[...] = ...`. Exceções marcam o span com `erro`.
+    """
+    pai = _span_atual.get()
+    if pai is None:
+        yield None
+        return
+    s = Span(nome, pai.trace, atributos)
+    pai.filhos.append(s)
+    _span_atual.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.atributos["erro"] = type(e).__name__
+        raise
+    finally:
+        s.fim = time.perf_counter()
+        _span_atual.set(pai) # Não usa token.reset: o bloco pode terminar em outro contexto (gerador fechado por outra task)
+
+def registrar_span(nome: str, inicio: float, fim: float, **atributos):
+    """ Span já concluído (tempos de perf_counter), ex.: a espera na fila do limitador medida por ele. """
+    pai = _span_atual.get()
+    if pai is None:
+        return
+    s = Span(nome, pai.trace, atributos, inicio=inicio)
+    s.fim = fim
+    pai.filhos.append(s)
+
+def anotar(**atributos):
+    """ Acrescenta atributos ao span atual (no-op sem trace ativo). """
+    atual = _span_atual.get()
+    if atual is not None:
+        atual.atributos.update(atributos)
+
+# --- Exportação OTLP/JSON --- #
+def _valor_otlp(valor) -> Dict[str, Any]:
+    if isinstance(valor, bool):
+        return {"boolValue": valor}
+    if isinstance(valor, int):
+        return {"intValue": str(valor)}
+    if isinstance(valor, float):
+        return {"doubleValue": valor}
+    return {"stringValue": str(valor)}
+
+def _spans_otlp(trace: Trace) -> List[Dict[str, Any]]:
+    origem_s = trace.raiz.inicio
+    spans = []
+
+    def visitar(s: Span, pai_id: str):
+        span_id = os.urandom(8).hex()
+        fim = s.fim if s.fim is not None else time.perf_counter()
+        spans.append({
+            "traceId": trace.trace_id,
+            "spanId": span_id,
+            "parentSpanId": pai_id,
+            "name": s.nome,
+            "kind": 2 if not pai_id else 1, # SERVER na raiz, INTERNAL nos demais
+            "startTimeUnixNano": str(trace.inicio_ns + int((s.inicio - origem_s) * 1e9)),
+            "endTimeUnixNano": str(trace.inicio_ns + int((fim - origem_s) * 1e9)),
+            "attributes": [{"key": k, "value": _valor_otlp(v)} for k, v in s.atributos.items()],
+            "status": {"code": 2} if "erro" in s.atributos else {},
+        })
+        for filho in s.filhos:
+            visitar(filho, span_id)
+
+    visitar(trace.raiz, "")
+    return spans
+
+class TraceExporter:
+    """ Acrescenta traces ao arquivo em OTLP/JSON. A escrita roda numa thread dedicada (uma só, então as
+    linhas nunca se intercalam): o event loop só monta o dict.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lumia-trace")
+        self.stats = {"exportados": 0, "erros": 0}
+
+    def exportar(self, trace: Trace):
+        linha = json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+                                        {"key": "process.pid", "value": {"intValue": str(os.getpid())}}]},
+            "scopeSpans": [{"scope": {"name": "lumia.tracing"}, "spans": _spans_otlp(trace)}],
+        }]}, ensure_ascii=False)
+        self._executor.submit(self._escrever, linha)
+
+    def _escrever(self, linha: str):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(linha + "\n")
+            self.stats["exportados"] += 1
+        except OSError as e:
+            self.stats["erros"] += 1
+            print(f"Tracing: Erro ao exportar trace para {self.path}: {e}")
+
+    def fechar(self):
+        self._executor.shutdown(wait=True) # Grava os traces pendentes
+        print(f"Tracing: Exportador encerrado | exportados={self.stats['exportados']} erros={self.stats['erros']}")
+
+_exporter: Optional[TraceExporter] = None
+
+def get_trace_exporter() -> Optional[TraceExporter]:
+    """ Exportador do processo, ou None se LUMIA_TRACE_EXPORT não estiver definido. """
+    global _exporter
+    if _exporter is None and TRACE_EXPORT_PATH:
+        _exporter = TraceExporter(TRACE_EXPORT_PATH)
+    return _exporter
+
+def close_trace_exporter():
+    global _exporter
+    if _exporter is not None:
+        _exporter.fechar()
+        _exporter = None
@@ -0,0 +1,262 @@
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import time
+import zlib
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+# Adiciona o diretório raiz ao sys.path para encontrar o módulo utils
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.text_normalizer import tokenizar
+from utils.corpus_watcher import registrar_recarga
+from utils.metrics import DB_LATENCY
+from utils.tracing import span
+
+# --- Configuração do índice vetorial --- #
+# Os artefatos ficam ao lado de db/lumia.db e são abertos com mmap (não são copiados para a RAM do processo).
+# Cada construção grava uma versão completa em db/lumia_vectors/<versão>/ e só então troca o manifesto
+# (um único os.replace): um leitor nunca vê a matriz de uma versão com os ids de outra.
+DB_DIR = os.path.join(os.path.dirname(__file__), '..', 'db')
+INDEX_DIR = os.path.join(DB_DIR, 'lumia_vectors')
+MANIFEST_PATH = os.path.join(INDEX_DIR, 'atual.json')
+ARTEFATOS = {"vetores": "vectors.npy", "ids": "ids.npy", "idf": "idf.npy"}
+VERSOES_MANTIDAS = 2 # A anterior fica para processos que ainda a têm aberta
+
+SOURCE_TABLE = "prape"
+VECTOR_DIM = int(os.getenv("LUMIA_VECTOR_DIM", "1024")) # Dimensão do espaço de hashing
+CHAR_NGRAM = 4 # n-gramas de caracteres aproximam variações ("moradia" / "morar")
+TITLE_WEIGHT = 0.5 # Peso das features do título da página
+MIN_SCORE = 0.15 # Similaridade mínima para considerar um parágrafo relevante
+THREAD_MIN_ROWS = int(os.getenv("LUMIA_VECTOR_THREAD_MIN_ROWS", "20000")) # A partir daqui o produto matriz-vetor sai do event loop
+
+def _features(texto: str) -> List[str]:
+    """ Extrai as features textuais: palavras + n-gramas de caracteres de cada palavra. """
+    feats = []
+    for token in tokenizar(texto):
+        feats.append(f"w:{token}")
+        padded = f"<{token}>"
+        if len(padded) > CHAR_NGRAM:
+            feats.extend(f"c:{padded[i:i + CHAR_NGRAM]}" for i in range(len(padded) - CHAR_NGRAM + 1))
+    return feats
+
+def vetorizar(texto: str, dim: int = VECTOR_DIM) -> np.ndarray:
+    """ Feature hashing com sinal (estável entre processos, via crc32) e tf sublinear. Sem IDF/normalização. """
+    vec = np.zeros(dim, dtype=np.float32)
+    for feat in _features(texto):
+        h = zlib.crc32(feat.encode("utf-8"))
+        vec[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    # tf sublinear preservando o sinal das colisões
+    return np.sign(vec) * np.log1p(np.abs(vec))
+
+def construir_indice(conn: sqlite3.Connection, source_table: str = SOURCE_TABLE, dim: int = VECTOR_DIM) -> int:
+    """ Etapa OFFLINE: vetoriza todos os parágrafos de `source_table` e grava os artefatos .npy.
+    Os arquivos vão para uma pasta de versão nova, publicada pela troca atômica do manifesto.
+    :return: Número de parágrafos indexados.
+    """
+    start = time.perf_counter()
+    rows = conn.execute(f"SELECT id, pergunta, resposta FROM {source_table} ORDER BY id").fetchall()
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    matriz = np.zeros((len(rows), dim), dtype=np.float32)
+    for i, (_, pergunta, resposta) in enumerate(rows):
+        matriz[i] = vetorizar(resposta, dim)
+        if pergunta:
+            matriz[i] += TITLE_WEIGHT * vetorizar(pergunta, dim)
+
+    # IDF por bucket (aproximação do IDF por feature, suficiente com hashing)
+    df = np.count_nonzero(matriz, axis=0).astype(np.float32)
+    idf = (np.log((1.0 + len(rows)) / (1.0 + df)) + 1.0).astype(np.float32)
+    matriz *= idf
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    matriz /= normas
+
+    versao = f"{time.time_ns():020d}" # Ordenável; nunca reaproveita a pasta de uma versão publicada
+    pasta = os.path.join(INDEX_DIR, versao)
+    os.makedirs(pasta)
+    for nome, array in (("vetores", matriz), ("ids", ids), ("idf", idf)):
+        np.save(os.path.join(pasta, ARTEFATOS[nome]), array)
+    with open(os.path.join(pasta, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"dim": dim, "count": len(rows), "source_table": source_table, "built_at": time.time()}, f)
+
+    # Publica a versão: troca atômica do manifesto
+    tmp_manifesto = f"{MANIFEST_PATH}.tmp"
+    with open(tmp_manifesto, "w", encoding="utf-8") as f:
+        json.dump({"versao": versao}, f)
+    os.replace(tmp_manifesto, MANIFEST_PATH)
+    _remover_versoes_antigas(versao)
+
+    print(f"VectorIndex: {len(rows)} parágrafos indexados (dim={dim}) em {time.perf_counter() - start:.2f}s.")
+    return len(rows)
+
+def versao_atual() -> Optional[str]:
+    """ Versão publicada no manifesto, ou None se o índice ainda não foi construído. """
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)["versao"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def arquivos_indice(versao: Optional[str] = None) -> Dict[str, str]:
+    """ Caminhos dos artefatos da versão indicada (padrão: a publicada); vazio sem índice. """
+    versao = versao or versao_atual()
+    if versao is None:
+        return {}
+    return {nome: os.path.join(INDEX_DIR, versao, arquivo) for nome, arquivo in ARTEFATOS.items()}
+
+def _remover_versoes_antigas(atual: str):
+    versoes = sorted(v for v in os.listdir(INDEX_DIR) if os.path.isdir(os.path.join(INDEX_DIR, v)))
+    outras = [v for v in versoes if v != atual]
+    for versao in outras[:max(0, len(outras) - (VERSOES_MANTIDAS - 1))]:
+        shutil.rmtree(os.path.join(INDEX_DIR, versao), ignore_errors=True) # mmap aberto (Windows): fica para a próxima
+
+class VectorIndex:
+    """ Índice vetorial somente-leitura sobre os artefatos gerados por `construir_indice`. Quando uma nova
+    versão é publicada no manifesto, a recarga periódica (utils/corpus_watcher.py) troca os artefatos.
+    """
+
+    def __init__(self):
+        # (vetores, ids, idf) trocados juntos numa única atribuição: uma busca em andamento (inclusive numa
+        # thread) nunca mistura a matriz de uma versão com os ids de outra
+        self._artefatos: Optional[tuple] = None
+        self.versao: Optional[str] = None
+        self.dim = VECTOR_DIM
+
+    @property
+    def matriz(self) -> Optional[np.ndarray]:
+        return self._artefatos[0] if self._artefatos is not None else None
+
+    @property
+    def ids(self) -> Optional[np.ndarray]:
+        return self._artefatos[1] if self._artefatos is not None else None
+
+    @property
+    def idf(self) -> Optional[np.ndarray]:
+        return self._artefatos[2] if self._artefatos is not None else None
+
+    def carregar(self) -> bool:
+        """ Abre com mmap os artefatos da versão publicada. Retorna False se o índice ainda não foi
+        construído ou se os arquivos não formam um índice consistente (a versão já carregada, se houver,
+        continua em uso).
+        """
+        versao = versao_atual()
+        arquivos = arquivos_indice(versao)
+        if not arquivos or not all(os.path.exists(p) for p in arquivos.values()):
+            print("VectorIndex: Artefatos não encontrados. Rode `python utils/vector_index.py` para construir.")
+            return False
+        try:
+            matriz = np.load(arquivos["vetores"], mmap_mode="r")
+            ids = np.load(arquivos["ids"], mmap_mode="r")
+            idf = np.load(arquivos["idf"])
+            if matriz.ndim != 2 or ids.shape != (matriz.shape[0],) or idf.shape != (matriz.shape[1],):
+                raise ValueError(f"formas inconsistentes: vetores={matriz.shape} ids={ids.shape} idf={idf.shape}")
+        except (OSError, ValueError) as e:
+            print(f"VectorIndex: Erro ao carregar artefatos da versão {versao}: {e}")
+            return False
+        self._artefatos = (matriz, ids, idf)
+        self.versao = versao
+        self.dim = matriz.shape[1]
+        print(f"VectorIndex: {matriz.shape[0]} vetores carregados (mmap, dim={self.dim}, versão {versao}).")
+        return True
+
+    async def atualizar(self, versao_corpus: Optional[str] = None):
+        """ Recarga periódica: abre a versão publicada no manifesto se ela não for a carregada. A versão
+        anterior é mantida em disco (VERSOES_MANTIDAS), então o mmap aberto continua válido até a troca.
+        """
+        if versao_atual() not in (None, self.versao):
+            self.carregar()
+
+    @property
+    def disponivel(self) -> bool:
+        return self.matriz is not None and self.matriz.shape[0] > 0
+
+    def buscar(self, pergunta: str, k: int = 3, min_score: float = MIN_SCORE) -> List[Dict[str, Any]]:
+        """ Top-k por similaridade de cosseno: um único produto matriz-vetor + argpartition. """
+        artefatos = self._artefatos
+        if artefatos is None or artefatos[0].shape[0] == 0:
+            return []
+        matriz, ids, idf = artefatos
+        query = vetorizar(pergunta, matriz.shape[1]) * idf
+        norma = np.linalg.norm(query)
+        if norma == 0:
+            return []
+        scores = matriz @ (query / norma)
+        k = min(k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [{"id": int(ids[i]), "score": float(scores[i])} for i in top if scores[i] >= min_score]
+
+    def buscar_paragrafos(self, conn: sqlite3.Connection, pergunta: str, k: int = 3) -> List[Dict[str, Any]]:
+        """ Como `buscar`, mas completa cada resultado com pergunta/resposta lidas do DB. """
+        resultados = self.buscar(pergunta, k)
+        if not resultados:
+            return []
+        rows = conn.execute(_sql_textos(len(resultados)), [r["id"] for r in resultados]).fetchall()
+        return _juntar_textos(resultados, rows)
+
+    async def buscar_paragrafos_async(self, conn, pergunta: str, k: int = 3) -> List[Dict[str, Any]]:
+        """ Versão assíncrona de `buscar_paragrafos` para conexões aiosqlite. Em corpora grandes o produto
+        matriz-vetor roda numa thread (o numpy libera o GIL). Falhas na busca vetorial retornam lista vazia:
+        quem chama segue só com o BM25.
+        """
+        try:
+            with span("vetor.busca", k=k):
+                if self.disponivel and self.matriz.shape[0] >= THREAD_MIN_ROWS:
+                    resultados = await asyncio.to_thread(self.buscar, pergunta, k)
+                else:
+                    resultados = self.buscar(pergunta, k)
+        except (ValueError, IndexError, OSError) as e:
+            print(f"VectorIndex: Erro na busca vetorial, seguindo só com FTS: {e}")
+            return []
+        if not resultados:
+            return []
+        with span("db.textos_vetoriais"), DB_LATENCY.tempo("textos_vetoriais"):
+            async with conn.execute(_sql_textos(len(resultados)), [r["id"] for r in resultados]) as cursor:
+                rows = await cursor.fetchall()
+        return _juntar_textos(resultados, rows)
+
+def _sql_textos(n: int) -> str:
+    placeholders = ",".join("?" * n)
+    return f"SELECT id, pergunta, resposta, page_id, url FROM {SOURCE_TABLE} WHERE id IN ({placeholders})"
+
+def _juntar_textos(resultados: List[Dict[str, Any]], rows) -> List[Dict[str, Any]]:
+    textos = {row[0]: row for row in rows}
+    return [{**r, "pergunta": textos[r["id"]][1], "resposta": textos[r["id"]][2],
+             "page_id": textos[r["id"]][3], "url": textos[r["id"]][4]}
+            for r in resultados if r["id"] in textos]
+
+def fundir_rrf(listas: List[List[Dict[str, Any]]], k: int = 3, rrf_k: int = 60) -> List[Dict[str, Any]]:
+    """ Reciprocal Rank Fusion: combina rankings (ex.: BM25 e cosseno) pela posição de cada id. """
+    pontos: Dict[int, float] = {}
+    itens: Dict[int, Dict[str, Any]] = {}
+    for lista in listas:
+        for pos, item in enumerate(lista):
+            pontos[item["id"]] = pontos.get(item["id"], 0.0) + 1.0 / (rrf_k + pos + 1)
+            itens.setdefault(item["id"], item)
+    ordem = sorted(pontos, key=pontos.get, reverse=True)[:k]
+    return [itens[i] for i in ordem]
+
+_vector_index: Optional[VectorIndex] = None
+
+def get_vector_index() -> VectorIndex:
+    """ Retorna a instância única do índice, carregada na primeira chamada. """
+    global _vector_index
+    if _vector_index is None:
+        _vector_index = VectorIndex()
+        _vector_index.carregar()
+        registrar_recarga("VectorIndex", _vector_index.atualizar)
+    return _vector_index
+
+# Etapa offline de indexação: python utils/vector_index.py
+if __name__ == '__main__':
+    from utils.db_handler import create_connection
+
+    conn = create_connection()
+    if conn is not None:
+        construir_indice(conn)
+        conn.close()